@@ -0,0 +1,95 @@
+import numpy as np
+
+from trace_loader import *
+
+ARRIVALS = ('start', 'submit')
+
+
+class ApplicationArrivals:
+    def __init__(self, traces: object, applications: object, arrivals: str = 'start'):
+        """
+        :param traces: Traces of the applications
+        :param applications: PendingQueue the applications join when they arrive (its table gets their rows then)
+        :param arrivals: 'start' (every application arrives at time 0) or 'submit' (at its submit time, measured from
+                         the first submit time; traces without submit times arrive at 0)
+        """
+        """
+        Feeds applications into the pending queue as simulated time reaches their arrival, in arrival order. The trace
+        is read a chunk at a time as the applications in it come due, so the queue and the application table only hold
+        applications that have arrived, and the arrivals only the chunk being released.
+        """
+        self.applications = applications
+        self.submit = arrivals == 'submit' and traces.submits and len(traces) > 0
+        self.length = len(traces)
+        self.position = 0  # applications that already arrived
+        self.link(traces)
+
+    def __getstate__(self):
+        # the traces are shared data and the chunk iterator cannot be pickled; a restored simulation links them again
+        state = self.__dict__.copy()
+        state.update(traces=None, order=None, chunks=None, chunk=None, chunk_position=0)
+        return state
+
+    def __len__(self):
+        # applications yet to arrive
+        return self.length - self.position
+
+    def link(self, traces: object):
+        """
+        :param traces: Traces of the applications
+        :return: None
+        """
+        """(Re)opens the trace at the first application that has not arrived yet"""
+        self.traces = traces
+        self.order = None
+        if self.submit and not traces.in_order:  # arrival order has to be worked out from every submit time
+            self.order = np.argsort(traces.get_submits(), kind='stable')  # ties arrive in trace order
+        self.chunks = self._read_chunks()
+        self.chunk = None  # (times, runtimes, cores, memories) of the applications being released
+        self.chunk_position = 0  # applications of the chunk that already arrived
+        self._next_chunk()
+
+    def _read_chunks(self):
+        # (row, column) arrays of the applications from self.position on, in arrival order
+        if self.order is None:
+            yield from self.traces.iter_chunks(self.position)
+        else:
+            for first in range(self.position, self.length, CHUNK_ROWS):
+                yield self.traces.get_rows(self.order[first:first + CHUNK_ROWS])
+
+    def _next_chunk(self):
+        self.chunk, self.chunk_position = None, 0
+        for rows in self.chunks:
+            if len(rows):
+                times = rows[:, 0] - self.traces.first_submit if self.submit else np.zeros(len(rows), dtype=np.int64)
+                self.chunk = (times, rows[:, 1].copy(), rows[:, 2].copy(), rows[:, 3].copy())
+                return
+
+    def get_next_arrival(self):
+        """
+        :return: time of the next arrival, from the start of the simulation (None if every application arrived)
+        """
+        return int(self.chunk[0][self.chunk_position]) if self.chunk is not None else None
+
+    def release(self, time: int):
+        """
+        :param time: current time, from the start of the simulation
+        :return: number of applications that arrived
+        """
+        """Adds every application arriving by time to the application table and the pending queue"""
+        arrived = 0
+        while self.chunk is not None:
+            times, runtimes, cores, memories = self.chunk
+            stop = int(np.searchsorted(times, time, side='right'))
+            if stop > self.chunk_position:
+                ids = self.applications.table.extend(runtimes[self.chunk_position:stop],
+                                                     cores[self.chunk_position:stop],
+                                                     memories[self.chunk_position:stop])
+                self.applications.extend(ids)
+                arrived += stop - self.chunk_position
+                self.position += stop - self.chunk_position
+                self.chunk_position = stop
+            if stop < len(times):
+                break
+            self._next_chunk()
+        return arrived
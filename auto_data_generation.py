@@ -1,55 +1,159 @@
-import os
-import random
+import itertools
+import multiprocessing
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 
-import __main__
 from compile_irradiances import *
+from simulation import *
 
+_datasets = None  # traces and irradiance lists of the worker (shared copy-on-write when workers are forked)
+_snapshot = None  # shared prefix of a forked sweep
 
-def write_config(file: str, policy: str, battery: float, pv_area):
+
+def get_config(file: str, policy: str, battery: float, pv_area):
     """
     :param file: file with trace data to run
     :param policy: what type of migration policy will be used
     :param battery: how large the battery storage is, in Joules
     :param pv_area: area of PV cells, in m^2
-    :return: None
-    """
-    """Writes Config File - allows for automatic changes"""
-    with open('config.txt', 'w') as config:
-        config.write('Config\n')
-        config.write('Servers per Node: 1\n')
-        config.write('Cores per Server: 1\n')
-        config.write('Memory per Server: 262144\n')
-        config.write(f'Battery Size: {battery}\n')
-        config.write('Power per Server Needed: 250\n')
-        config.write('PV Efficiency: .22\n')
-        config.write(f'PV Area: {pv_area}\n')
-        config.write(f'Delay Function: 40885*x**-0.702\n')
-        config.write('Node Placement: assigned\n')
-        config.write(f'Policy: {policy}\n')
-        config.write('Global Applications: True\n')
-        config.write('Degradable Applications: False\n')
-        config.write(f'Degradable Multiplier: 1\n')
-        config.write(f'Traces: {file}\n')
-        config.write('Irradiance List: irradiance.txt\n')
-        config.write('Diagnostics: False\n')
+    :return: config_info: dictionary containing parameter:value pairs, as read from config.txt
+    """
+    return {'Servers per Node': '1',
+            'Cores per Server': '1',
+            'Memory per Server': '262144',
+            'Battery Size': f'{battery}',
+            'Power per Server Needed': '250',
+            'PV Efficiency': '.22',
+            'PV Area': f'{pv_area}',
+            'Delay Function': '40885*x**-0.702',
+            'Node Placement': 'assigned',
+            'Policy': f'{policy}',
+            'Global Applications': 'True',
+            'Degradable Applications': 'False',
+            'Degradable Multiplier': '1',
+            'Traces': f'{file}',
+            'Irradiance List': 'irradiance.bin',
+            'Diagnostics': 'False',
+            'Simulation Engine': 'tick',
+            'Placement': 'first-fit',
+            'Application Arrivals': 'start',
+            'Results Recording': 'full',
+            'Results Interval': '1',
+            'Results Format': 'text',
+            'Results Compression': 'none',
+            'Profiling': 'off',
+            'Profiling Interval': '3600',
+            'Irradiance Model': 'file',
+            'Irradiance Days': '30',
+            'Clouds': 'False',
+            'Cloud Seed': '0'}
+
+
+def get_sweep_configs(grid: dict, pv_area):
+    """
+    :param grid: lists of trace files ('files'), policies ('methods') and battery sizes ('batteries')
+    :param pv_area: area of PV cells, in m^2
+    :return: SimulationConfig of every combination in the grid
+    """
+    return [SimulationConfig.from_dict(get_config(file, method, battery, pv_area))
+            for file, method, battery in itertools.product(grid['files'], grid['methods'], grid['batteries'])]
+
+
+def set_datasets(datasets: object, snapshot: bytes = None):
+    global _datasets, _snapshot
+    _datasets = datasets
+    _snapshot = snapshot
+
+
+def run_simulation(config: object, output_name: str):
+    """
+    :param config: SimulationConfig of the run
+    :param output_name: name of the results file or folder
+    :return: output_name
+    """
+    Simulation(config, _datasets, output_name).run()
+    return output_name
+
+
+def run_fork(config: object, output_name: str):
+    """
+    :param config: SimulationConfig of the run, differing from the prefix only in the Simulation.FORK_SETTINGS
+    :param output_name: name of the results file or folder
+    :return: output_name
+    """
+    Simulation.restore(_snapshot, _datasets, output_name, config).run()
+    return output_name
+
+
+def run_sweep(configs: list, workers: int = None, datasets: object = None):
+    """
+    :param configs: SimulationConfig of each simulation
+    :param workers: processes running simulations at the same time (None for one per CPU)
+    :param datasets: Datasets to share with the workers (None for new ones); the traces and irradiance lists the
+                     configs use are loaded into it and the delay models of their delay functions built together
+    :return: names of the results, in the order of configs
+    """
+    """
+    Runs the simulations in a process pool. Each run gets its config as an object instead of through config.txt,
+    and the traces and irradiance lists are loaded once; forked workers share them without copying.
+    """
+    datasets = (datasets if datasets is not None else Datasets()).load(
+        {config.traces for config in configs},
+        {config.irradiance_list for config in configs if config.irradiance_model == 'file'},
+        {config.delay_function for config in configs})
+    now = datetime.now().strftime("%m-%d-%Y_%H-%M-%S")
+    names = [f'{config.policy}_output_{now}_{index}' for index, config in enumerate(configs)]
+    # fork where available so the workers inherit the datasets instead of receiving a pickled copy
+    context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=set_datasets,
+                             initargs=(datasets,)) as executor:
+        for name in executor.map(run_simulation, configs, names):
+            print(f'Finished {name}')
+    return names
+
+
+def run_forked_sweep(configs: list, workers: int = None, datasets: object = None):
+    """
+    :param configs: SimulationConfig of each simulation, differing only in the Simulation.FORK_SETTINGS
+    :param workers: processes running simulations at the same time (None for one per CPU)
+    :param datasets: Datasets to share with the workers (None for new ones); the traces and irradiance lists the
+                     configs use are loaded into it and the delay models of their delay functions built together
+    :return: names of the results, in the order of configs
+    """
+    """
+    Policies only make decisions once applications are paused, so every run is the same up to that point. The prefix
+    is simulated once and snapshotted, and each run continues from the snapshot with its own policy.
+    """
+    for config in configs[1:]:
+        changed = [name for name in SimulationConfig.KEYS
+                   if name not in Simulation.FORK_SETTINGS and getattr(config, name) != getattr(configs[0], name)]
+        if changed:
+            raise ValueError(f'{", ".join(changed)} cannot differ between forked runs; use run_sweep instead')
+    datasets = (datasets if datasets is not None else Datasets()).load(
+        {config.traces for config in configs},
+        {config.irradiance_list for config in configs if config.irradiance_model == 'file'},
+        {config.delay_function for config in configs})
+    prefix = Simulation(configs[0].replace(results_format='text'), datasets)
+    if prefix.run(until='pause') is not None:
+        print('No applications were paused; every run is the same as the first one')
+    snapshot = prefix.snapshot()
+    print(f'Prefix of {prefix.processing_time - SEC_PER_DAY} seconds simulated in {prefix.execution_time} seconds')
+    now = datetime.now().strftime("%m-%d-%Y_%H-%M-%S")
+    names = [f'{config.policy}_output_{now}_{index}' for index, config in enumerate(configs)]
+    context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=set_datasets,
+                             initargs=(datasets, snapshot)) as executor:
+        for name in executor.map(run_fork, configs, names):
+            print(f'Finished {name}')
+    return names
 
 
 if __name__ == '__main__':
-    methods = ['passive', 'greedy', 'super-greedy', 'YOLO', 'look-ahead', 'practical']
-    files = ['traces_1CPU.csv']
-    batteries = [0]
+    grid = {'methods': ['passive', 'greedy', 'super-greedy', 'YOLO', 'look-ahead', 'practical'],
+            'files': ['traces_1CPU.csv'],
+            'batteries': [0]}
     pv_area = 1000
 
-    get_max_values()
-    compile_irradiances()
-
-    for file in files:
-        for method in methods:
-            print(method)
-            for battery in batteries:
-                write_config(file, method, battery, pv_area)
-                if os.name == 'nt':  # for Windows
-                    os.system('__main__.py')
-                elif os.name == 'posix':  # for Linux
-                    os.system('python3 __main__.py')
+    get_max_values(compile_irradiances())  # one pass over the site files
+
+    run_sweep(get_sweep_configs(grid, pv_area))
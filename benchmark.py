@@ -0,0 +1,236 @@
+import os
+import sys
+import json
+import argparse
+import time
+import platform
+import itertools
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from simulation import *
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak memory is then left out
+    resource = None
+
+BENCHMARK_DIRECTORY = 'Benchmarks'  # generated workloads, reused by later benchmarks with the same parameters
+BENCHMARK_GRID = {'jobs': [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6], 'nodes': [3, 30, 500], 'days': [1, 7, 30]}
+QUICK_GRID = {'jobs': [10 ** 3, 10 ** 4], 'nodes': [3, 30], 'days': [1]}
+
+# synthetic workloads (irradiance comes from the clear-sky model with clouds)
+ARRIVAL_SPAN = 0.8  # applications are submitted during this share of the horizon
+JOB_CORES = (1, 1, 1, 2, 4)
+JOB_MEMORY = (512, 1024, 2048, 4096, 8192)  # in MB
+MEDIAN_RUNTIME = 1800  # in seconds; runtimes are log-normal between 1 minute and 6 hours
+
+
+def get_synthetic_coords(nodes: int, seed: int = 0):
+    """
+    :param nodes: number of nodes
+    :param seed: seed of the workload
+    :return: (latitude, longitude) of each node, spread over the contiguous United States
+    """
+    rng = np.random.default_rng([seed, 0])
+    return [(round(float(lat), 4), round(float(long), 4))
+            for lat, long in zip(rng.uniform(25, 49, nodes), rng.uniform(-124, -67, nodes))]
+
+
+def write_synthetic_traces(path: str, jobs: int, days: int, seed: int = 0):
+    """
+    :param path: csv file to write (id, submit, runtime, cores, x, memory)
+    :param jobs: number of applications
+    :param days: days over which they are submitted (see ARRIVAL_SPAN)
+    :param seed: seed of the workload
+    :return: None
+    """
+    rng = np.random.default_rng([seed, 2])
+    rows = np.zeros((jobs, 6), dtype=np.int64)
+    rows[:, 0] = np.arange(jobs)
+    rows[:, 1] = np.sort(rng.integers(0, max(int(days * SEC_PER_DAY * ARRIVAL_SPAN), 1), jobs))
+    rows[:, 2] = np.clip(rng.lognormal(np.log(MEDIAN_RUNTIME), 1.0, jobs), 60, 6 * 3600)
+    rows[:, 3] = rng.choice(JOB_CORES, jobs)
+    rows[:, 5] = rng.choice(JOB_MEMORY, jobs)
+    temporary = f'{path}.{os.getpid()}.tmp'
+    np.savetxt(temporary, rows, fmt='%d', delimiter=',', header='id,submit,runtime,cores,x,memory', comments='')
+    os.replace(temporary, path)
+
+
+def generate_workload(jobs: int, nodes: int, days: int, seed: int = 0):
+    """
+    :param jobs: number of applications
+    :param nodes: number of nodes
+    :param days: simulated days
+    :param seed: seed of the workload
+    :return: trace file and node coordinates of the workload
+    """
+    """Writes the trace file of a workload, unless an earlier benchmark already did"""
+    os.makedirs(BENCHMARK_DIRECTORY, exist_ok=True)
+    traces = f'{BENCHMARK_DIRECTORY}/traces_{jobs}jobs_{days}days_seed{seed}.csv'
+    if not os.path.exists(traces):
+        write_synthetic_traces(traces, jobs, days, seed)
+    return traces, get_synthetic_coords(nodes, seed)
+
+
+def get_benchmark_config(traces: str, days: int, seed: int, policy: str, engine: str = 'tick',
+                         profiling: str = 'off'):
+    """
+    :param traces: trace file of the workload
+    :param days: simulated days
+    :param seed: seed of the workload
+    :param policy: migration policy
+    :param engine: 'tick' or 'event'
+    :param profiling: 'off' for timed runs, 'phases' for the breakdown of where the time goes
+    :return: SimulationConfig of a benchmark run
+    """
+    return SimulationConfig(servers_per_node=2, cores_per_server=4, memory_per_server=16384, battery=0,
+                            power_per_server=250, pv_efficiency=.22, pv_area=3, delay_function='40885*x**-0.702',
+                            node_placement='assigned', policy=policy, global_applications=True,
+                            degradable_applications=False, degradable_multiplier=1, traces=traces,
+                            irradiance_list='none', engine=engine, arrivals='submit', recording='changes',
+                            profiling=profiling, irradiance_model='clear-sky', irradiance_days=days + 2, clouds=True,
+                            cloud_seed=seed)  # the day before the start and a day after the end for look-ahead
+
+
+def get_peak_rss():
+    # peak resident memory of this process, in MB
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def simulate_case(case: dict, profiling: str = 'off'):
+    """
+    :param case: policy, jobs, nodes, days, engine and seed of the run
+    :param profiling: 'off' or 'phases'
+    :return: the Simulation, whether every application completed, and the wall seconds of its setup and of its run
+    """
+    """Simulates the days of the case, or until every application completed if that comes first"""
+    traces, coords = generate_workload(case['jobs'], case['nodes'], case['days'], case['seed'])
+    start_time = time.time()
+    simulation = Simulation(get_benchmark_config(traces, case['days'], case['seed'], case['policy'], case['engine'],
+                                                 profiling), Datasets(coords=coords))
+    setup_seconds = time.time() - start_time
+    setup_execution_time = simulation.execution_time
+    finished = simulation.run(until=case['days'] * SEC_PER_DAY) is not None
+    return simulation, finished, setup_seconds, simulation.execution_time - setup_execution_time
+
+
+def run_case(case: dict, phases: bool = False):
+    """
+    :param case: policy, jobs, nodes, days, engine and seed of the run
+    :param phases: whether to simulate the case a second time, profiled, for the time spent in each phase
+    :return: the case with its throughput, peak memory and (with phases) time spent in each phase
+    """
+    """
+    The throughput and peak memory come from a run with profiling off, since timing every phase slows the simulation
+    down. The profiled run comes after them and is only used for the breakdown.
+    """
+    simulation, finished, setup_seconds, wall_seconds = simulate_case(case)
+    simulated_seconds = simulation.processing_time - SEC_PER_DAY + 1
+    result = dict(case, finished=finished, completed=simulation.cumulative_completed,
+                  simulated_seconds=simulated_seconds, wall_seconds=wall_seconds, setup_seconds=setup_seconds,
+                  simulated_per_wall=simulated_seconds / wall_seconds if wall_seconds > 0 else None,
+                  peak_rss_mb=get_peak_rss(), phases=None, policies=None)
+    if phases:
+        del simulation
+        profiled, _, _, profiled_seconds = simulate_case(case, 'phases')
+        profiling = profiled.profiler.get_metadata()
+        result.update(profiled_wall_seconds=profiled_seconds, phases=profiling['phases'],
+                      policies=profiling['policies'])
+    return result
+
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(grid: dict = None, policies: list = POLICIES, engine: str = 'tick', seed: int = 0,
+                  output: str = 'benchmark.json', phases: bool = False):
+    """
+    :param grid: lists of job counts ('jobs'), node counts ('nodes') and days ('days'); BENCHMARK_GRID by default
+    :param policies: migration policies to run on every workload
+    :param engine: 'tick' or 'event'
+    :param seed: seed of the synthetic workloads
+    :param output: JSON file to write the results to (None only returns them)
+    :param phases: whether to also profile every case for the time spent in each phase (see run_case)
+    :return: dictionary with the environment and the result of every case
+    """
+    """
+    Runs every policy on every workload of the grid, one case at a time, each in a fresh process so its peak memory
+    is its own and no case slows down another.
+    """
+    grid = grid or BENCHMARK_GRID
+    cases = [{'policy': policy, 'jobs': jobs, 'nodes': nodes, 'days': days, 'engine': engine, 'seed': seed}
+             for jobs, nodes, days in itertools.product(grid['jobs'], grid['nodes'], grid['days'])
+             for policy in policies]
+    benchmark = {'commit': get_commit(), 'python': platform.python_version(), 'numpy': np.__version__,
+                 'platform': platform.platform(), 'processor': platform.processor(), 'cases': []}
+    context = multiprocessing.get_context('spawn')
+    for case in cases:
+        generate_workload(case['jobs'], case['nodes'], case['days'], seed)  # outside the timed process
+        with ProcessPoolExecutor(1, mp_context=context) as executor:
+            result = executor.submit(run_case, case, phases).result()
+        benchmark['cases'].append(result)
+        throughput = 'n/a' if result['simulated_per_wall'] is None else f"{result['simulated_per_wall']:.0f}"
+        print(f"{case['policy']} {case['jobs']} jobs {case['nodes']} nodes {case['days']} days: "
+              f"{throughput} simulated s/s, {result['peak_rss_mb']} MB")
+        if output is not None:  # written after every case so a long benchmark can be stopped part-way
+            with open(output, 'w') as f:
+                json.dump(benchmark, f, indent=1)
+    return benchmark
+
+
+def compare_benchmarks(old: str, new: str):
+    """
+    :param old: JSON file written by run_benchmark
+    :param new: JSON file written by run_benchmark
+    :return: speedup of each case in both files (simulated seconds per wall second, new / old)
+    """
+    def get_key(case: dict):
+        return case['policy'], case['jobs'], case['nodes'], case['days'], case['engine'], case['seed']
+
+    with open(old, 'r') as f:
+        old_cases = {get_key(case): case for case in json.load(f)['cases']}
+    with open(new, 'r') as f:
+        new_cases = {get_key(case): case for case in json.load(f)['cases']}
+    speedups = {}
+    for key, case in new_cases.items():
+        if key in old_cases and old_cases[key]['simulated_per_wall'] and case['simulated_per_wall']:
+            speedups[key] = case['simulated_per_wall'] / old_cases[key]['simulated_per_wall']
+            print(f'{key[0]} {key[1]} jobs {key[2]} nodes {key[3]} days ({key[4]}): {speedups[key]:.2f}x')
+    return speedups
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scaling benchmark of the simulator on synthetic workloads')
+    parser.add_argument('mode', nargs='?', default='quick',
+                        help='quick or full to run QUICK_GRID or BENCHMARK_GRID, or compare to compare two benchmark '
+                             'files (a JSON file in its place runs quick and writes to it)')
+    parser.add_argument('files', nargs='*', help='JSON file to write (quick, full; benchmark.json by default), or '
+                                                 'the old and new JSON files (compare)')
+    parser.add_argument('--phases', action='store_true', help='also profile every case for the time in each phase')
+    arguments = parser.parse_args()
+    if arguments.mode not in ('quick', 'full', 'compare'):
+        if not arguments.mode.endswith('.json'):
+            parser.error(f'unknown mode {arguments.mode}, expected quick, full, compare or a JSON file to write')
+        arguments.files.insert(0, arguments.mode)
+        arguments.mode = 'quick'
+    if arguments.mode == 'compare':
+        if len(arguments.files) != 2:
+            parser.error('compare takes the old and the new JSON file')
+        compare_benchmarks(*arguments.files)
+    else:
+        if len(arguments.files) > 1:
+            parser.error(f'{arguments.mode} takes at most one JSON file to write')
+        run_benchmark(BENCHMARK_GRID if arguments.mode == 'full' else QUICK_GRID,
+                      output=arguments.files[0] if arguments.files else 'benchmark.json', phases=arguments.phases)
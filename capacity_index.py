@@ -0,0 +1,144 @@
+import bisect
+import math
+
+ANY = math.ulp(0.0)  # smallest positive float: a free amount >= ANY means any amount > 0
+PLACEMENTS = ('first-fit', 'best-fit')
+
+
+class CapacityIndex:
+    def __init__(self):
+        """Free cores and memory of a node's powered servers, kept up to date as applications start and stop"""
+        self.servers = []  # in the same order as EdgeSystem.servers
+        self.size = 1  # leaves in the segment tree (a power of two)
+        self.max_cores = [-math.inf] * 2  # segment tree of the most free cores in each range of powered servers
+        self.max_memory = [-math.inf] * 2  # segment tree of the most free memory in each range of powered servers
+        self.entries = []  # (free cores, free memory, position) of each powered server, None when off
+        self.free = {}  # free cores: sorted (free memory, position) of the powered servers with them, for best-fit
+        self.free_cores = []  # sorted keys of free
+        self.changed = set()  # positions of servers updated since the last query
+        self.version = 0  # increases whenever a powered server's free resources or a server's power state change
+
+    def add(self, server: object):
+        """
+        :param server: server being added to the node (powered off)
+        :return: position of the server in the node
+        """
+        self.servers.append(server)
+        self.entries.append(None)
+        if len(self.servers) > self.size:
+            self.size *= 2
+            self.max_cores = [-math.inf] * 2 * self.size
+            self.max_memory = [-math.inf] * 2 * self.size
+            for position, entry in enumerate(self.entries):
+                if entry is not None:
+                    self._set_leaf(position, entry[0], entry[1])
+        return len(self.servers) - 1
+
+    def update(self, server: object):
+        """
+        :param server: server whose power state or free resources changed
+        :return: None
+        """
+        """Only records the change, so servers switched off and back on within a tick cost nothing when queried"""
+        self.changed.add(server.position)
+
+    def _apply_changes(self):
+        for position in self.changed:
+            server = self.servers[position]
+            entry = (server.cores, server.memory, position) if server.on else None
+            if entry == self.entries[position]:
+                continue
+            if self.entries[position] is not None:
+                self._remove_free(*self.entries[position])
+            if entry is None:
+                self._set_leaf(position, -math.inf, -math.inf)
+            else:
+                self._add_free(*entry)
+                self._set_leaf(position, entry[0], entry[1])
+            self.entries[position] = entry
+            self.version += 1
+        self.changed.clear()
+
+    def _add_free(self, cores: float, memory: float, position: int):
+        servers = self.free.get(cores)
+        if servers is None:
+            servers = self.free[cores] = []
+            bisect.insort(self.free_cores, cores)
+        bisect.insort(servers, (memory, position))
+
+    def _remove_free(self, cores: float, memory: float, position: int):
+        servers = self.free[cores]
+        del servers[bisect.bisect_left(servers, (memory, position))]
+        if not servers:
+            del self.free[cores]
+            del self.free_cores[bisect.bisect_left(self.free_cores, cores)]
+
+    def get_version(self):
+        """
+        :return: number that stays the same for as long as every server of the node is in the same state
+        """
+        if self.changed:
+            self._apply_changes()
+        return self.version
+
+    def _set_leaf(self, position: int, cores: float, memory: float):
+        tree = position + self.size
+        self.max_cores[tree], self.max_memory[tree] = cores, memory
+        tree //= 2
+        while tree:
+            self.max_cores[tree] = max(self.max_cores[2 * tree], self.max_cores[2 * tree + 1])
+            self.max_memory[tree] = max(self.max_memory[2 * tree], self.max_memory[2 * tree + 1])
+            tree //= 2
+
+    def fits_any(self, cores: float, memory: float):
+        """Quick check of whether any powered server could have cores free cores and memory free memory"""
+        if self.changed:
+            self._apply_changes()
+        return self.max_cores[1] >= cores and self.max_memory[1] >= memory
+
+    def get_first_fit(self, cores: float, memory: float, start: int = 0):
+        """
+        :param cores: free cores needed (ANY for any amount)
+        :param memory: free memory needed, in MB (ANY for any amount)
+        :param start: position of the first server to consider
+        :return: first powered server at or after start with enough free resources (None if none)
+        """
+        """Walks down the segment tree, skipping every range whose maximums are too small"""
+        if self.changed:
+            self._apply_changes()
+        position = self._find(1, 0, self.size, cores, memory, start)
+        return None if position is None else self.servers[position]
+
+    def _find(self, tree: int, low: int, high: int, cores: float, memory: float, start: int):
+        if high <= start or self.max_cores[tree] < cores or self.max_memory[tree] < memory:
+            return None
+        if high - low == 1:
+            return low
+        middle = (low + high) // 2
+        position = self._find(2 * tree, low, middle, cores, memory, start)
+        if position is None:
+            position = self._find(2 * tree + 1, middle, high, cores, memory, start)
+        return position
+
+    def get_best_fit(self, cores: float, memory: float):
+        """
+        :param cores: free cores needed (ANY for any amount)
+        :param memory: free memory needed, in MB (ANY for any amount)
+        :return: (free cores, free memory, position) of the powered server that would have the fewest free cores left,
+                 then the least free memory, then the lowest position (None if no server has enough)
+        """
+        """
+        Goes through the free core counts from the smallest that is enough, and bisects the servers with that count on
+        memory, so servers with enough cores but too little memory are skipped a count at a time. O(d log n) for d
+        distinct free core counts of at least cores, which is at most cores per server + 1 without degradable
+        applications.
+        """
+        if self.changed:
+            self._apply_changes()
+        free_cores = self.free_cores
+        for position in range(bisect.bisect_left(free_cores, cores), len(free_cores)):
+            servers = self.free[free_cores[position]]
+            index = bisect.bisect_left(servers, (memory, -1))
+            if index < len(servers):
+                return (free_cores[position],) + servers[index]
+        return None
@@ -1,61 +1,99 @@
 import os
 import csv
-import time
-
-
-def get_max_values():
-    # determine scaling
-    lst = []
-    for file in os.listdir('Irradiance Lists'):
-        with open(f'Irradiance Lists/{file}', 'r') as f:
-            lst2 = []
-            reader = csv.reader(f, delimiter=',')
-            next(reader)
-            next(reader)
-            for line in reader:
-                if line != '':
-                    for i in range(1):
-                        try:
-                            if float(line[1]) < 0:
-                                lst2.append(float(0))
-                            else:
-                                lst2.append(float(line[1]))
-                        except ValueError:
-                            lst2.append(0)
-                        if len(lst2) > 50000000:
-                            break
-            lst.append((file, lst2))
-
-    max_list = []
-    for i in lst:
-        max_list.append((i[0], max(i[1][0:864])))
-    for index, value in enumerate(max_list):
-        print(f'File: {value[0]}, Value: {value[1]}')
-
-
-def compile_irradiances():
-    data = []
-    for file in os.listdir('Irradiance Lists'):
-        with open(f'Irradiance Lists/{file}', 'r') as f:
-            current_data = []
-            reader = csv.reader(f, delimiter=',')
-            next(reader)
-            next(reader)
-            for index, line in enumerate(reader):
-                for _ in range(60):  # minute data
-                    if line[1] == '' or float(line[1]) < 0:
-                        current_data.append(float(0))
-                    else:
-                        current_data.append(float(line[1]))
-        data.append(current_data)
-
-    final_data = []
-    min_len = min(map(len, data))
-
-    for index in range(min_len):
-        final_data.append([location[index] for location in data])
-
-    with open('irradiance.txt', 'w', newline='') as file:
-        wr = csv.writer(file)
-        file.write('irradiances\n')
-        wr.writerows(final_data)
\ No newline at end of file
+import json
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from irradiance_store import *
+
+CACHE_DIRECTORY = '.irradiance_cache'  # parsed site columns, reused until their source file changes
+
+
+def parse_irradiance_file(directory: str, file: str):
+    """
+    :param directory: folder containing the site files
+    :param file: site file (latitude,longitude line, header line, then one timestamp,irradiance line per minute)
+    :return: dictionary describing the parsed column, which is saved to the cache
+    """
+    """Streams one site file into a float32 column at minute resolution (negative or missing values become 0)"""
+    values = array('f')
+    max_value = 0.0
+    with open(f'{directory}/{file}', 'r') as f:
+        coords = f.readline().rstrip().split(',')
+        reader = csv.reader(f, delimiter=',')
+        next(reader)
+        for line in reader:
+            if not line:
+                continue
+            try:
+                value = max(float(line[1]), 0.0)
+            except ValueError:
+                value = 0.0
+            if len(values) < 864:
+                max_value = max(max_value, value)
+            values.append(value)
+    np.save(f'{CACHE_DIRECTORY}/{file}.npy', np.frombuffer(values, dtype=np.float32))
+    stat = os.stat(f'{directory}/{file}')
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'length': len(values), 'max': max_value,
+            'coords': [coords[0], coords[1]]}
+
+
+def get_max_values(max_values: list = None):
+    """
+    :param max_values: (file, max value) pairs returned by compile_irradiances
+    :return: None
+    """
+    """Prints the largest irradiance within the first 864 minutes of each site (used to determine scaling)"""
+    if max_values is None:
+        max_values = compile_irradiances()
+    for file, value in max_values:
+        print(f'File: {file}, Value: {value}')
+
+
+def compile_irradiances(directory: str = 'Irradiance Lists', output: str = 'irradiance.bin'):
+    """
+    :param directory: folder containing one irradiance file per site
+    :param output: irradiance store to write
+    :return: list of (file, max value) pairs
+    """
+    """
+    Combines the site files into a single irradiance store, one column per site in os.listdir order.
+    Columns stay at minute resolution; the store maps simulated second t to minute (t + 1) // 60.
+    Only files that changed since the previous compilation are parsed again, in parallel.
+    """
+    os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+    manifest_path = f'{CACHE_DIRECTORY}/manifest.json'
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+
+    files = os.listdir(directory)
+    changed = []
+    for file in files:
+        stat = os.stat(f'{directory}/{file}')
+        cached = manifest.get(file)
+        if cached is None or cached['mtime_ns'] != stat.st_mtime_ns or cached['size'] != stat.st_size \
+                or not os.path.exists(f'{CACHE_DIRECTORY}/{file}.npy'):
+            changed.append(file)
+
+    if changed:
+        with ProcessPoolExecutor() as executor:
+            for file, info in zip(changed, executor.map(parse_irradiance_file, [directory] * len(changed), changed)):
+                manifest[file] = info
+        manifest = {file: manifest[file] for file in files}
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
+
+    # every column is cut to the shortest site; the first second is skipped to line up with irradiance.txt
+    rows = min((manifest[file]['length'] for file in files), default=0)
+    writer = IrradianceStoreWriter(output, rows, len(files), resolution=60, offset=1,
+                                   coords=[manifest[file]['coords'] for file in files],
+                                   source={'directory': directory, 'files': files})
+    for index, file in enumerate(files):
+        writer.data[:, index] = np.load(f'{CACHE_DIRECTORY}/{file}.npy', mmap_mode='r')[:rows]
+    writer.finish()
+    return [(file, manifest[file]['max']) for file in files]
@@ -0,0 +1,107 @@
+import functools
+import math
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+MAX_MEMORY_CLASSES = 16  # most common memory sizes get a precomputed delay table, the rest go through an LRU
+MAX_OTHER_DELAYS = 4096  # delays of other memory sizes each model keeps
+
+
+@functools.lru_cache(maxsize=None)
+def compile_delay_function(equation: str):
+    """
+    :param equation: 'Delay Function' from config.txt, in terms of x (distance in km)
+    :return: callable computing the transfer rate (Mb/s) for a distance or a NumPy array of distances
+    """
+    """Compiles the delay function once instead of substituting and evaluating the string on every call"""
+    return eval(compile(f'lambda x: {equation.strip()}', '<Delay Function>', 'eval'), {'math': math, 'np': np})
+
+
+def get_delays(rates: np.ndarray, memories: np.ndarray):
+    """
+    :param rates: transfer rates, in Mb/s
+    :param memories: memory sizes, in MB
+    :return: integer delays in seconds, shape rates.shape + memories.shape
+    """
+    """ceil(memory / rate) for every rate and memory size; a rate of 0 or infinity gives no delay"""
+    memories = np.asarray(memories, dtype=np.float64) * 8  # convert MB to Mb
+    rates = np.asarray(rates, dtype=np.float64)[..., None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delays = np.ceil(memories / rates)
+    return np.where((rates == 0) | ~np.isfinite(rates), 0, delays).astype(np.int64)
+
+
+def get_rates(function: object, distances: np.ndarray):
+    """
+    :param function: compiled delay function
+    :param distances: array of distances, in km
+    :return: transfer rates, in Mb/s (infinite where the function divides by zero, e.g. a distance of 0)
+    """
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        return np.broadcast_to(np.asarray(function(np.asarray(distances, dtype=np.float64)), dtype=np.float64),
+                               np.shape(distances))
+
+
+class DelayModel:
+    def __init__(self, equation: str, distances: np.ndarray, memory_counts: dict, rates: dict = None):
+        """
+        :param equation: 'Delay Function' from config.txt, in terms of x (distance in km)
+        :param distances: symmetric N x N array of distances between nodes, in km
+        :param memory_counts: applications of each memory size (used to pick the memory classes to precompute)
+        :param rates: precomputed {'exact': rates, 'rounded': rates} arrays (see build_delay_models)
+        """
+        """Migration delays between every pair of nodes for the most common memory sizes"""
+        self.equation = equation
+        self.function = compile_delay_function(equation)
+        self.distances = np.asarray(distances, dtype=np.float64)
+        if rates is None:
+            rates = {'exact': get_rates(self.function, self.distances),
+                     'rounded': get_rates(self.function, np.ceil(self.distances))}
+        self.rates = rates
+        self.memory_classes = {memory: index for index, (memory, _) in
+                               enumerate(Counter(memory_counts).most_common(MAX_MEMORY_CLASSES))}
+        memory_classes = np.array(list(self.memory_classes), dtype=np.float64)
+        # (source, destination, memory class) tables of delays
+        self.tables = {key: get_delays(value, memory_classes) for key, value in self.rates.items()}
+        # (rate, memory): delay, for memory sizes outside the memory classes, least recently used first
+        self.other_delays = OrderedDict()
+
+    def get_delay(self, source: int, destination: int, memory: int, rounded: bool = False):
+        """
+        :param source: index of the node the application is leaving
+        :param destination: index of the node the application is moving to
+        :param memory: memory of the application, in MB
+        :param rounded: round the distance up to the next km first
+        :return: delay in seconds
+        """
+        key = 'rounded' if rounded else 'exact'
+        memory_class = self.memory_classes.get(memory)
+        if memory_class is not None:
+            return self.tables[key].item(source, destination, memory_class)
+        rate = self.rates[key].item(source, destination)
+        delay = self.other_delays.get((rate, memory))
+        if delay is None:
+            delay = self.other_delays[rate, memory] = get_delays(rate, memory).item()
+            if len(self.other_delays) > MAX_OTHER_DELAYS:
+                self.other_delays.popitem(last=False)
+        else:
+            self.other_delays.move_to_end((rate, memory))
+        return delay
+
+
+def build_delay_models(equations: list, distances: np.ndarray, memory_counts: dict):
+    """
+    :param equations: delay functions to sweep over
+    :param distances: symmetric N x N array of distances between nodes, in km
+    :param memory_counts: applications of each memory size
+    :return: dictionary of equation:DelayModel
+    """
+    """Builds the delay tables of a whole sweep of delay functions in one vectorized pass over the distances"""
+    distances = np.asarray(distances, dtype=np.float64)
+    stacked = np.stack([distances, np.ceil(distances)])
+    models = {}
+    for equation in equations:
+        exact, rounded = get_rates(compile_delay_function(equation), stacked)
+        models[equation] = DelayModel(equation, distances, memory_counts, {'exact': exact, 'rounded': rounded})
+    return models
@@ -0,0 +1,107 @@
+import hashlib
+import os
+
+import numpy as np
+from geopy.distance import geodesic as gd
+
+CACHE_DIRECTORY = '.distance_cache'  # distance matrices, keyed by a hash of the node coordinates
+
+# WGS-84, the ellipsoid geopy's geodesic uses by default
+EQUATORIAL_RADIUS = 6378137.0
+FLATTENING = 1 / 298.257223563
+POLAR_RADIUS = (1 - FLATTENING) * EQUATORIAL_RADIUS
+
+
+def get_vincenty_distances(lat1: np.ndarray, long1: np.ndarray, lat2: np.ndarray, long2: np.ndarray):
+    """
+    :param lat1: latitudes of the first points, in degrees
+    :param long1: longitudes of the first points, in degrees
+    :param lat2: latitudes of the second points, in degrees
+    :param long2: longitudes of the second points, in degrees
+    :return: ellipsoidal distances in km (NaN where the iteration does not converge, e.g. nearly antipodal points)
+    """
+    """Vectorized Vincenty inverse formula"""
+    reduced_lat1 = np.arctan((1 - FLATTENING) * np.tan(np.radians(lat1)))
+    reduced_lat2 = np.arctan((1 - FLATTENING) * np.tan(np.radians(lat2)))
+    sin_u1, cos_u1 = np.sin(reduced_lat1), np.cos(reduced_lat1)
+    sin_u2, cos_u2 = np.sin(reduced_lat2), np.cos(reduced_lat2)
+    longitude_difference = np.radians(np.asarray(long2, dtype=np.float64) - long1)
+
+    def iterate(lam: np.ndarray, pairs: np.ndarray):
+        # one step of Vincenty's iteration for the given pairs
+        sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+        sin_sigma = np.hypot(cos_u2[pairs] * sin_lam, cos_u1[pairs] * sin_u2[pairs]
+                             - sin_u1[pairs] * cos_u2[pairs] * cos_lam)
+        cos_sigma = sin_u1[pairs] * sin_u2[pairs] + cos_u1[pairs] * cos_u2[pairs] * cos_lam
+        sigma = np.arctan2(sin_sigma, cos_sigma)
+        sin_alpha = np.where(sin_sigma == 0, 0, cos_u1[pairs] * cos_u2[pairs] * sin_lam / sin_sigma)
+        cos2_alpha = 1 - sin_alpha ** 2
+        cos_2sigma_m = np.where(cos2_alpha == 0, 0, cos_sigma - 2 * sin_u1[pairs] * sin_u2[pairs] / cos2_alpha)
+        c = FLATTENING / 16 * cos2_alpha * (4 + FLATTENING * (4 - 3 * cos2_alpha))
+        new_lam = longitude_difference[pairs] + (1 - c) * FLATTENING * sin_alpha * (
+                sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+        return new_lam, sin_sigma, cos_sigma, sigma, cos2_alpha, cos_2sigma_m
+
+    lam = longitude_difference.copy()
+    converged = np.zeros(lam.shape, dtype=bool)
+    active = np.arange(lam.size)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for _ in range(200):  # only pairs that have not converged yet keep iterating
+            new_lam = iterate(lam[active], active)[0]
+            done = np.abs(new_lam - lam[active]) < 1e-12
+            lam[active] = new_lam
+            converged[active[done]] = True
+            active = active[~done]
+            if not active.size:
+                break
+
+        pairs = np.arange(lam.size)
+        _, sin_sigma, cos_sigma, sigma, cos2_alpha, cos_2sigma_m = iterate(lam, pairs)
+        u2 = cos2_alpha * (EQUATORIAL_RADIUS ** 2 - POLAR_RADIUS ** 2) / POLAR_RADIUS ** 2
+        a = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        b = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = b * sin_sigma * (cos_2sigma_m + b / 4 * (
+                cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+                - b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+        distances = POLAR_RADIUS * a * (sigma - delta_sigma) / 1000
+    return np.where(converged, distances, np.nan)
+
+
+def get_coordinate_hash(coords: np.ndarray):
+    return hashlib.sha1(np.ascontiguousarray(coords, dtype=np.float64).tobytes()).hexdigest()
+
+
+def get_distance_matrix(coords: list, cache: bool = True):
+    """
+    :param coords: (latitude, longitude) of each node, ordered by EdgeSystem.index
+    :param cache: reuse (and save) the matrix in CACHE_DIRECTORY
+    :return: symmetric N x N array of distances in km
+    """
+    """Geodesic distance between every pair of nodes"""
+    coords = np.array([(float(lat), float(long)) for lat, long in coords], dtype=np.float64).reshape(-1, 2)
+    path = f'{CACHE_DIRECTORY}/{get_coordinate_hash(coords)}.npy'
+    if cache and os.path.exists(path):
+        return np.load(path)
+
+    first, second = np.triu_indices(len(coords), k=1)
+    pair_distances = get_vincenty_distances(coords[first, 0], coords[first, 1], coords[second, 0], coords[second, 1])
+    for pair in np.flatnonzero(np.isnan(pair_distances)):  # fall back to geopy where Vincenty does not converge
+        pair_distances[pair] = gd(tuple(coords[first[pair]]), tuple(coords[second[pair]])).km
+    distances = np.zeros((len(coords), len(coords)))
+    distances[first, second] = distances[second, first] = pair_distances
+
+    if cache:
+        os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+        np.save(path, distances)
+    return distances
+
+
+def get_nearest_neighbours(distances: np.ndarray):
+    """
+    :param distances: symmetric N x N array of distances
+    :return: index of the closest other node for every node (itself if it is the only node)
+    """
+    if len(distances) < 2:
+        return np.arange(len(distances))
+    masked = distances + np.diag(np.full(len(distances), np.inf))
+    return np.argmin(masked, axis=1)
@@ -1,11 +1,42 @@
-from __main__ import *
+import heapq
+import math
+
+import numpy as np
+
+from capacity_index import *
+
+NONE = -1  # stands for None in the integer columns of an ApplicationTable
+DROP_COMPLETED = 4096  # completed rows an ApplicationTable holds on to before dropping them
+
+
+class PowerState:
+    def __init__(self, batteries: bool = False):
+        """
+        :param batteries: whether the nodes have batteries (their charge changes how many servers can run every tick)
+        """
+        """
+        Counts kept up to date by the servers of every node sharing it, and the nodes shutdown_servers has to decide
+        again because something about their servers changed since it last did
+        """
+        self.batteries = batteries
+        self.running_applications = 0  # applications running on any server
+        self.powered_servers = 0  # servers switched on
+        self.dirty = set()  # indexes of nodes whose servers started, stopped or were switched on or off
+        self.servers_allowed = {}  # node index: servers its power allowed when shutdown_servers last looked at it
+        self.capacity_changes = []  # heap of (time the capacity of a node changes, node index), without batteries
 
 
 class EdgeSystem:
-    def __init__(self, pv_efficiency: float, pv_area: float, lat: float, long: float, battery: float, index: int):
+    def __init__(self, pv_efficiency: float, pv_area: float, lat: float, long: float, battery: float, index: int,
+                 power_state: object):
         self.pv_efficiency = pv_efficiency  # between 0 and 1
         self.pv_area = pv_area  # in m^2
         self.servers = []
+        self.capacity_index = CapacityIndex()  # free resources of the powered servers
+        self.free_cores = np.zeros(0)  # free cores of each server, by position
+        self.free_memory = np.zeros(0)  # free memory of each server, by position, in MB
+        self._free_cores_view = memoryview(self.free_cores)
+        self._free_memory_view = memoryview(self.free_memory)
         self.queue = []
         self.lat = lat
         self.long = long
@@ -13,21 +44,74 @@ class EdgeSystem:
         self.max_battery = battery
         self.applications_completed = 0
         self.index = index
+        self.power_state = power_state  # PowerState of the simulation, shared by every node
+
+    def __getstate__(self):
+        # memoryviews cannot be pickled; they are rebuilt from the arrays
+        state = self.__dict__.copy()
+        del state['_free_cores_view'], state['_free_memory_view']
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._free_cores_view = memoryview(self.free_cores)
+        self._free_memory_view = memoryview(self.free_memory)
 
     def get_server_object(self, cores: int, memory: int, edge: object):
         return self.Server(cores, memory, edge)
 
+    def add_server_resources(self, cores: int, memory: float):
+        self.free_cores = np.append(self.free_cores, cores)
+        self.free_memory = np.append(self.free_memory, memory)
+        self._free_cores_view = memoryview(self.free_cores)
+        self._free_memory_view = memoryview(self.free_memory)
+        return len(self.free_cores) - 1
+
     def get_power_generated(self, irradiance: float):
         # P_n = eta * G_T * A_n
         return self.pv_efficiency * irradiance * self.pv_area
 
     class Server:
         def __init__(self, cores: int, memory: float, edge: object):
-            self.cores = cores  # per server
-            self.memory = memory  # per server, in MB
-            self.on = False
+            self._on = False
             self.applications_running = []
             self.parent = edge
+            self.position = edge.capacity_index.add(self)  # index of the server within its node
+            edge.add_server_resources(cores, memory)  # free cores and memory live in the node's arrays
+
+        @property
+        def cores(self):
+            return self.parent._free_cores_view[self.position]
+
+        @cores.setter
+        def cores(self, cores: float):
+            self.parent._free_cores_view[self.position] = cores
+
+        @property
+        def memory(self):
+            return self.parent._free_memory_view[self.position]
+
+        @memory.setter
+        def memory(self, memory: float):
+            self.parent._free_memory_view[self.position] = memory
+
+        @property
+        def on(self):
+            return self._on
+
+        @on.setter
+        def on(self, on: bool):
+            if on != self._on:
+                self._on = on
+                self.parent.capacity_index.update(self)
+                power_state = self.parent.power_state
+                power_state.powered_servers += 1 if on else -1
+                power_state.dirty.add(self.parent.index)
+                for application in self.applications_running:  # applications only make progress while powered
+                    if on:
+                        application.table.start_running(application.id)
+                    else:
+                        application.table.stop_running(application.id)
 
         def update_resources(self, decision: str, app: object):
             if decision == 'restore':
@@ -36,27 +120,287 @@ class EdgeSystem:
             if decision == 'reduce':
                 self.cores -= app.cores  # cores available increases
                 self.memory -= app.memory  # memory available increases
+            self.parent.capacity_index.update(self)
 
         def start_application(self, application: object):
             self.update_resources('reduce', application)
             self.applications_running.append(application)
+            self.parent.power_state.running_applications += 1
+            self.parent.power_state.dirty.add(self.parent.index)
             application.parent = self
+            application.table.start_running(application.id)  # schedules its completion
 
         def stop_application(self, application: object):
             self.update_resources('restore', application)
             self.applications_running.remove(application)  # delete from applications list if completed
+            self.parent.power_state.running_applications -= 1
+            self.parent.power_state.dirty.add(self.parent.index)
+            application.table.stop_running(application.id)
+
+
+class ApplicationTable:
+    COLUMNS = {'runtime': np.int64, 'cores': np.float64, 'original_cores': np.int64, 'memory': np.int64,
+               'time_left': np.float64, 'start_time': np.int64, 'end_time': np.int64, 'overhead': np.int64,
+               'delay': np.int64, 'delay_start': np.int64, 'parent': np.int32, 'prev_parent': np.int32,
+               'run_start': np.int64, 'run': np.int64, 'arrival': np.int64}
+
+    def __init__(self, servers: list, runtimes: list = (), cores: list = (), memories: list = ()):
+        """
+        :param servers: every server in the edge computing system (parent and prev_parent are indexes into it)
+        :param runtimes: runtime of each application, in seconds
+        :param cores: cores each application asks for
+        :param memories: memory each application needs, in MB
+        """
+        """
+        Struct-of-arrays storage of the applications that arrived and have not completed yet; Application objects are
+        light views of one row. Completed applications only count towards the totals, and their rows are dropped once
+        there are enough of them (see drop_completed).
+        """
+        self.servers = list(servers)
+        self.server_ids = {server: index for index, server in enumerate(self.servers)}
+        self.length = 0
+        self.arrived = 0  # applications added so far, including dropped ones
+        self.completed = 0  # applications completed so far
+        self.completed_rows = 0  # rows of completed applications that have not been dropped yet
+        self.total_overhead = 0  # seconds the completed applications spent paused
+        self.total_idle = 0.0  # sum over the completed applications of the share of their time spent paused
+        self.time = 0  # current simulated time (set by complete_applications)
+        self.runs = 0  # runs started so far; a run lasts from start_application to stop_application
+        self.completions = []  # heap of (finish time, run, id), stale once the application's run has changed
+        self.columns = {name: np.zeros(0, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self.views = {name: memoryview(column) for name, column in self.columns.items()}
+        self.extend(runtimes, cores, memories)
+
+    def __len__(self):
+        return self.length
+
+    def __getstate__(self):
+        # only the filled part of each column is pickled, and memoryviews are rebuilt from the columns
+        state = self.__dict__.copy()
+        state['columns'] = {name: column[:self.length] for name, column in self.columns.items()}
+        del state['views']
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.views = {name: memoryview(column) for name, column in self.columns.items()}
+
+    def __getitem__(self, index: int):
+        return Application(self, index)
+
+    def __getattr__(self, name: str):
+        # table.time_left etc. give the filled part of a column, for vectorized updates
+        try:
+            return self.__dict__['columns'][name][:self.length]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def extend(self, runtimes: list, cores: list, memories: list):
+        """
+        :param runtimes: runtime of each application, in seconds
+        :param cores: cores each application asks for
+        :param memories: memory each application needs, in MB
+        :return: range of the new application ids
+        """
+        runtimes = np.asarray(runtimes, dtype=np.int64)
+        start, stop = self.length, self.length + len(runtimes)
+        if stop > len(self.columns['runtime']):  # grow every column geometrically
+            capacity = max(stop, 2 * len(self.columns['runtime']))
+            for name, column in self.columns.items():
+                self.columns[name] = np.resize(column, capacity)
+            self.views = {name: memoryview(column) for name, column in self.columns.items()}
+        for name in ('runtime', 'time_left'):
+            self.columns[name][start:stop] = runtimes
+        for name in ('cores', 'original_cores'):
+            self.columns[name][start:stop] = cores
+        self.columns['memory'][start:stop] = memories
+        self.columns['overhead'][start:stop] = 0
+        self.columns['arrival'][start:stop] = np.arange(self.arrived, self.arrived + stop - start)
+        self.arrived += stop - start
+        for name in ('start_time', 'end_time', 'delay', 'delay_start', 'parent', 'prev_parent', 'run_start', 'run'):
+            self.columns[name][start:stop] = NONE
+        self.length = stop
+        return range(start, stop)
+
+    def get_time_left(self, index: int):
+        # time_left only holds the value from the start of the current run while the application runs
+        run_start = self.views['run_start'][index]
+        if run_start == NONE:
+            return self.views['time_left'][index]
+        return self.views['time_left'][index] - (self.time - run_start)
+
+    def set_time_left(self, index: int, time_left: float):
+        if self.views['run_start'][index] == NONE:
+            self.views['time_left'][index] = time_left
+        else:  # start a new run from the current time, so the old completion is forgotten
+            self.views['run_start'][index] = NONE
+            self.views['time_left'][index] = time_left
+            self.start_running(index)
+
+    def get_delay(self, index: int):
+        # the delay column holds the delay as chosen; it counts down one second per tick from delay_start
+        delay = self.views['delay'][index]
+        if delay == NONE:
+            return None
+        return max(0, delay - (self.time - self.views['delay_start'][index]))
+
+    def set_delay(self, index: int, delay: int):
+        self.views['delay'][index] = NONE if delay is None else delay
+        self.views['delay_start'][index] = self.time
+
+    def start_running(self, index: int):
+        """
+        :param index: id of an application that just started or resumed on a server
+        :return: None
+        """
+        """
+        Schedules the completion of the application. Each tick takes one second off time_left and the application
+        completes on the first later tick at which nothing is left.
+        """
+        self.runs += 1
+        self.views['run'][index] = self.runs
+        self.views['run_start'][index] = self.time
+        finish_time = self.time + max(1, math.ceil(self.views['time_left'][index]))
+        heapq.heappush(self.completions, (finish_time, self.runs, index))
+
+    def stop_running(self, index: int):
+        # freeze time_left (the scheduled completion becomes stale)
+        self.views['time_left'][index] = self.get_time_left(index)
+        self.views['run_start'][index] = NONE
+        self.views['run'][index] = NONE
+
+    def get_next_completion(self):
+        """
+        :return: time of the next completion (None if no application is running)
+        """
+        completions = self.completions
+        while completions and self.views['run'][completions[0][2]] != completions[0][1]:
+            heapq.heappop(completions)  # stale
+        return completions[0][0] if completions else None
+
+    def pop_completed(self, processing_time: int):
+        """
+        :param processing_time: current time
+        :return: applications whose run ends by processing_time, in the order of their servers and then of their
+                 starts (the order in which a scan of every server's applications_running would find them)
+        """
+        completed = []
+        while self.get_next_completion() is not None and self.completions[0][0] <= processing_time:
+            _, run, index = heapq.heappop(self.completions)
+            completed.append((self.views['parent'][index], run, index))
+        return [self[index] for _, _, index in sorted(completed)]
+
+    def complete(self, index: int, processing_time: int):
+        """
+        :param index: id of an application that just completed
+        :param processing_time: current time
+        :return: None
+        """
+        """Adds the application to the running totals, after which its row is no longer needed"""
+        self.views['end_time'][index] = processing_time
+        overhead = self.views['overhead'][index]
+        self.completed += 1
+        self.completed_rows += 1
+        self.total_overhead += overhead
+        self.total_idle += overhead / (processing_time - self.views['start_time'][index])
+
+    def drop_completed(self):
+        """
+        :return: new id of every old id (NONE for dropped rows), or None if too few rows are completed to bother
+        """
+        """
+        Moves the rows of the applications still in the simulation to the front, in the same order, so ids keep
+        following arrival order. Running applications are renumbered here; the queues holding ids are renumbered by
+        their owners with the returned mapping.
+        """
+        if self.completed_rows < max(DROP_COMPLETED, self.length // 2):
+            return None
+        kept = np.flatnonzero(self.end_time == NONE)
+        mapping = np.full(self.length, NONE, dtype=np.int64)
+        mapping[kept] = np.arange(len(kept))
+        for column in self.columns.values():
+            column[:len(kept)] = column[kept]
+        self.length = len(kept)
+        self.completed_rows = 0
+        self.completions = [(finish_time, run, int(mapping[index])) for finish_time, run, index in self.completions
+                            if mapping[index] != NONE]
+        heapq.heapify(self.completions)
+        for server in self.servers:
+            for application in server.applications_running:
+                application.id = int(mapping[application.id])
+        return mapping
+
+
+def _column(name: str):
+    # property reading and writing one cell of an ApplicationTable column
+    def get(self):
+        return self.table.views[name][self.id]
+
+    def set(self, value):
+        self.table.views[name][self.id] = value
+    return property(get, set)
+
+
+def _optional_column(name: str):
+    # same, with NONE standing for None
+    def get(self):
+        value = self.table.views[name][self.id]
+        return None if value == NONE else value
+
+    def set(self, value):
+        self.table.views[name][self.id] = NONE if value is None else value
+    return property(get, set)
+
+
+def _server_column(name: str):
+    # same, storing a server as its index in ApplicationTable.servers
+    def get(self):
+        value = self.table.views[name][self.id]
+        return None if value == NONE else self.table.servers[value]
+
+    def set(self, server: object):
+        self.table.views[name][self.id] = NONE if server is None else self.table.server_ids[server]
+    return property(get, set)
 
 
 class Application:
-    def __init__(self, runtime: int, cores: int, memory: int):
-        self.runtime = runtime
-        self.cores = cores
-        self.original_cores = cores
-        self.memory = memory
-        self.time_left = runtime
-        self.prev_parent = None
-        self.parent = None
-        self.delay = None
-        self.overhead = 0
-        self.start_time = None
-        self.end_time = None
\ No newline at end of file
+    __slots__ = ('table', 'id')
+
+    def __init__(self, table: object, index: int):
+        self.table = table
+        self.id = index
+
+    def __eq__(self, other: object):
+        return isinstance(other, Application) and self.id == other.id and self.table is other.table
+
+    def __hash__(self):
+        return self.id
+
+    def __repr__(self):
+        return f'Application {self.table.views["arrival"][self.id]}'
+
+    runtime = _column('runtime')
+    cores = _column('cores')
+    original_cores = _column('original_cores')
+    memory = _column('memory')
+    overhead = _column('overhead')
+    start_time = _optional_column('start_time')
+    end_time = _optional_column('end_time')
+    parent = _server_column('parent')
+    prev_parent = _server_column('prev_parent')
+
+    @property
+    def delay(self):
+        return self.table.get_delay(self.id)
+
+    @delay.setter
+    def delay(self, delay: int):
+        self.table.set_delay(self.id, delay)
+
+    @property
+    def time_left(self):
+        return self.table.get_time_left(self.id)
+
+    @time_left.setter
+    def time_left(self, time_left: float):
+        self.table.set_time_left(self.id, time_left)
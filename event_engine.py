@@ -0,0 +1,147 @@
+import math
+
+import numpy as np
+
+
+def get_state_signature(edge_computing_systems: list, applications: object, partially_completed_applications: object):
+    """
+    :param edge_computing_systems: list of nodes
+    :param applications: PendingQueue of applications that have not started yet
+    :param partially_completed_applications: PausedQueue of applications that have been paused
+    :return: tuple describing the discrete state of the simulation
+    """
+    """Fingerprint of everything a tick can change besides counters (time left, overhead, delay, battery)"""
+    servers = tuple((server.on, server.cores, server.memory, len(server.applications_running))
+                    for node in edge_computing_systems for server in node.servers)
+    undecided = len(partially_completed_applications.undecided)
+    return servers, len(applications), len(partially_completed_applications), undecided
+
+
+def get_servers_allowed(edge_computing_systems: list, power_per_server: float, power_timeline: object,
+                        processing_time: int):
+    """
+    :param edge_computing_systems: list of nodes
+    :param power_per_server: power that each server needs to operate, in W
+    :param power_timeline: PowerTimeline with the power generated by each node
+    :param processing_time: simulated time, in seconds
+    :return: list with the number of servers shutdown_servers will leave powered on each node
+    """
+    """Mirrors the capacity decision made by shutdown_servers, clipped to the servers each node actually has"""
+    servers_allowed = []
+    for node in edge_computing_systems:
+        if node.current_battery == 0:  # solar power alone, already worked out by the timeline
+            servers_allowed.append(power_timeline.get_capacity(processing_time, node.index))
+            continue
+        power = power_timeline.get_power(processing_time, node.index)
+        most_servers_on = math.floor((power + node.current_battery) / power_per_server)
+        servers_allowed.append(min(max(most_servers_on, 0), len(node.servers)))
+    return servers_allowed
+
+
+def advance_to_next_event(edge_computing_systems: list, application_table: object,
+                          partially_completed_applications: object, power_timeline: object, power_per_server: float,
+                          battery: float, servers_allowed: list, processing_time: int, last_time: int,
+                          next_arrival: int = None):
+    """
+    :param edge_computing_systems: list of nodes
+    :param application_table: ApplicationTable holding every application
+    :param partially_completed_applications: PausedQueue of applications that have been paused
+    :param power_timeline: PowerTimeline with the power generated by each node
+    :param power_per_server: power that each server needs to operate, in W
+    :param battery: battery size of each node (0 disables batteries)
+    :param servers_allowed: servers each node was allowed to power during the tick that just finished
+    :param processing_time: simulated time of the tick that just finished without changing anything
+    :param last_time: latest time the simulation may jump to
+    :param next_arrival: time the next application arrives (None if every application has arrived)
+    :return: time of the next tick that has to be simulated
+    """
+    """
+    Jumps over every tick in which nothing can happen. Those ticks need no bookkeeping: time left, migration delays
+    and overhead are all derived from the times at which applications started, chose a destination or were paused.
+    Events are application completions, migration delays running out, application arrivals, and nodes whose allowed
+    server count changes (from irradiance or from battery charge). Must only be called after a tick that left the
+    state unchanged.
+    """
+    next_event = last_time
+
+    # application completions
+    next_completion = application_table.get_next_completion()
+    if next_completion is not None:
+        next_event = min(next_event, next_completion)
+
+    # migration delays expiring
+    next_wake = partially_completed_applications.get_next_wake()
+    if next_wake is not None:
+        next_event = min(next_event, next_wake)
+
+    # application arrivals
+    if next_arrival is not None:
+        next_event = min(next_event, next_arrival)
+
+    # irradiance / battery capacity changes
+    if battery > 0:
+        # battery charge moves every tick, but only along a straight line within an irradiance row
+        next_event = advance_batteries(edge_computing_systems, power_per_server, power_timeline, servers_allowed,
+                                       processing_time + 1, next_event)
+    else:
+        for node in edge_computing_systems:
+            next_change = power_timeline.get_next_change(processing_time, node.index)
+            if next_change is not None:
+                next_event = min(next_event, next_change)
+
+    return next_event
+
+
+def advance_batteries(edge_computing_systems: list, power_per_server: float, power_timeline: object,
+                      servers_allowed: list, start: int, stop: int):
+    """
+    :param edge_computing_systems: list of nodes
+    :param power_per_server: power each server consumes
+    :param power_timeline: PowerTimeline with the power generated by each node
+    :param servers_allowed: servers each node was allowed to power during the last tick that was simulated
+    :param start: first skipped tick
+    :param stop: tick of the next event that does not come from the batteries
+    :return: first tick from start on at which a node is allowed a different number of servers (stop if none), with
+             every battery charged as update_batteries would have charged it over the ticks before that one
+    """
+    """
+    Power is constant within an irradiance row and the same servers stay on, so each battery gains the same amount
+    every tick of a row until it is full. A row whose batteries cannot change (full and charging, or neither charging
+    nor draining) is passed over in one step. Otherwise the charge at every tick of the row comes from one cumulative
+    sum, which adds the same numbers in the same order as update_batteries, and the first tick whose allowed servers
+    differ is the event.
+    """
+    indexes = [node.index for node in edge_computing_systems]
+    battery = np.array([node.current_battery for node in edge_computing_systems], dtype=np.float64)
+    max_battery = np.array([node.max_battery for node in edge_computing_systems], dtype=np.float64)
+    servers = np.array([len(node.servers) for node in edge_computing_systems])
+    servers_on = np.array([sum(server.on for server in node.servers) for node in edge_computing_systems])
+    servers_allowed = np.asarray(servers_allowed)
+    time = start
+    while time < stop:
+        row_stop = min(power_timeline.get_row_stop(time), stop)
+        power = power_timeline.get_powers(time)[indexes]
+        surplus = power.copy()
+        for server in range(servers_on.max(initial=0)):  # one subtraction per powered server, as update_batteries
+            surplus = np.where(servers_on > server, surplus - power_per_server, surplus)
+
+        if np.all((surplus == 0) | ((surplus > 0) & (battery == max_battery))):
+            charges = battery[None, :]  # the same charge for the whole row
+        else:
+            charges = np.empty((row_stop - time, len(indexes)))
+            charges[0] = battery
+            charges[1:] = surplus
+            # a battery that went over its size stays full, since it only charges from then on
+            charges = np.minimum(np.add.accumulate(charges, axis=0), max_battery)
+        allowed = np.clip(np.floor((power + charges) / power_per_server), 0, servers)
+        changed = np.flatnonzero((allowed != servers_allowed).any(axis=1))
+        if len(changed):
+            time += int(changed[0])
+            battery = charges[changed[0]]
+            break
+        battery = np.minimum(charges[-1] + surplus, max_battery)
+        time = row_stop
+
+    for node, charge in zip(edge_computing_systems, battery.tolist()):
+        node.current_battery = charge
+    return time
@@ -1,27 +1,9 @@
 import matplotlib.pyplot as plt
-import os
-import csv
 import numpy as np
 
+from results_loader import *
 
-class Results:
-    def __init__(self, policy: str, migration_cost: float, battery: float, simulated_time: list, queue: list,
-                 current_paused_applications: list, cumulative_paused_applications: list, current_migrations: list,
-                 cumulative_migrations: list, cumulative_completion: list, completion_rate: list,
-                 completion_location_counts: list):
-        self.policy = policy
-        self.migration_cost = migration_cost
-        self.battery = battery
-        self.simulated = simulated_time
-        self.queue = queue
-        self.current_paused = current_paused_applications
-        self.cumulative_paused = cumulative_paused_applications
-        self.current_migrations = current_migrations
-        self.cumulative_migrations = cumulative_migrations
-        self.cumulative_completion = cumulative_completion
-        self.completion_rate = completion_rate
-        self.total_time = simulated_time[-1]
-        self.location_counts = completion_location_counts
+GRAPH_COLUMNS = {1: [], 2: [], 3: [], 4: [], 5: []}  # time series each graph needs besides the run totals
 
 
 if __name__ == '__main__':
@@ -34,60 +16,7 @@ if __name__ == '__main__':
     print('5. Battery Size vs Simulated Time')
     choice = int(input('Select Graph: '))
 
-    outputs = []
-    for file in os.listdir('Outputs'):
-        simulated_time = []
-        queue = []
-        current_paused_applications = []
-        cumulative_paused_applications = []
-        current_migrations = []
-        cumulative_migrations = []
-        cumulative_completion = []
-        completion_rate = []
-        completion_location_counts = []
-
-        with open(f'Outputs/{file}', 'r') as f:
-            counter = False
-            reader = csv.reader(f, delimiter=':')
-            for index, line in enumerate(reader):
-                if line[0] == 'Policy':
-                    policy = line[1].strip()
-                elif line[0] == 'Cost Multiplier':
-                    migration_cost = float(line[1].strip())
-                elif line[0] == 'Battery Size':
-                    battery = float(line[1].strip())
-                elif line[0] == 'Application Completion Locations':
-                    counter = True
-                elif counter:
-                    if line[0] == '----------------':
-                        counter = False
-                    else:
-                        completion_location_counts.append(int(line[1]))
-                elif index > 30:
-                    break
-
-        with open(f'Outputs/{file}', 'r') as f:
-            reader = csv.reader(f, delimiter=',')
-            start = False
-            for index, line in enumerate(reader):
-                if line[0] == 'Simulated Time':
-                    start = True
-                elif start:
-                    simulated_time.append(int(line[0]))
-                    queue.append(int(line[1]))
-                    current_paused_applications.append(int(line[2]))
-                    cumulative_paused_applications.append(int(line[3]))
-                    current_migrations.append(int(line[4]))
-                    cumulative_migrations.append(int(line[5]))
-                    cumulative_completion.append(int(line[6]))
-                    completion_rate.append(float(line[7]))
-                elif index > 100:
-                    break
-
-        outputs.append(Results(policy, migration_cost, battery, simulated_time, queue, current_paused_applications,
-                               cumulative_paused_applications,
-                               current_migrations, cumulative_migrations, cumulative_completion, completion_rate,
-                               completion_location_counts))
+    outputs = load_outputs('Outputs', GRAPH_COLUMNS.get(choice, []))  # other choices draw nothing, as before
 
     '''for output in outputs:
         print(output.policy, output.total_time, output.battery)'''
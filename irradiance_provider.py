@@ -0,0 +1,168 @@
+import abc
+from collections import OrderedDict
+
+import numpy as np
+
+IRRADIANCE_MODELS = ('file', 'clear-sky')
+FIRST_DAY = 172  # day of the year a clear-sky model starts on
+SOLAR_PEAK = 1000  # clear-sky irradiance with the sun overhead, in W/m^2
+CLOUD_FACTORS = (0.2, 0.5, 0.9, 1.0, 1.0)  # share of the clear-sky irradiance let through, picked at random
+CLOUD_CHANGE = 0.02  # chance per minute that the cloud cover of a node changes
+CACHED_BLOCKS = 4  # days a clear-sky model keeps computed
+
+
+class IrradianceProvider(abc.ABC):
+    def __init__(self, rows: int, num_nodes: int, resolution: int = 1, offset: int = 0, coords: list = None,
+                 block_rows: int = 65536):
+        """
+        :param rows: number of time periods
+        :param num_nodes: number of nodes (columns)
+        :param resolution: simulated seconds covered by each row
+        :param offset: simulated second t is in row (t + offset) // resolution
+        :param coords: (latitude, longitude) of each node
+        :param block_rows: rows handed out at a time by iter_blocks
+        """
+        """
+        Irradiance of every node over time, indexed as irradiance_list[processing_time][node index]. Subclasses
+        only provide get_rows; an irradiance store is one, an analytic model computing rows on demand is another.
+        """
+        self.rows = rows
+        self.num_nodes = num_nodes
+        self.resolution = resolution
+        self.offset = offset
+        self.coords = coords if coords is not None else []
+        self.block_rows = block_rows
+        self.length = max(rows * resolution - offset, 0)
+        self._row = None
+        self._row_values = None
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, processing_time: int):
+        # irradiance_list[processing_time][node.index]
+        row = (processing_time + self.offset) // self.resolution
+        if row != self._row:
+            if not 0 <= processing_time < self.length:
+                raise IndexError('irradiance index out of range')
+            self._row_values = self.get_rows(row, row + 1)[0].tolist()
+            self._row = row
+        return self._row_values
+
+    def __iter__(self):
+        rows, first_row = [], 0
+        for processing_time in range(self.length):
+            row = (processing_time + self.offset) // self.resolution
+            if row - first_row >= len(rows):
+                first_row = row
+                rows = self.get_rows(row, row + 4096).tolist()  # convert in blocks rather than row by row
+            yield rows[row - first_row]
+
+    @abc.abstractmethod
+    def get_rows(self, start: int, stop: int):
+        """
+        :param start: first row
+        :param stop: row after the last one
+        :return: (row, node) float32 matrix of the irradiance in the rows
+        """
+
+    def get_value(self, row: int, index: int):
+        return self.get_rows(row, row + 1).item(0, index)
+
+    def iter_blocks(self):
+        # (first row, rows) of every block, in order
+        for start in range(0, self.rows, self.block_rows):
+            yield start, self.get_rows(start, min(start + self.block_rows, self.rows))
+
+    def get_row_index(self, processing_time: int):
+        if not 0 <= processing_time < self.length:
+            raise IndexError('irradiance index out of range')
+        return (processing_time + self.offset) // self.resolution
+
+    def column(self, index: int):
+        # irradiance values for a single node at native resolution
+        return np.concatenate([rows[:, index] for _, rows in self.iter_blocks()]) if self.rows else \
+            np.zeros(0, dtype=np.float32)
+
+
+def get_clear_sky(lat: np.ndarray, long: np.ndarray, minutes: np.ndarray, first_day: int = FIRST_DAY):
+    """
+    :param lat: latitude of each node, in degrees
+    :param long: longitude of each node, in degrees
+    :param minutes: minutes since midnight UTC of the first day
+    :param first_day: day of the year of the first day
+    :return: (minute, node) matrix of clear-sky irradiance, in W/m^2 (0 at night)
+    """
+    minutes = np.asarray(minutes)[:, None]
+    declination = np.radians(23.44) * np.sin(2 * np.pi * (284 + first_day + minutes // 1440) / 365)
+    hour_angle = np.radians(((minutes % 1440) / 60 + np.asarray(long) / 15 - 12) * 15)  # solar time from UTC
+    lat = np.radians(lat)
+    elevation = np.sin(lat) * np.sin(declination) + np.cos(lat) * np.cos(declination) * np.cos(hour_angle)
+    return SOLAR_PEAK * np.clip(elevation, 0, None) ** 1.15
+
+
+def get_cloud_cover(nodes: int, day: int, seed: int = 0):
+    """
+    :param nodes: number of nodes
+    :param day: day since the start
+    :param seed: seed of the clouds
+    :return: (minute, node) matrix of the share of the clear-sky irradiance let through on that day
+    """
+    """Cloud cover holds between changes at random minutes; every day depends only on the seed and the day"""
+    rng = np.random.default_rng([seed, day])
+    segments = np.cumsum(rng.random((1440, nodes)) < CLOUD_CHANGE, axis=0)
+    factors = rng.choice(CLOUD_FACTORS, size=(1441, nodes))
+    return np.take_along_axis(factors, segments, axis=0)
+
+
+class ClearSkyIrradiance(IrradianceProvider):
+    def __init__(self, coords: list, days: int, clouds: bool = False, seed: int = 0, first_day: int = FIRST_DAY):
+        """
+        :param coords: (latitude, longitude) of each node, by node index
+        :param days: days covered, starting at midnight UTC (the simulation starts a day in)
+        :param clouds: attenuate the irradiance with random cloud cover
+        :param seed: seed of the cloud cover
+        :param first_day: day of the year of the first day
+        """
+        """
+        Irradiance from the position of the sun above each node, a minute per row, without any file. Rows are
+        computed a day at a time when first asked for and only the last CACHED_BLOCKS days are kept, so memory does
+        not grow with the horizon.
+        """
+        super().__init__(days * 1440, len(coords), resolution=60, offset=0, coords=list(coords), block_rows=1440)
+        self.lat = np.array([float(lat) for lat, _ in coords], dtype=np.float64)
+        self.long = np.array([float(long) for _, long in coords], dtype=np.float64)
+        self.clouds = clouds
+        self.seed = seed
+        self.first_day = first_day
+        self.blocks = OrderedDict()  # day: (minute, node) float32 matrix, least recently used first
+
+    def get_block(self, day: int):
+        """
+        :param day: day since the start
+        :return: (minute, node) float32 matrix of the irradiance on that day
+        """
+        block = self.blocks.get(day)
+        if block is None:
+            irradiance = get_clear_sky(self.lat, self.long, np.arange(day * 1440, (day + 1) * 1440), self.first_day)
+            if self.clouds:
+                irradiance *= get_cloud_cover(self.num_nodes, day, self.seed)
+            block = self.blocks[day] = irradiance.astype(np.float32)
+            if len(self.blocks) > CACHED_BLOCKS:
+                self.blocks.popitem(last=False)
+        else:
+            self.blocks.move_to_end(day)
+        return block
+
+    def get_rows(self, start: int, stop: int):
+        stop = min(stop, self.rows)
+        if stop <= start:
+            return np.zeros((0, self.num_nodes), dtype=np.float32)
+        first_day, last_day = start // 1440, (stop - 1) // 1440
+        if first_day == last_day:
+            return self.get_block(first_day)[start - first_day * 1440:stop - first_day * 1440]
+        return np.concatenate([self.get_block(day)[max(start - day * 1440, 0):stop - day * 1440]
+                               for day in range(first_day, last_day + 1)])
+
+    def get_value(self, row: int, index: int):
+        return self.get_block(row // 1440).item(row % 1440, index)
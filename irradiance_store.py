@@ -0,0 +1,169 @@
+import json
+import os
+
+import numpy as np
+
+from irradiance_provider import *
+
+STORE_MAGIC = b'SECIRR01'
+STORE_ALIGNMENT = 64  # data block starts on a 64 byte boundary so the memmap is aligned
+
+
+class IrradianceView(IrradianceProvider):
+    def __init__(self, data: np.ndarray, resolution: int = 1, offset: int = 0, coords: list = None):
+        """
+        :param data: (time, node) float32 matrix at native resolution (plain view of the memmap)
+        :param resolution: simulated seconds covered by each row
+        :param offset: simulated second t is stored in row (t + offset) // resolution
+        :param coords: (latitude, longitude) of each node
+        """
+        """Irradiance read from a matrix, usually an irradiance store mapped into memory"""
+        self.data = np.asarray(data)
+        super().__init__(self.data.shape[0], self.data.shape[1], resolution, offset, coords)
+
+    def get_rows(self, start: int, stop: int):
+        return self.data[start:stop]
+
+    def get_value(self, row: int, index: int):
+        return self.data.item(row, index)
+
+    def column(self, index: int):
+        return self.data[:, index]
+
+
+class IrradianceStoreWriter:
+    def __init__(self, path: str, rows: int, nodes: int, resolution: int = 1, offset: int = 0, coords: list = None,
+                 source: dict = None, extra: dict = None):
+        """
+        :param path: file to write
+        :param rows: number of time periods
+        :param nodes: number of nodes
+        :param resolution: simulated seconds covered by each row
+        :param offset: seconds skipped at the start of the first row
+        :param coords: (latitude, longitude) of each node
+        :param source: description of the file the data was converted from
+        :param extra: any other information to keep in the header
+        """
+        """Writes the header of an irradiance store and maps its data block so it can be filled in piece by piece"""
+        header = {'rows': rows, 'nodes': nodes, 'resolution': resolution, 'offset': offset,
+                  'coords': [[float(lat), float(long)] for lat, long in coords] if coords else [],
+                  'source': source or {}}
+        if extra:
+            header.update(extra)
+        header_bytes = json.dumps(header).encode('utf-8')
+        data_offset = len(STORE_MAGIC) + 4 + len(header_bytes)
+        data_offset += -data_offset % STORE_ALIGNMENT
+        self.path = path
+        self.temp_path = f'{path}.tmp'
+        with open(self.temp_path, 'wb') as file:
+            file.write(STORE_MAGIC)
+            file.write(len(header_bytes).to_bytes(4, 'little'))
+            file.write(header_bytes)
+            file.write(b'\0' * (data_offset - file.tell()))
+            file.truncate(data_offset + rows * nodes * np.dtype(np.float32).itemsize)
+        if rows * nodes == 0:
+            self.data = np.zeros((rows, nodes), dtype=np.float32)
+        else:
+            self.data = np.memmap(self.temp_path, dtype=np.float32, mode='r+', offset=data_offset,
+                                  shape=(rows, nodes))
+
+    def finish(self):
+        if isinstance(self.data, np.memmap):
+            self.data.flush()
+        self.data = None
+        os.replace(self.temp_path, self.path)  # never leave a half written store behind
+
+
+def write_irradiance_store(path: str, data: np.ndarray, resolution: int = 1, offset: int = 0, coords: list = None,
+                           source: dict = None, extra: dict = None):
+    """
+    :param path: file to write
+    :param data: (time, node) matrix of irradiance values
+    :param resolution: simulated seconds covered by each row
+    :param offset: seconds skipped at the start of the first row
+    :param coords: (latitude, longitude) of each node
+    :param source: description of the file the data was converted from
+    :param extra: any other information to keep in the header
+    :return: None
+    """
+    """Writes a float32 (time, node) matrix with a small JSON header that np.memmap can load directly"""
+    writer = IrradianceStoreWriter(path, data.shape[0], data.shape[1], resolution, offset, coords, source, extra)
+    writer.data[:] = data
+    writer.finish()
+
+
+def read_irradiance_header(path: str):
+    """
+    :param path: irradiance store
+    :return: header dictionary and the byte offset of the data block
+    """
+    """Reads the JSON header of an irradiance store"""
+    with open(path, 'rb') as file:
+        if file.read(len(STORE_MAGIC)) != STORE_MAGIC:
+            raise ValueError(f'{path} is not an irradiance store')
+        header_length = int.from_bytes(file.read(4), 'little')
+        header = json.loads(file.read(header_length).decode('utf-8'))
+    data_offset = len(STORE_MAGIC) + 4 + header_length
+    data_offset += -data_offset % STORE_ALIGNMENT
+    return header, data_offset
+
+
+def is_irradiance_store(path: str):
+    with open(path, 'rb') as file:
+        return file.read(len(STORE_MAGIC)) == STORE_MAGIC
+
+
+def load_irradiance_store(path: str):
+    """
+    :param path: irradiance store
+    :return: IrradianceView over a read-only memory map of the file
+    """
+    """Opens an irradiance store without reading the data into memory"""
+    header, data_offset = read_irradiance_header(path)
+    if header['rows'] == 0:
+        data = np.zeros((0, header['nodes']), dtype=np.float32)
+    else:
+        data = np.memmap(path, dtype=np.float32, mode='r', offset=data_offset,
+                         shape=(header['rows'], header['nodes']))
+    return IrradianceView(data, header['resolution'], header['offset'], [tuple(c) for c in header['coords']])
+
+
+def get_store_path(file: str):
+    return f'{file}.bin'
+
+
+def convert_irradiance_text(file: str, store: str, coords: list = None):
+    """
+    :param file: text file containing irradiance values for each time period
+    :param store: irradiance store to create
+    :param coords: (latitude, longitude) of each node
+    :return: None
+    """
+    """Converts irradiance.txt (two header lines, then one comma separated row per second) into a store"""
+    stat = os.stat(file)
+    data = np.loadtxt(file, delimiter=',', skiprows=2, dtype=np.float32, ndmin=2)
+    write_irradiance_store(store, data, coords=coords,
+                           source={'file': os.path.basename(file), 'mtime_ns': stat.st_mtime_ns,
+                                   'size': stat.st_size})
+
+
+def open_irradiance(file: str, coords: list = None):
+    """
+    :param file: irradiance store, or text file containing irradiance values for each time period
+    :param coords: (latitude, longitude) of each node
+    :return: IrradianceView
+    """
+    """Loads irradiance values, converting text files once and reusing the store until the text file changes"""
+    if is_irradiance_store(file):
+        return load_irradiance_store(file)
+    store = get_store_path(file)
+    stat = os.stat(file)
+    if os.path.exists(store):
+        try:
+            source = read_irradiance_header(store)[0]['source']
+        except ValueError:
+            source = {}
+        if source.get('mtime_ns') == stat.st_mtime_ns and source.get('size') == stat.st_size:
+            return load_irradiance_store(store)
+    convert_irradiance_text(file, store, coords)
+    return load_irradiance_store(store)
@@ -0,0 +1,108 @@
+from collections import OrderedDict
+
+import numpy as np
+
+WINDOW_BLOCK_ROWS = 1440  # rows of cumulative sums computed at a time (a day at minute resolution)
+WINDOW_CACHED_BLOCKS = 4  # blocks kept computed; a forecast looks back a little over a day
+
+
+class IrradianceWindows:
+    def __init__(self, irradiance_list: object):
+        """
+        :param irradiance_list: IrradianceProvider with the irradiance values of every node
+        """
+        """
+        Per-node cumulative sums of irradiance so the average over any window of seconds takes two lookups. The sums
+        are computed a block at a time when first asked for; the total before each block is kept, so a block dropped
+        from the cache is computed again from it with the same additions.
+        """
+        self.resolution = irradiance_list.resolution
+        self.offset = irradiance_list.offset
+        self.length = len(irradiance_list)
+        self.irradiance_list = irradiance_list
+        self.block_count = max(-(-irradiance_list.rows // WINDOW_BLOCK_ROWS), 1)
+        # carries[b] = sum of rows before block b; the first `carried` are known
+        self.carries = np.zeros((self.block_count, irradiance_list.num_nodes), dtype=np.float64)
+        self.carried = 1
+        self.blocks = OrderedDict()  # block number: cumulative sums, least recently used first
+        self._forecast_time = None
+        self._forecasts = {}
+
+    def _get_block(self, number: int):
+        """
+        :param number: block number
+        :return: cumulative[r] for the rows r of the block and the row after it, where cumulative[r] = sum of rows
+                 0..r-1, each row counted once (it covers `resolution` seconds)
+        """
+        block = self.blocks.get(number)
+        if block is not None:
+            self.blocks.move_to_end(number)
+            return block
+        while self.carried <= number:  # the total before a block needs every block before it, once
+            self._get_block(self.carried - 1)
+        start = number * WINDOW_BLOCK_ROWS
+        rows = self.irradiance_list.get_rows(start, start + WINDOW_BLOCK_ROWS)
+        # continues from the previous total, adding in the same order as a single cumsum
+        block = self.blocks[number] = np.cumsum(np.concatenate([self.carries[number:number + 1],
+                                                                rows.astype(np.float64)]), axis=0)
+        if number + 1 == self.carried < self.block_count:
+            self.carries[number + 1] = block[-1]
+            self.carried += 1
+        if len(self.blocks) > WINDOW_CACHED_BLOCKS:
+            self.blocks.popitem(last=False)
+        return block
+
+    def _get_cumulative(self, row: int, index: int):
+        # sum of the node's rows before row (row may be the one after the last)
+        number = min(row // WINDOW_BLOCK_ROWS, self.block_count - 1)
+        return self._get_block(number).item(row - number * WINDOW_BLOCK_ROWS, index)
+
+    def _get_total_before(self, processing_time: int, index: int):
+        # sum of the node's irradiance over simulated seconds [0, processing_time)
+        second = processing_time + self.offset
+        row, partial = divmod(second, self.resolution)
+        total = self.resolution * self._get_cumulative(row, index)
+        if partial:
+            total += partial * self.irradiance_list.get_value(row, index)
+        return total - self.offset * self.irradiance_list.get_value(0, index) if self.offset else total
+
+    def get_average(self, index: int, start: int, stop: int):
+        """
+        :param index: index of the node
+        :param start: first second of the window
+        :param stop: second after the end of the window
+        :return: average irradiance over the window, or None if the window is empty
+        """
+        """Averages the same seconds as irradiance_values[start:stop] would (including Python's slice rules)"""
+        start, stop, _ = slice(start, stop).indices(self.length)
+        if stop <= start:
+            return None
+        return (self._get_total_before(stop, index) - self._get_total_before(start, index)) / (stop - start)
+
+    def get_forecast(self, index: int, processing_time: int):
+        """
+        :param index: index of the node
+        :param processing_time: simulated time
+        :return: predicted irradiance for the next hour
+        """
+        """
+        Scales the irradiance of the same hour yesterday by how today's last hour compares to yesterday's.
+        Memoized per node for the current second, so every application paused at once shares one computation.
+        """
+        if processing_time != self._forecast_time:
+            self._forecast_time = processing_time
+            self._forecasts = {}
+        if index not in self._forecasts:
+            yesterday_irradiance1 = self.get_average(index, processing_time - 90000, processing_time - 86400)
+            yesterday_irradiance2 = self.get_average(index, processing_time - 86400, processing_time - 82800)
+            today_irradiance1 = self.get_average(index, processing_time - 3600, processing_time)
+            if yesterday_irradiance1 is None:
+                yesterday_irradiance1 = self.get_average(index, 0, processing_time)
+            if yesterday_irradiance2 is None:
+                yesterday_irradiance2 = self.get_average(index, 0, processing_time)
+
+            if yesterday_irradiance1 > 0:
+                self._forecasts[index] = yesterday_irradiance2 * today_irradiance1 / yesterday_irradiance1
+            else:
+                self._forecasts[index] = 0
+        return self._forecasts[index]
@@ -0,0 +1,116 @@
+import heapq
+from collections import OrderedDict
+
+
+class PausedQueue:
+    def __init__(self, table: object):
+        """
+        :param table: ApplicationTable holding the applications
+        """
+        """
+        Applications paused by a server shutdown, newest first. Instead of every paused application being visited every
+        tick, applications come due when they are paused, when their migration delay runs out (a timer), or when the
+        node they are waiting for changes after a failed attempt to resume.
+        """
+        self.table = table
+        self.paused = OrderedDict()  # id: (pause number, time paused), oldest first
+        self.pauses = 0
+        self.new = []  # ids paused since the last call to get_due
+        self.undecided = set()  # ids of paused applications without a destination (delay is None)
+        self.timers = []  # heap of (wake-up time, pause number, id)
+        self.wake_times = {}  # id: wake-up time of its pending timer
+        self.waiting = {}  # node: [capacity index version when an attempt failed, set of ids]
+
+    def __len__(self):
+        return len(self.paused)
+
+    def __iter__(self):
+        return (self.table[index] for index in reversed(self.paused))
+
+    def __contains__(self, application: object):
+        return application.id in self.paused
+
+    def add(self, application: object, processing_time: int):
+        """
+        :param application: application that was just paused
+        :param processing_time: current time
+        :return: None
+        """
+        self.pauses += 1
+        self.paused[application.id] = (self.pauses, processing_time)
+        self.new.append(application.id)
+        if application.delay is None:
+            self.undecided.add(application.id)
+
+    def remove(self, application: object):
+        """
+        :param application: application that resumed
+        :return: None
+        """
+        """Also adds the time spent paused to the application's overhead"""
+        _, paused_at = self.paused.pop(application.id)
+        self.table.views['overhead'][application.id] += self.table.time - paused_at
+        self.wake_times.pop(application.id, None)
+        self.undecided.discard(application.id)
+
+    def schedule(self, application: object, wake_time: int):
+        """
+        :param application: paused application that just chose where to go (application.delay is set)
+        :param wake_time: first time it may try to resume
+        :return: None
+        """
+        self.undecided.discard(application.id)
+        if wake_time > self.table.time:
+            self.wake_times[application.id] = wake_time
+            heapq.heappush(self.timers, (wake_time, self.paused[application.id][0], application.id))
+
+    def remap(self, mapping: object):
+        """
+        :param mapping: new id of every old id, from ApplicationTable.drop_completed (paused applications are kept)
+        :return: None
+        """
+        self.paused = OrderedDict((int(mapping[index]), paused) for index, paused in self.paused.items())
+        self.new = [int(mapping[index]) for index in self.new if mapping[index] >= 0]
+        self.undecided = {int(mapping[index]) for index in self.undecided}
+        self.wake_times = {int(mapping[index]): wake_time for index, wake_time in self.wake_times.items()}
+        self.timers = [(wake_time, pause, int(mapping[index])) for wake_time, pause, index in self.timers
+                       if mapping[index] >= 0]
+        heapq.heapify(self.timers)
+        for waiting in self.waiting.values():
+            waiting[1] = {int(mapping[index]) for index in waiting[1] if mapping[index] >= 0}
+
+    def wait_for(self, application: object, node: object):
+        """
+        :param application: paused application that could not resume on the node
+        :param node: node it is waiting for
+        :return: None
+        """
+        """The application comes due again once any server of the node changes"""
+        waiting = self.waiting.setdefault(node, [None, set()])
+        waiting[0] = node.capacity_index.get_version()
+        waiting[1].add(application.id)
+
+    def get_next_wake(self):
+        """
+        :return: earliest pending wake-up time (None if there is none)
+        """
+        while self.timers and self.wake_times.get(self.timers[0][2]) != self.timers[0][0]:
+            heapq.heappop(self.timers)  # the application already resumed
+        return self.timers[0][0] if self.timers else None
+
+    def get_due(self, processing_time: int):
+        """
+        :param processing_time: current time
+        :return: applications the migration policy has to look at this tick, newest first
+        """
+        due = set(index for index in self.new if index in self.paused)
+        self.new = []
+        while self.get_next_wake() is not None and self.timers[0][0] <= processing_time:
+            _, _, index = heapq.heappop(self.timers)
+            del self.wake_times[index]
+            due.add(index)
+        for node, (version, indexes) in list(self.waiting.items()):
+            if node.capacity_index.get_version() != version:
+                due.update(index for index in indexes if index in self.paused)
+                del self.waiting[node]
+        return [self.table[index] for index in sorted(due, key=lambda index: self.paused[index][0], reverse=True)]
@@ -0,0 +1,134 @@
+import bisect
+from array import array
+
+import numpy as np
+
+
+class PendingQueue:
+    def __init__(self, table: object, ids: list = None):
+        """
+        :param table: ApplicationTable holding the applications
+        :param ids: ids of the waiting applications in arrival order (every application in the table by default)
+        """
+        """Applications waiting to start, bucketed by (cores, memory) shape while keeping arrival order"""
+        self.table = table
+        self.buckets = {}  # (cores, memory): [array of ids, oldest first, index of the first one that may still wait]
+        self.core_counts = []  # sorted cores of the shapes with a bucket
+        self.memories = {}  # cores: sorted memory of the shapes with a bucket and those cores
+        self.waiting = bytearray()  # 1 for every application id that is still waiting
+        self.length = 0
+        self.extend(range(len(table)) if ids is None else ids)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        # every waiting application in arrival order (ids are handed out in arrival order)
+        return (self.table[index] for index in np.flatnonzero(np.frombuffer(self.waiting, dtype=np.uint8)).tolist())
+
+    def __contains__(self, application: object):
+        return application.id < len(self.waiting) and self.waiting[application.id] == 1
+
+    def extend(self, ids: list):
+        """
+        :param ids: ids of applications that arrived after every application already queued, in arrival order
+        :return: None
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(self.waiting) < len(self.table):
+            self.waiting.extend(bytes(len(self.table) - len(self.waiting)))
+        if not len(ids):
+            return
+        np.frombuffer(self.waiting, dtype=np.uint8)[ids] = 1
+        self.length += len(ids)
+
+        # group the ids by shape, keeping arrival order within each shape
+        shapes, inverse = np.unique(np.column_stack([self.table.cores[ids], self.table.memory[ids]]), axis=0,
+                                    return_inverse=True)
+        inverse = inverse.reshape(-1)
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.searchsorted(inverse[order], np.arange(len(shapes) + 1))
+        for shape_index, shape in enumerate(map(tuple, shapes.tolist())):
+            bucket = self.buckets.get(shape)
+            if bucket is None:
+                bucket = self._add_bucket(shape)
+            bucket[0].frombytes(ids[order[bounds[shape_index]:bounds[shape_index + 1]]].tobytes())
+
+    def _add_bucket(self, shape: tuple):
+        cores, memory = shape
+        memories = self.memories.get(cores)
+        if memories is None:
+            memories = self.memories[cores] = []
+            bisect.insort(self.core_counts, cores)
+        bisect.insort(memories, memory)
+        bucket = self.buckets[shape] = [array('q'), 0]
+        return bucket
+
+    def _remove_bucket(self, shape: tuple):
+        cores, memory = shape
+        del self.buckets[shape]
+        memories = self.memories[cores]
+        del memories[bisect.bisect_left(memories, memory)]
+        if not memories:
+            del self.memories[cores]
+            del self.core_counts[bisect.bisect_left(self.core_counts, cores)]
+
+    def remap(self, mapping: np.ndarray):
+        """
+        :param mapping: new id of every old id, from ApplicationTable.drop_completed (waiting applications are kept)
+        :return: None
+        """
+        waiting = np.flatnonzero(np.frombuffer(self.waiting, dtype=np.uint8))
+        self.waiting = bytearray(len(self.table))
+        np.frombuffer(self.waiting, dtype=np.uint8)[mapping[waiting]] = 1
+        for bucket in self.buckets.values():
+            ids = mapping[np.frombuffer(bucket[0], dtype=np.int64)[bucket[1]:]]
+            bucket[0], bucket[1] = array('q', ids[ids >= 0].tobytes()), 0
+
+    def append(self, application: object):
+        self.extend([application.id])
+
+    def remove(self, application: object):
+        # the id stays in its bucket until it reaches the front, where _get_first skips it
+        self.waiting[application.id] = 0
+        self.length -= 1
+
+    def _get_first(self, bucket: list):
+        # id of the oldest application of a bucket that is still waiting (None if none is)
+        ids, head = bucket
+        while head < len(ids) and not self.waiting[ids[head]]:
+            head += 1
+        if head > 1024 and head * 2 > len(ids):  # drop the ids that already left
+            del ids[:head]
+            head = 0
+        bucket[1] = head
+        return ids[head] if head < len(ids) else None
+
+    def get_first_fit(self, cores: float, memory: float, degradable_applications: bool = False,
+                      excluded: set = frozenset()):
+        """
+        :param cores: free cores
+        :param memory: free memory, in MB
+        :param degradable_applications: applications can start on fewer cores than they asked for
+        :param excluded: (cores, memory) shapes to skip
+        :return: earliest arrived application that fits (None if none does)
+        """
+        """Only visits the shapes that fit: core counts up to cores, and within each, memory up to memory"""
+        first = None
+        empty_shapes = []
+        core_counts = self.core_counts if degradable_applications else \
+            self.core_counts[:bisect.bisect_right(self.core_counts, cores)]
+        for app_cores in core_counts:
+            memories = self.memories[app_cores]
+            for app_memory in memories[:bisect.bisect_right(memories, memory)]:
+                shape = (app_cores, app_memory)
+                if shape in excluded:
+                    continue
+                index = self._get_first(self.buckets[shape])
+                if index is None:
+                    empty_shapes.append(shape)
+                elif first is None or index < first:
+                    first = index
+        for shape in empty_shapes:
+            self._remove_bucket(shape)
+        return None if first is None else self.table[first]
@@ -1,19 +1,25 @@
+import heapq
 import math
 import operator
 
 from setup import *
+from delay_model import *
+from capacity_index import *
 
+POLICIES = ('passive', 'greedy', 'super-greedy', 'YOLO', 'look-ahead', 'practical')
 
-def start_applications(edge_computing_systems: list, applications: list, processing_time: int,
+
+def start_applications(edge_computing_systems: list, applications: object, processing_time: int,
                        global_applications: bool, degradable_applications: bool, degradable_multiplier: float,
-                       diagnostics: bool):
+                       placement: str, diagnostics: bool):
     """
     :param edge_computing_systems: list of nodes
-    :param applications: list of applications
+    :param applications: PendingQueue of applications that have not started
     :param processing_time: current second of simulation time
     :param global_applications: determines if applications can start at any server or not
     :param degradable_applications: determines if applications can scale based on available cores
     :param degradable_multiplier: determines how many more cores can be utilized compared to the original core count
+    :param placement: 'first-fit' or 'best-fit' choice of server
     :param diagnostics: determines whether to print information to console
     :return: None
     """
@@ -30,53 +36,102 @@ def start_applications(edge_computing_systems: list, applications: list, process
         """Group of operations needed to be executed before to start an application"""
         application.start_time = processing_time
         server.start_application(application)
-        applications.remove(app)
+        applications.remove(application)
         if diagnostics:
-            print(f'started {application} on node {app.parent.parent.index}')
+            print(f'started {application} on node {application.parent.parent.index}')
+
+    def start_on_server(app: object, server: object):
+        if degradable_applications:
+            # determine how many cores the application will start using
+            app.cores = server.cores if server.cores <= app.original_cores * degradable_multiplier \
+                else app.original_cores * degradable_multiplier
+            app.time_left = app.runtime * app.original_cores / app.cores
+        finalize_start_application(app, server, diagnostics)
+
+    nodes = edge_computing_systems if global_applications else edge_computing_systems[:1]
+    if placement == 'best-fit':
+        # each application in arrival order goes to the server it fills the most
+        full_shapes = set()  # free resources only shrink while starting, so a shape that did not fit never will
+        while applications:
+            app = applications.get_first_fit(math.inf, math.inf, True, full_shapes)
+            if app is None:
+                break
+            server = find_server(nodes, app, placement, degradable_applications, degradable_multiplier)
+            if server is None:
+                full_shapes.add((app.cores, app.memory))
+            else:
+                start_on_server(app, server)
+    else:
+        # each server with free resources takes the earliest arrived application that still fits, until none does
+        for node in nodes:
+            server = node.capacity_index.get_first_fit(ANY, ANY)
+            while server is not None and applications:
+                while applications and (server.cores > 0 or not degradable_applications):
+                    app = applications.get_first_fit(server.cores, server.memory, degradable_applications)
+                    if app is None:
+                        break
+                    start_on_server(app, server)
+                server = node.capacity_index.get_first_fit(ANY, ANY, server.position + 1)
 
-    powered_servers = (server for node in edge_computing_systems for server in node.servers if server.on is True)
-    for server in powered_servers:
-        if server.cores > 0 and server.memory > 0:
-            for app in list(applications[:1000]):
-                if (app.memory <= server.memory and app.cores <= server.cores and global_applications
-                    and not degradable_applications) or (app.memory <= server.memory and app.cores <= server.cores and
-                                                         server.parent.index == 0 and not degradable_applications):
-                    finalize_start_application(app, server, diagnostics)
-                elif ((app.memory <= server.memory and global_applications and degradable_applications) \
-                        or (app.memory <= server.memory and degradable_applications and server.parent.index == 0)) \
-                        and server.cores > 0:
-                    # determine how many cores the application will start using
-                    #print(f'starting with {app.cores} cores')
-                    app.cores = server.cores if server.cores <= app.original_cores * degradable_multiplier \
-                        else app.original_cores * degradable_multiplier
-                    #print(f'now with {app.cores} cores')
-                    app.time_left = app.runtime * app.original_cores / app.cores
-                    finalize_start_application(app, server, diagnostics)
-
-
-def complete_applications(edge_computing_systems: list, completed_applications: list, processing_time: int,
-                          diagnostics: bool):
+
+def find_server(nodes: list, application: object, placement: str, degradable_applications: bool,
+                degradable_multiplier: float):
     """
-    :param edge_computing_systems: list of nodes
-    :param completed_applications: list of completed applications
+    :param nodes: nodes the application may run on, in order of preference
+    :param application: application being placed
+    :param placement: 'first-fit' (first server that fits) or 'best-fit' (server left with the fewest free cores)
+    :param degradable_applications: determines if applications can scale based on available cores
+    :param degradable_multiplier: determines how many more cores can be utilized compared to the original core count
+    :return: powered server to run the application on (None if no server has room)
+    """
+    """Looks up a server in the nodes' capacity indexes instead of scanning every server"""
+    if degradable_applications:
+        if placement == 'best-fit':  # prefer a server that can give the application every core it can use
+            server = find_fitting_server(nodes, application.original_cores * degradable_multiplier,
+                                         application.memory, placement)
+            if server is not None:
+                return server
+        return find_fitting_server(nodes, ANY, application.memory, 'first-fit')
+    return find_fitting_server(nodes, application.cores, application.memory, placement)
+
+
+def find_fitting_server(nodes: list, cores: float, memory: float, placement: str):
+    """
+    :param nodes: nodes to search, in order of preference
+    :param cores: free cores needed (ANY for any amount)
+    :param memory: free memory needed, in MB
+    :param placement: 'first-fit' or 'best-fit'
+    :return: powered server with enough free resources (None if none)
+    """
+    best_fit = None
+    for node in nodes:
+        if not node.capacity_index.fits_any(cores, memory):
+            continue
+        if placement != 'best-fit':
+            return node.capacity_index.get_first_fit(cores, memory)
+        entry = node.capacity_index.get_best_fit(cores, memory)
+        if entry is not None and (best_fit is None or entry[:2] < best_fit[0][:2]):
+            best_fit = (entry, node)
+    return None if best_fit is None else best_fit[1].servers[best_fit[0][2]]
+
+
+def complete_applications(application_table: object, processing_time: int, diagnostics: bool):
+    """
+    :param application_table: ApplicationTable holding every application
     :param processing_time: current time
     :param diagnostics: determines whether to print information to console
     :return: None
     """
     """Removes applications from servers once they finish running"""
     current_completed = 0
-    powered_servers = (server for node in edge_computing_systems for server in node.servers if server.on is True)
-    for server in powered_servers:
-        for application in list(server.applications_running):
-            application.time_left -= 1
-            if application.time_left <= 0:
-                application.end_time = processing_time
-                server.stop_application(application)
-                current_completed += 1
-                application.parent.parent.applications_completed += 1
-                completed_applications.append(application)
-                if diagnostics:
-                    print(f'completed {application} on node {application.parent.parent.index}')
+    application_table.time = processing_time  # running applications' time_left is counted from here
+    for application in application_table.pop_completed(processing_time):
+        application.parent.stop_application(application)
+        application_table.complete(application.id, processing_time)
+        current_completed += 1
+        application.parent.parent.applications_completed += 1
+        if diagnostics:
+            print(f'completed {application} on node {application.parent.parent.index}')
     return current_completed
 
 
@@ -91,34 +146,38 @@ def power_servers(edge_computing_systems: list):
         server.on = True
 
 
-def shutdown_servers(edge_computing_systems: list, power_per_server: float, irradiance_list: tuple,
+def shutdown_servers(edge_computing_systems: list, power_state: object, power_per_server: float, power_timeline: object,
                      processing_time: int, partially_completed_applications: list, diagnostics: bool):
     """
     :param edge_computing_systems: list of nodes
+    :param power_state: PowerState shared by the nodes
     :param power_per_server: power that each server needs to operate, in W
-    :param irradiance_list: tuple of irradiance values for each node
+    :param power_timeline: PowerTimeline with the power generated by each node
     :param processing_time: simulated time, in seconds
-    :param partially_completed_applications: list of applications that have been paused
+    :param partially_completed_applications: PausedQueue of applications that have been paused
     :param diagnostics: determines whether to print information to console
     :return: None
     """
-    """Determines which servers to power off"""
+    """
+    Determines which servers to power off. Only nodes whose allowed servers changed, or whose servers changed since
+    they were last decided, are decided again; the others would come out the same.
+    """
     current_paused = 0
-    power_servers(edge_computing_systems)
+    if not edge_computing_systems:
+        return current_paused
+    update_servers_allowed(edge_computing_systems, power_state, power_per_server, power_timeline, processing_time)
     # turn off servers w/o enough power (priority to keep servers on that are closest to completing a task)
-    for edge in edge_computing_systems:
+    for index in sorted(power_state.dirty):
+        edge = edge_computing_systems[index]
+        power_servers([edge])
         servers_on = len(edge.servers)
-        power = edge.get_power_generated(irradiance_list[processing_time][edge.index])  # update power available
-        battery_power = edge.current_battery
-        max_power_available = power + battery_power
-        most_servers_on = math.floor((power + battery_power) / power_per_server)
+        most_servers_on = power_state.servers_allowed[index]
         if servers_on > most_servers_on:
             shortest_apps = []
             for server in edge.servers:
                 if not server.applications_running and server.on:
                     server.on = False
                     servers_on -= 1
-                    max_power_available -= power_per_server
                     if servers_on <= most_servers_on:
                         break
                 else:
@@ -126,44 +185,98 @@ def shutdown_servers(edge_computing_systems: list, power_per_server: float, irra
             for app in sorted(shortest_apps, key=operator.attrgetter('time_left'))[most_servers_on - servers_on:]:
                 app.parent.on = False
                 servers_on -= 1
-                max_power_available -= power_per_server
                 shortest_apps.remove(app)
                 for running_app in app.parent.applications_running:
                     app.parent.stop_application(running_app)
-                    partially_completed_applications.insert(0, running_app)
+                    partially_completed_applications.add(running_app, processing_time)
                     current_paused += 1
                     if diagnostics:
                         print('pausing', running_app, running_app.time_left, 'on', running_app.parent.parent)
+        if is_power_settled(edge, most_servers_on):
+            power_state.dirty.discard(index)
     return current_paused
 
 
-def resume_applications(policy: str, location_distances: dict, applications: list, shortest_distances: dict,
-                        cost_multiplier: float, edge_computing_systems: list, irradiance_list: list,
-                        processing_time: int, power_per_server: float, degradable_applications: bool,
-                        degradable_multiplier: float, diagnostics: bool):
+def update_servers_allowed(edge_computing_systems: list, power_state: object, power_per_server: float,
+                           power_timeline: object, processing_time: int):
+    """
+    :param edge_computing_systems: list of nodes
+    :param power_state: PowerState shared by the nodes
+    :param power_per_server: power that each server needs to operate, in W
+    :param power_timeline: PowerTimeline with the power generated by each node
+    :param processing_time: simulated time, in seconds
+    :return: None
+    """
+    """
+    Marks the nodes whose power (and battery) now allows a different number of servers. Without batteries only the
+    nodes whose capacity changes at this time are looked at.
+    """
+    changes = power_state.capacity_changes
+    if power_state.batteries or len(power_state.servers_allowed) < len(edge_computing_systems):
+        nodes = edge_computing_systems
+        changes.clear()
+    else:
+        nodes = []
+        while changes and changes[0][0] <= processing_time:
+            nodes.append(edge_computing_systems[heapq.heappop(changes)[1]])
+    for node in nodes:
+        power = power_timeline.get_power(processing_time, node.index)
+        # more servers than the node has all come out as every server on
+        servers_allowed = min(math.floor((power + node.current_battery) / power_per_server), len(node.servers))
+        if power_state.servers_allowed.get(node.index) != servers_allowed:
+            power_state.servers_allowed[node.index] = servers_allowed
+            power_state.dirty.add(node.index)
+        if not power_state.batteries:
+            next_change = power_timeline.get_next_change(processing_time, node.index)
+            if next_change is not None:
+                heapq.heappush(changes, (next_change, node.index))
+
+
+def is_power_settled(edge: object, servers_allowed: int):
+    """
+    :param edge: node shutdown_servers just decided
+    :param servers_allowed: servers its power allows
+    :return: whether deciding the node again would change nothing, for as long as its servers and power stay the same
+    """
+    """
+    True once the first servers beyond the allowed ones are idle and off and the rest are on (which is what
+    shutdown_servers leaves when it pauses nothing). Otherwise another pass can still switch servers.
+    """
+    surplus = max(len(edge.servers) - servers_allowed, 0)
+    return all(not server.on and not server.applications_running for server in edge.servers[:surplus]) and \
+        all(server.on for server in edge.servers[surplus:])
+
+
+def resume_applications(policy: str, applications: object, shortest_distances: dict, delay_model: object,
+                        edge_computing_systems: list, irradiance_windows: object,
+                        power_timeline: object, processing_time: int, power_per_server: float,
+                        degradable_applications: bool, degradable_multiplier: float, placement: str,
+                        diagnostics: bool, profiler: object = None):
     """
     :param policy: decides which task transfer policy to use
-    :param location_distances: distances in km between nodes
-    :param applications: list of applications
+    :param applications: PausedQueue of paused applications
     :param shortest_distances: dictionary of (dictionary of node:(closest node,distance) pairs)
-    :param cost_multiplier: constant in calculating delay
+    :param delay_model: DelayModel with the migration delay between every pair of nodes
     :param edge_computing_systems: list of all edge sites that are part of the edge computing system
-    :param irradiance_list: list of solar irradiance tuples
+    :param irradiance_windows: IrradianceWindows used to forecast irradiance
+    :param power_timeline: PowerTimeline with the power generated by each node
     :param processing_time: simulated time
     :param power_per_server: power each server consumes
     :param degradable_applications: determines if applications can scale based on available cores
     :param diagnostics: determines whether to print information to console
     :param degradable_multiplier: determines how many more cores can be utilized compared to the original core count
+    :param placement: 'first-fit' or 'best-fit' choice of server on the destination node
+    :param profiler: PhaseProfiler timing the decisions (None when profiling is off)
     :return: None
     """
     '''Decides when and how to transfer applications'''
+    due = applications.get_due(processing_time)  # applications the policy decides on this tick
 
     # Migration Policies
     def passive():
         # Never migrates applications
         current_migrations = 0
-        for app in list(applications):
-            app.overhead += 1
+        for app in due:
             if degradable_applications and app.parent.on and app.parent.cores > 0 and app.memory <= app.parent.memory:
                 adjust_cores(app, app.parent)
                 current_migrations = finalize_resume_application(policy, app, app.parent, current_migrations,
@@ -171,27 +284,23 @@ def resume_applications(policy: str, location_distances: dict, applications: lis
             elif app.parent.on and app.cores <= app.parent.cores and app.memory <= app.parent.memory:
                 current_migrations = finalize_resume_application(policy, app, app.parent, current_migrations,
                                                                  diagnostics)
+            else:
+                applications.wait_for(app, app.parent.parent)
         return current_migrations
 
     def greedy():
         # Greedy - Transfer applications to the nearest node with enough available power
         # Super-Greedy - Transfer applications to the node with most available power
         current_migrations = 0
-        for app in list(applications):
-            app.overhead += 1
+        for app in due:
             if app.delay is None:
                 options = []
                 for node in edge_computing_systems:
-                    power = node.get_power_generated(irradiance_list[processing_time][node.index])
+                    power = power_timeline.get_power(processing_time, node.index)
                     if app.parent.parent == node:
                         delay = 0
                     else:
-                        try:
-                            delay = calculate_delay(cost_multiplier, math.ceil(
-                                location_distances[(app.parent.parent, node)]), app.memory)
-                        except KeyError:
-                            delay = calculate_delay(cost_multiplier, math.ceil(
-                                location_distances[(node, app.parent.parent)]), app.memory)
+                        delay = delay_model.get_delay(app.parent.parent.index, node.index, app.memory, rounded=True)
                     if delay == 0:
                         options.append((power, delay, node, 'wait'))
                     else:
@@ -207,72 +316,44 @@ def resume_applications(policy: str, location_distances: dict, applications: lis
                 app.delay = best_choice[1]
                 app.prev_parent = app.parent
                 app.parent = best_choice[2].servers[0]
-            elif app.delay > 0:
-                app.delay -= 1
+                applications.schedule(app, processing_time + app.delay)
             if app.delay <= 0:
-                for server in app.parent.parent.servers:
-                    if server.on and degradable_applications and server.cores > 0 and app.memory <= server.memory:
-                        adjust_cores(app, server)
-                        current_migrations = finalize_resume_application(policy, app, server, current_migrations,
-                                                                         diagnostics)
-                        break
-                    elif server.on and app.cores <= server.cores and app.memory <= server.memory:
-                        current_migrations = finalize_resume_application(policy, app, server, current_migrations,
-                                                                         diagnostics)
-                        break
+                current_migrations = try_resume_application(app, app.parent.parent, current_migrations)
         return current_migrations
 
     def yolo():
         # Transfer applications to nearest node
         current_migrations = 0
-        for app in list(applications):
-            app.overhead += 1
+        for app in due:
             if app.delay is None:
-                app.delay = calculate_delay(cost_multiplier, shortest_distances[app.parent.parent][1], app.memory)
-            elif app.delay > 0:
-                app.delay -= 1
+                nearest_node = shortest_distances[app.parent.parent][0]
+                app.delay = delay_model.get_delay(app.parent.parent.index, nearest_node.index, app.memory)
+                applications.schedule(app, processing_time + app.delay)
             if app.delay <= 0:
-                for server in shortest_distances[app.parent.parent][0].servers:
-                    if server.on and degradable_applications and server.cores > 0 and app.memory <= server.memory:
-                        adjust_cores(app, server)
-                        current_migrations = finalize_resume_application(policy, app, server, current_migrations,
-                                                                         diagnostics)
-                        break
-                    elif server.on and app.cores <= server.cores and app.memory <= server.memory:
-                        current_migrations = finalize_resume_application(policy, app, server, current_migrations,
-                                                                         diagnostics)
-                        break
+                nearest_node = shortest_distances[app.parent.parent][0]
+                current_migrations = try_resume_application(app, nearest_node, current_migrations)
         return current_migrations
 
     def look_ahead():
         # use future irradiance values to chose where to transfer applications
         current_migrations = 0
-        for app in list(applications):
-            app.overhead += 1
+        for app in due:
             if app.delay is None:
                 options = []
                 for node in edge_computing_systems:
                     if node == app.parent.parent:
                         delay = 0
                     else:
-                        try:
-                            delay = calculate_delay(cost_multiplier, location_distances[(app.parent.parent, node)],
-                                                    app.memory)
-                        except KeyError:
-                            delay = calculate_delay(cost_multiplier, location_distances[(node, app.parent.parent)],
-                                                    app.memory)
-                    future_processing_time = processing_time + delay
-                    for time_stamp in range(86400):
-                        power = node.get_power_generated(irradiance_list[future_processing_time][node.index])
-                        if power >= power_per_server:
-                            if app.parent.parent == node:
-                                options.append((power, future_processing_time - processing_time, node, 'wait'))
-                            else:
-                                options.append((power, future_processing_time - processing_time, node,
-                                                'transfer'))
-                        future_processing_time += 1
-                        if power >= power_per_server:
-                            break
+                        delay = delay_model.get_delay(app.parent.parent.index, node.index, app.memory)
+                    # first time within a day of arriving that the node has enough power for a server
+                    future_processing_time = power_timeline.get_next_sufficient(processing_time + delay, node.index)
+                    if future_processing_time is not None and \
+                            future_processing_time - (processing_time + delay) < 86400:
+                        power = power_timeline.get_power(future_processing_time, node.index)
+                        if app.parent.parent == node:
+                            options.append((power, future_processing_time - processing_time, node, 'wait'))
+                        else:
+                            options.append((power, future_processing_time - processing_time, node, 'transfer'))
 
                 try:
                     min_delay = min(options, key=lambda n: (n[1], -n[0]))[1]
@@ -287,66 +368,28 @@ def resume_applications(policy: str, location_distances: dict, applications: lis
                     app.parent = best_choice[2].servers[0]
                 except ValueError:
                     app.delay = 0
-            else:
-                if app.delay > 0:
-                    app.delay -= 1
-                if app.delay <= 0:
-                    for server in app.parent.parent.servers:
-                        if server.on and degradable_applications and server.cores > 0 and app.memory <= server.memory:
-                            adjust_cores(app, server)
-                            current_migrations = finalize_resume_application(policy, app, server, current_migrations,
-                                                                             diagnostics)
-                            break
-                        elif server.on and app.cores <= server.cores and app.memory <= server.memory:
-                            current_migrations = finalize_resume_application(policy, app, server, current_migrations,
-                                                                             diagnostics)
-                            break
+                # the first attempt to resume comes on a later tick, even without a delay
+                applications.schedule(app, processing_time + max(app.delay, 1))
+            elif app.delay <= 0:
+                current_migrations = try_resume_application(app, app.parent.parent, current_migrations)
         return current_migrations
 
     def practical():
         # use past irradiance values to predict the optimal node to transfer an application
         current_migrations = 0
-        for app in list(applications):
-            app.overhead += 1
+        for app in due:
             if app.delay is None:
                 options = []
                 for node in edge_computing_systems:
                     if node == app.parent.parent:
                         delay = 0
                     else:
-                        try:
-                            delay = calculate_delay(cost_multiplier, location_distances[(app.parent.parent, node)],
-                                                    app.memory)
-                        except KeyError:
-                            delay = calculate_delay(cost_multiplier, location_distances[(node, app.parent.parent)],
-                                                    app.memory)
-                    yesterday_irradiance1 = [value[node.index] for value in irradiance_list][
-                                            processing_time - 90000: processing_time - 86400]
-                    yesterday_irradiance2 = [value[node.index] for value in irradiance_list][
-                                            processing_time - 86400: processing_time - 82800]
-                    today_irradiance1 = [value[node.index] for value in irradiance_list][
-                                        processing_time - 3600: processing_time]
-
-                    if not yesterday_irradiance1:
-                        yesterday_irradiance1 = [value[node.index] for value in irradiance_list][
-                                                0: processing_time]
-                    if not yesterday_irradiance2:
-                        yesterday_irradiance2 = [value[node.index] for value in irradiance_list][
-                                                0: processing_time]
-
-                    avg_yesterday_irradiance1 = sum(yesterday_irradiance1) / len(yesterday_irradiance1)
-                    avg_yesterday_irradiance2 = sum(yesterday_irradiance2) / len(yesterday_irradiance2)
-                    avg_today_irradiance1 = sum(today_irradiance1) / len(today_irradiance1)
-
-                    if avg_yesterday_irradiance1 > 0:
-                        irradiance = avg_yesterday_irradiance2 * avg_today_irradiance1 / avg_yesterday_irradiance1
-                    else:
-                        irradiance = 0
-
+                        delay = delay_model.get_delay(app.parent.parent.index, node.index, app.memory)
+                    irradiance = irradiance_windows.get_forecast(node.index, processing_time)
                     estimated_power = node.get_power_generated(irradiance)
 
                     if node == app.parent.parent:
-                        wait_option = (estimated_power, delay, node.index, 'wait')
+                        wait_option = (estimated_power, delay, node, 'wait')
 
                     if estimated_power >= power_per_server:
                         if app.parent.parent == node:
@@ -367,19 +410,9 @@ def resume_applications(policy: str, location_distances: dict, applications: lis
                 app.delay = best_choice[1]
                 app.prev_parent = app.parent
                 app.parent = best_choice[2].servers[0]
-            elif app.delay > 0:
-                app.delay -= 1
+                applications.schedule(app, processing_time + app.delay)
             if app.delay <= 0:
-                for server in app.parent.parent.servers:
-                    if server.on and degradable_applications and server.cores > 0 and app.memory <= server.memory:
-                        adjust_cores(app, server)
-                        current_migrations = finalize_resume_application(policy, app, server, current_migrations,
-                                                                         diagnostics)
-                        break
-                    elif server.on and app.cores <= server.cores and app.memory <= server.memory:
-                        current_migrations = finalize_resume_application(policy, app, server, current_migrations,
-                                                                         diagnostics)
-                        break
+                current_migrations = try_resume_application(app, app.parent.parent, current_migrations)
         return current_migrations
 
     # Helper functions
@@ -396,6 +429,22 @@ def resume_applications(policy: str, location_distances: dict, applications: lis
             else math.floor(application.original_cores * degradable_multiplier)
         application.time_left = application.time_left * prev_cores / application.cores
 
+    def try_resume_application(application: object, node: object, current_migrations: int):
+        """
+        :param application: application whose migration delay has run out
+        :param node: node it is resuming on
+        :param current_migrations: migrations this time iteration
+        :return: current migrations
+        """
+        """Resumes the application on a server of the node, or leaves it waiting until the node changes"""
+        server = find_server([node], application, placement, degradable_applications, degradable_multiplier)
+        if server is None:
+            applications.wait_for(application, node)
+            return current_migrations
+        if degradable_applications:
+            adjust_cores(application, server)
+        return finalize_resume_application(policy, application, server, current_migrations, diagnostics)
+
     def finalize_resume_application(policy: str, application: object, server: object, current_migrations: int,
                                     diagnostics: bool):
         """
@@ -410,31 +459,35 @@ def resume_applications(policy: str, location_distances: dict, applications: lis
         server.start_application(application)
         if application.prev_parent != application.parent and policy != 'passive':
             current_migrations += 1
+        applications.remove(application)  # also settles the overhead of the pause
         application.delay = None
-        application.overhead -= 1
-        applications.remove(application)
         if diagnostics:
             print(f'resume app:{application} on node {server.parent.index} at time {processing_time}')
         return current_migrations
 
     if policy == 'YOLO':
-        return yolo()
+        run_policy = yolo
     elif policy == 'passive':
-        return passive()
+        run_policy = passive
     elif policy == 'greedy' or policy == 'super-greedy':
-        return greedy()
+        run_policy = greedy
     elif policy == 'look-ahead':
-        return look_ahead()
+        run_policy = look_ahead
     elif policy == 'practical':
-        return practical()
+        run_policy = practical
+    else:
+        return None
+    if profiler is None:
+        return run_policy()
+    return profiler.time_policy(policy, len(due), run_policy)
 
 
-def update_batteries(edge_computing_systems: list, power_per_server: float, irradiance_list: tuple,
+def update_batteries(edge_computing_systems: list, power_per_server: float, power_timeline: object,
                      processing_time: int):
     """
     :param edge_computing_systems: list of nodes
     :param power_per_server: power each server consumes
-    :param irradiance_list: list of solar irradiance tuples
+    :param power_timeline: PowerTimeline with the power generated by each node
     :param processing_time: simulated time
     :return: None
     """
@@ -447,7 +500,7 @@ def update_batteries(edge_computing_systems: list, power_per_server: float, irra
 
     # calculate leftover power per node
     for node in edge_computing_systems:
-        power = node.get_power_generated(irradiance_list[processing_time][node.index])  # update power available
+        power = power_timeline.get_power(processing_time, node.index)  # update power available
         for server in node.servers:
             if server.on:
                 power -= power_per_server
@@ -455,14 +508,3 @@ def update_batteries(edge_computing_systems: list, power_per_server: float, irra
             node.current_battery += power
         else:
             node.current_battery = node.max_battery
-
-
-def calculate_delay(equation, distance, memory):
-    memory *= 8  # convert MB to Mb
-    equation = equation.replace('x', str(distance))
-    try:
-        equation = eval(equation)
-        delay = math.ceil(memory / equation)
-    except ZeroDivisionError:
-        delay = 0
-    return delay
@@ -0,0 +1,176 @@
+from collections import OrderedDict
+
+import numpy as np
+
+POWER_BLOCK_ROWS = 1440  # rows of the timeline computed at a time (a day at minute resolution)
+POWER_CACHED_BLOCKS = 4  # blocks a timeline keeps computed
+
+
+class PowerTimeline:
+    def __init__(self, edge_computing_systems: list, irradiance_list: object, power_per_server: float):
+        """
+        :param edge_computing_systems: list of nodes
+        :param irradiance_list: IrradianceProvider with the irradiance values of every node
+        :param power_per_server: power that each server needs to operate, in W
+        """
+        """
+        Computes the power generated by every node at every time, and how many servers that power can run. Rows are
+        computed a block at a time when first asked for and only the last POWER_CACHED_BLOCKS blocks are kept. Looking
+        ahead past them uses a few values kept per block and node instead of the rows of every block.
+        """
+        self.irradiance_list = irradiance_list
+        self.resolution = irradiance_list.resolution
+        self.offset = irradiance_list.offset
+        self.length = len(irradiance_list)
+        self.rows = irradiance_list.rows
+        self.power_per_server = power_per_server
+
+        # P_n = eta * G_T * A_n, evaluated in the same order as EdgeSystem.get_power_generated
+        self.efficiency = np.array([node.pv_efficiency for node in edge_computing_systems], dtype=np.float64)
+        self.area = np.array([node.pv_area for node in edge_computing_systems], dtype=np.float64)
+        self.indexes = [node.index for node in edge_computing_systems]
+        self.servers = np.array([len(node.servers) for node in edge_computing_systems])
+        self.capacity_type = np.min_scalar_type(max(self.servers.max(initial=0), 1))
+
+        # per block and node, filled in the first time a block is computed
+        self.block_count = -(-self.rows // POWER_BLOCK_ROWS)
+        self.summarized = np.zeros(self.block_count, dtype=bool)
+        self.first_capacity = np.zeros((self.block_count, len(self.indexes)), dtype=self.capacity_type)
+        self.constant = np.zeros((self.block_count, len(self.indexes)), dtype=bool)  # capacity never changes in it
+        self.sufficient = np.zeros((self.block_count, len(self.indexes)), dtype=bool)  # can power a server in it
+
+        self.blocks = OrderedDict()  # block number: (power, capacity, change points, next sufficient), least recent first
+        self._block_number = None
+        self._block = None
+
+    def _build_block(self, number: int):
+        """
+        :param number: block number
+        :return: (power, capacity, change points, next sufficient) of the rows of the block
+        """
+        start = number * POWER_BLOCK_ROWS
+        irradiance = self.irradiance_list.get_rows(start, start + POWER_BLOCK_ROWS)
+        power = self.efficiency * irradiance[:, self.indexes].astype(np.float64) * self.area  # (time, node)
+
+        # servers each node can run from solar power alone, capped at the servers it has
+        capacity = np.clip(np.floor(power / self.power_per_server), 0, self.servers).astype(self.capacity_type)
+
+        # rows at which each node's capacity changes from the row before, within the block
+        changes = capacity[1:] != capacity[:-1]
+        change_points = [np.flatnonzero(changes[:, node]) + (start + 1) for node in range(capacity.shape[1])]
+
+        # first row at or after each row in which a node generates enough power for a server (rows if not in the block)
+        rows = np.arange(start, start + power.shape[0], dtype=np.int32)[:, None]
+        next_sufficient = np.where(power >= self.power_per_server, rows, np.int32(self.rows))
+        next_sufficient = np.minimum.accumulate(next_sufficient[::-1], axis=0)[::-1]
+
+        if not self.summarized[number]:
+            self.first_capacity[number] = capacity[0]
+            self.constant[number] = ~changes.any(axis=0)
+            self.sufficient[number] = next_sufficient[0] < self.rows
+            self.summarized[number] = True
+        return power, capacity, change_points, next_sufficient
+
+    def _get_block(self, number: int):
+        if number == self._block_number:
+            return self._block
+        if not 0 <= number < self.block_count:
+            raise IndexError('power index out of range')
+        block = self.blocks.get(number)
+        if block is None:
+            block = self.blocks[number] = self._build_block(number)
+            if len(self.blocks) > POWER_CACHED_BLOCKS:
+                self.blocks.popitem(last=False)
+        else:
+            self.blocks.move_to_end(number)
+        self._block_number, self._block = number, block
+        return block
+
+    def _summarize(self, number: int):
+        # the values kept for the block, without keeping the block (looking ahead may pass over many)
+        if not self.summarized[number]:
+            self._build_block(number)
+
+    def get_row_index(self, processing_time: int):
+        return (processing_time + self.offset) // self.resolution
+
+    def get_power(self, processing_time: int, index: int):
+        """
+        :param processing_time: simulated time
+        :param index: index of the node
+        :return: power generated by the node, in W
+        """
+        row = (processing_time + self.offset) // self.resolution
+        return self._get_block(row // POWER_BLOCK_ROWS)[0].item(row % POWER_BLOCK_ROWS, index)
+
+    def get_powers(self, processing_time: int):
+        """
+        :param processing_time: simulated time
+        :return: power generated by every node, in W, by node index
+        """
+        row = (processing_time + self.offset) // self.resolution
+        return self._get_block(row // POWER_BLOCK_ROWS)[0][row % POWER_BLOCK_ROWS]
+
+    def get_row_stop(self, processing_time: int):
+        # first simulated time after processing_time that falls in a later row (its power may differ)
+        return ((processing_time + self.offset) // self.resolution + 1) * self.resolution - self.offset
+
+    def get_capacity(self, processing_time: int, index: int):
+        """
+        :param processing_time: simulated time
+        :param index: index of the node
+        :return: servers the node can power without its battery
+        """
+        row = (processing_time + self.offset) // self.resolution
+        return self._get_block(row // POWER_BLOCK_ROWS)[1].item(row % POWER_BLOCK_ROWS, index)
+
+    def get_next_change(self, processing_time: int, index: int):
+        """
+        :param processing_time: simulated time
+        :param index: index of the node
+        :return: first simulated time after processing_time at which the node's capacity changes (None if never)
+        """
+        row = self.get_row_index(processing_time)
+        number = row // POWER_BLOCK_ROWS
+        _, capacity, change_points, _ = self._get_block(number)
+        change_points = change_points[index]
+        position = np.searchsorted(change_points, row, side='right')
+        if position < len(change_points):
+            change_row = int(change_points[position])
+        else:  # same capacity to the end of the block; the first later block that differs or changes has the row
+            change_row = None
+            current = capacity.item(-1, index)
+            for number in range(number + 1, self.block_count):
+                self._summarize(number)
+                if self.first_capacity.item(number, index) != current:
+                    change_row = number * POWER_BLOCK_ROWS
+                    break
+                if not self.constant.item(number, index):
+                    change_row = int(self._get_block(number)[2][index][0])
+                    break
+            if change_row is None:
+                return None
+        return max(change_row * self.resolution - self.offset, processing_time + 1)
+
+    def get_next_sufficient(self, processing_time: int, index: int):
+        """
+        :param processing_time: simulated time
+        :param index: index of the node
+        :return: first simulated time at or after processing_time at which the node can power a server (None if never)
+        """
+        row = self.get_row_index(processing_time)
+        if row >= self.rows:
+            return None
+        number = row // POWER_BLOCK_ROWS
+        sufficient_row = self._get_block(number)[3].item(row % POWER_BLOCK_ROWS, index)
+        if sufficient_row == self.rows:  # not in this block; the first later block with enough power has it
+            for number in range(number + 1, self.block_count):
+                self._summarize(number)
+                if self.sufficient.item(number, index):
+                    sufficient_row = self._get_block(number)[3].item(0, index)
+                    break
+            else:
+                return None
+        if sufficient_row == row:
+            return processing_time
+        return sufficient_row * self.resolution - self.offset
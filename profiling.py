@@ -0,0 +1,132 @@
+import cProfile
+import io
+import pstats
+import time
+
+PROFILING = ('off', 'phases', 'cprofile')
+LATENCY_BUCKETS = 24  # decisions by latency: under 1 us, under 2 us, ... doubling up to about 8 s
+CPROFILE_LINES = 30  # functions listed from the cProfile stats, by cumulative time
+
+
+class PhaseProfiler:
+    def __init__(self, sample_interval: int = 3600, cprofile: bool = False):
+        """
+        :param sample_interval: simulated seconds between samples of the queue and paused list sizes
+        :param cprofile: also run the simulation under cProfile
+        """
+        """
+        Wall time and calls of every phase of a tick, decisions of the policy and sizes of the queues over time. A
+        simulation without a profiler never calls into this class.
+        """
+        self.sample_interval = max(int(sample_interval), 1)
+        self.phases = {}  # phase: [calls, seconds]
+        self.policies = {}  # policy: [calls, decisions, seconds, latency histogram]
+        self.samples = []  # (simulated time, queue length, paused applications)
+        self.next_sample = None
+        self.cprofile = cprofile
+        self.profile = cProfile.Profile() if cprofile else None
+
+    def __getstate__(self):
+        # a cProfile.Profile cannot be pickled; a restored simulation profiles from where it continues
+        state = self.__dict__.copy()
+        state['profile'] = None
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.profile = cProfile.Profile() if self.cprofile else None
+
+    def wrap(self, phase: str, function: object):
+        """
+        :param phase: name the phase is reported under
+        :param function: function that runs the phase
+        :return: function that runs the phase and adds its wall time to the phase
+        """
+        totals = self.phases.setdefault(phase, [0, 0.0])
+
+        def timed(*args):
+            start = time.perf_counter()
+            result = function(*args)
+            totals[0] += 1
+            totals[1] += time.perf_counter() - start
+            return result
+        return timed
+
+    def time_policy(self, policy: str, decisions: int, run_policy: object):
+        """
+        :param policy: migration policy
+        :param decisions: paused applications the policy looks at in this call
+        :param run_policy: function running the policy
+        :return: what run_policy returns
+        """
+        start = time.perf_counter()
+        result = run_policy()
+        elapsed = time.perf_counter() - start
+        totals = self.policies.setdefault(policy, [0, 0, 0.0, [0] * LATENCY_BUCKETS])
+        totals[0] += 1
+        totals[1] += decisions
+        totals[2] += elapsed
+        if decisions:  # every decision of the call counts, at the call's average latency per decision
+            bucket = int(elapsed / decisions * 1e6).bit_length()
+            totals[3][min(bucket, LATENCY_BUCKETS - 1)] += decisions
+        return result
+
+    def sample(self, simulated_time: int, queue_length: int, paused: int):
+        """
+        :param simulated_time: current simulated time
+        :param queue_length: applications waiting to start
+        :param paused: paused applications
+        :return: None
+        """
+        if self.next_sample is None or simulated_time >= self.next_sample:
+            self.samples.append((simulated_time, queue_length, paused))
+            # the event engine may skip the tick a sample was due; the next one stays on the interval
+            self.next_sample = simulated_time - simulated_time % self.sample_interval + self.sample_interval
+
+    def start(self):
+        if self.profile is not None:
+            self.profile.enable()
+
+    def stop(self):
+        if self.profile is not None:
+            self.profile.disable()
+
+    def get_metadata(self):
+        """
+        :return: the numbers collected, as written into the metadata of the results
+        """
+        metadata = {'phases': {phase: {'calls': calls, 'seconds': seconds}
+                               for phase, (calls, seconds) in self.phases.items()},
+                    'policies': {policy: {'calls': calls, 'decisions': decisions, 'seconds': seconds,
+                                          'latency_histogram_us': histogram}
+                                 for policy, (calls, decisions, seconds, histogram) in self.policies.items()},
+                    'sample_interval': self.sample_interval,
+                    'samples': [list(sample) for sample in self.samples]}
+        if self.profile is not None:
+            stream = io.StringIO()
+            stats = pstats.Stats(self.profile, stream=stream)
+            stats.sort_stats('cumulative').print_stats(CPROFILE_LINES)
+            metadata['cprofile'] = stream.getvalue().splitlines()
+        return metadata
+
+
+def get_profiling_lines(profiling: dict):
+    """
+    :param profiling: metadata from PhaseProfiler.get_metadata
+    :return: lines of the profiling block of a text results file
+    """
+    lines = ['Profiling\n']
+    for phase, totals in profiling['phases'].items():
+        lines.append(f"Phase {phase}: {totals['seconds']:.6f} seconds, {totals['calls']} calls\n")
+    for policy, totals in profiling['policies'].items():
+        lines.append(f"Policy {policy}: {totals['decisions']} decisions, {totals['seconds']:.6f} seconds, "
+                     f"{totals['calls']} calls\n")
+        histogram = totals['latency_histogram_us']
+        used = max((index for index, count in enumerate(histogram) if count), default=-1) + 1
+        lines.append(f'Policy {policy} Decision Latency (us): ' +
+                     ', '.join(f'<{1 << index}: {count}' for index, count in enumerate(histogram[:used])) + '\n')
+    lines.append(f"Samples every {profiling['sample_interval']} seconds (time queue paused): " +
+                 '; '.join(' '.join(str(value) for value in sample) for sample in profiling['samples']) + '\n')
+    for line in profiling.get('cprofile', []):
+        lines.append(f'cProfile {line}\n')
+    return lines
@@ -0,0 +1,140 @@
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+CACHE_DIRECTORY = '.graphing_cache'  # parsed output files, reused until the file changes
+SERIES = {'simulated': (0, np.int64), 'queue': (1, np.int64), 'current_paused': (2, np.int64),
+          'cumulative_paused': (3, np.int64), 'current_migrations': (4, np.int64),
+          'cumulative_migrations': (5, np.int64), 'cumulative_completion': (6, np.int64),
+          'completion_rate': (7, np.float64)}  # attribute of Results: (column in the output file, type)
+
+
+class Results:
+    def __init__(self, policy: str, migration_cost: float, battery: float, total_time: int,
+                 completion_location_counts: list, series: dict = None):
+        """
+        :param policy: migration policy of the run
+        :param migration_cost: cost multiplier of the run (None if the config has none)
+        :param battery: battery size of the run
+        :param total_time: simulated time of the run, in seconds
+        :param completion_location_counts: applications completed at each node
+        :param series: array for each loaded column of the time series, by attribute name (others are None)
+        """
+        self.policy = policy
+        self.migration_cost = migration_cost
+        self.battery = battery
+        self.total_time = total_time
+        self.location_counts = completion_location_counts
+        series = series or {}
+        self.simulated = series.get('simulated')
+        self.queue = series.get('queue')
+        self.current_paused = series.get('current_paused')
+        self.cumulative_paused = series.get('cumulative_paused')
+        self.current_migrations = series.get('current_migrations')
+        self.cumulative_migrations = series.get('cumulative_migrations')
+        self.cumulative_completion = series.get('cumulative_completion')
+        self.completion_rate = series.get('completion_rate')
+
+
+def get_cache_name(path: str):
+    # cache files are named after a hash of the output file's full path, so files of other folders never collide
+    return hashlib.sha1(path.encode()).hexdigest()
+
+
+def parse_output_file(path: str, columns: list):
+    """
+    :param path: full path of an output file written by the simulator
+    :param columns: attributes of Results whose time series to parse (see SERIES)
+    :return: dictionary describing the run, which is saved to the cache
+    """
+    """Reads the header lines, then parses only the requested columns of the time series into the cache"""
+    info = {'policy': None, 'migration_cost': None, 'battery': None, 'total_time': None, 'location_counts': []}
+    counter = False
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.rstrip('\n').split(':')
+            if line[0].startswith('Simulated Time'):
+                break
+            elif line[0] == 'Policy':
+                info['policy'] = line[1].strip()
+            elif line[0] == 'Cost Multiplier':
+                info['migration_cost'] = float(line[1].strip())
+            elif line[0] == 'Battery Size':
+                info['battery'] = float(line[1].strip())
+            elif line[0] == 'Total Simulated Time (seconds)':
+                info['total_time'] = int(line[1].strip())
+            elif line[0] == 'Application Completion Locations':
+                counter = True
+            elif counter:
+                if line[0] == '----------------':
+                    counter = False
+                else:
+                    info['location_counts'].append(int(line[1]))
+        if info['total_time'] is None and 'simulated' not in columns:
+            columns = list(columns) + ['simulated']  # older files only have the total time in the series
+        if columns:
+            values = np.loadtxt(f, delimiter=',', usecols=[SERIES[column][0] for column in columns], ndmin=2)
+        name = get_cache_name(path)
+        for index, column in enumerate(columns):
+            np.save(f'{CACHE_DIRECTORY}/{name}.{column}.npy', values[:, index].astype(SERIES[column][1]))
+    if info['total_time'] is None:
+        info['total_time'] = int(values[-1, columns.index('simulated')])
+    stat = os.stat(path)
+    info.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size, columns=list(columns))
+    return info
+
+
+def load_outputs(directory: str = 'Outputs', columns: list = ()):
+    """
+    :param directory: folder containing the output files
+    :param columns: attributes of Results whose time series are needed (see SERIES)
+    :return: Results of every output file, in os.listdir order
+    """
+    """
+    Files are parsed in parallel the first time they are seen and cached until they change. A cached file is parsed
+    again only if a column it lacks is asked for; the time series are memory-mapped from the cache.
+    """
+    os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+    manifest_path = f'{CACHE_DIRECTORY}/manifest.json'
+    try:
+        with open(manifest_path, 'r') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+
+    # keyed by full path, so output files of the same name in different folders are cached separately
+    directory = os.path.abspath(directory)
+    paths = [f'{directory}/{file}' for file in os.listdir(directory) if os.path.isfile(f'{directory}/{file}')]
+    changed, changed_columns = [], []
+    for path in paths:
+        stat = os.stat(path)
+        cached = manifest.get(path)
+        if cached is None or cached['mtime_ns'] != stat.st_mtime_ns or cached['size'] != stat.st_size:
+            changed.append(path)
+            changed_columns.append(list(columns))
+        elif not set(columns) <= set(cached['columns']) or \
+                not all(os.path.exists(f'{CACHE_DIRECTORY}/{get_cache_name(path)}.{column}.npy') for column in columns):
+            changed.append(path)
+            changed_columns.append(sorted(set(columns) | set(cached['columns'])))
+
+    if changed:
+        with ProcessPoolExecutor() as executor:
+            for path, info in zip(changed, executor.map(parse_output_file, changed, changed_columns)):
+                manifest[path] = info
+        # files that left this folder are forgotten; other folders keep their entries
+        manifest = {path: info for path, info in manifest.items()
+                    if os.path.dirname(path) != directory or path in paths}
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f)
+
+    outputs = []
+    for path in paths:
+        info = manifest[path]
+        series = {column: np.load(f'{CACHE_DIRECTORY}/{get_cache_name(path)}.{column}.npy', mmap_mode='r')
+                  for column in columns}
+        outputs.append(Results(info['policy'], info['migration_cost'], info['battery'], info['total_time'],
+                               info['location_counts'], series))
+    return outputs
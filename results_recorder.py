@@ -0,0 +1,174 @@
+import numpy as np
+
+RECORDING_MODES = ('full', 'sampled', 'changes')
+COLUMNS = (('Simulated Time', np.int64), ('Queue Length', np.int64), ('Currently Paused', np.int64),
+           ('Cumulative Paused Applications', np.int64), ('Current Migrations', np.int64),
+           ('Cumulative Migrations', np.int64), ('Cumulative Completions', np.int64), ('Completion %', np.float64))
+
+
+def expand_changes(columns: list, first_time: int, last_time: int):
+    """
+    :param columns: rows stored in 'changes' mode, an array for each column
+    :param first_time: simulated time of the first tick
+    :param last_time: simulated time of the last tick
+    :return: list with an array for each column, with a row for every tick
+    """
+    # every tick repeats the last stored row at or before it
+    times = np.arange(first_time, last_time + 1)
+    rows = np.searchsorted(columns[0], times, side='right') - 1
+    return [times] + [column[rows] for column in columns[1:]]
+
+
+class ResultsRecorder:
+    def __init__(self, mode: str = 'full', interval: int = 1, chunk_size: int = 65536, sink: object = None):
+        """
+        :param mode: 'full' (every tick), 'sampled' (every interval seconds) or 'changes' (only ticks whose values
+                     differ from the previous tick; the full series is rebuilt exactly)
+        :param interval: seconds between rows in 'sampled' mode
+        :param chunk_size: rows allocated at a time
+        :param sink: ResultsWriter that full chunks are handed to instead of being kept in memory (None keeps them)
+        """
+        """Per-tick results stored in typed arrays, allocated in chunks so the history is never copied as it grows"""
+        self.mode = mode
+        self.interval = max(int(interval), 1)
+        self.chunk_size = chunk_size
+        self.sink = sink
+        self.chunks = []  # one array per column for every chunk (only the last one when there is a sink)
+        self.views = []  # memoryviews of the columns of the last chunk, for fast single-row writes
+        self.position = chunk_size  # rows used in the last chunk
+        self.first_time = None
+        self.last_row = None  # most recent row, whether it was stored or not
+        self.last_stored = None  # most recent stored row
+
+    def __len__(self):
+        # ticks recorded
+        return 0 if self.last_row is None else self.last_row[0] - self.first_time + 1
+
+    def __getstate__(self):
+        # the sink stays with the process that writes it, and memoryviews are rebuilt from the last chunk
+        state = self.__dict__.copy()
+        state['sink'] = None
+        del state['views']
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.views = [memoryview(column) for column in self.chunks[-1]] if self.chunks else []
+
+    def _add_chunk(self):
+        if self.sink is not None:
+            while self.chunks:  # more than one chunk is held when the sink was attached part-way through
+                self.sink.write_chunk(self.chunks.pop(0))
+        chunk = [np.zeros(self.chunk_size, dtype=dtype) for _, dtype in COLUMNS]
+        self.chunks.append(chunk)
+        self.views = [memoryview(column) for column in chunk]
+        self.position = 0
+
+    def _store(self, row: tuple):
+        if self.position == self.chunk_size:
+            self._add_chunk()
+        for view, value in zip(self.views, row):
+            view[self.position] = value
+        self.position += 1
+        self.last_stored = row
+
+    def _store_repeated(self, times: np.ndarray, values: tuple):
+        # stores one row for each time, all with the same values
+        written = 0
+        while written < len(times):
+            if self.position == self.chunk_size:
+                self._add_chunk()
+            count = min(len(times) - written, self.chunk_size - self.position)
+            chunk = self.chunks[-1]
+            chunk[0][self.position:self.position + count] = times[written:written + count]
+            for column, value in zip(chunk[1:], values):
+                column[self.position:self.position + count] = value
+            self.position += count
+            written += count
+        if len(times):
+            self.last_stored = (int(times[-1]),) + tuple(values)
+
+    def record(self, *row):
+        """
+        :param row: simulated time followed by the other values, in the order of COLUMNS
+        :return: None
+        """
+        if self.first_time is None:
+            self.first_time = row[0]
+        self.last_row = row
+        if self.mode == 'sampled':
+            if (row[0] - self.first_time) % self.interval == 0:
+                self._store(row)
+        elif self.mode == 'changes':
+            if self.last_stored is None or row[1:] != self.last_stored[1:]:
+                self._store(row)
+        else:
+            self._store(row)
+
+    def record_repeated(self, start: int, stop: int, *values):
+        """
+        :param start: simulated time of the first row
+        :param stop: simulated time after the last row
+        :param values: values of every row, in the order of COLUMNS without the simulated time
+        :return: None
+        """
+        """Records a stretch of ticks in which nothing changed (the ticks skipped by the event engine)"""
+        if stop <= start:
+            return
+        if self.first_time is None:
+            self.first_time = start
+        if self.mode == 'sampled':
+            first = start + (self.first_time - start) % self.interval
+            self._store_repeated(np.arange(first, stop, self.interval), values)
+        elif self.mode == 'changes':
+            if self.last_stored is None or tuple(values) != self.last_stored[1:]:
+                self._store((start,) + tuple(values))
+        else:
+            self._store_repeated(np.arange(start, stop), values)
+        self.last_row = (stop - 1,) + tuple(values)
+
+    def finish(self):
+        """
+        :return: None
+        """
+        """Called once the simulation ends: keeps the last tick in 'sampled' mode and hands what is left to the sink"""
+        if self.mode == 'sampled' and self.last_row is not None and self.last_stored[0] != self.last_row[0]:
+            self._store(self.last_row)  # the last tick holds the total simulated time
+        if self.sink is not None and self.chunks:
+            while len(self.chunks) > 1:
+                self.sink.write_chunk(self.chunks.pop(0))
+            self.sink.write_chunk([column[:self.position] for column in self.chunks.pop()])
+            self.position = self.chunk_size
+
+    def get_metadata(self):
+        """
+        :return: how the rows were recorded, for reading them back
+        """
+        last_time = None if self.last_row is None else self.last_row[0]
+        return {'recording': self.mode, 'interval': self.interval, 'first_time': self.first_time,
+                'last_time': last_time}
+
+    def get_stored(self):
+        """
+        :return: list with an array of the stored rows for each column
+        """
+        if not self.chunks:
+            return [np.zeros(0, dtype=dtype) for _, dtype in COLUMNS]
+        columns = [np.concatenate([chunk[index] for chunk in self.chunks]) for index in range(len(COLUMNS))]
+        stored = (len(self.chunks) - 1) * self.chunk_size + self.position
+        return [column[:stored] for column in columns]
+
+    def get_series(self):
+        """
+        :return: list with an array for each column: every tick in 'full' and 'changes' mode, the samples and the
+                 last tick in 'sampled' mode
+        """
+        columns = self.get_stored()
+        if self.last_row is None:
+            return columns
+        if self.mode == 'changes':
+            return expand_changes(columns, self.first_time, self.last_row[0])
+        if self.mode == 'sampled' and (not len(columns[0]) or columns[0][-1] != self.last_row[0]):
+            # always finish with the last tick, which holds the total simulated time
+            return [np.append(column, value).astype(column.dtype) for column, value in zip(columns, self.last_row)]
+        return columns
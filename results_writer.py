@@ -0,0 +1,174 @@
+import os
+import sys
+import gzip
+import lzma
+import json
+import queue
+import threading
+
+import numpy as np
+
+from results_recorder import *
+from profiling import *
+
+RESULTS_DIRECTORY = 'Results'  # binary results, one folder per run
+RESULTS_FORMATS = ('text', 'binary')
+COMPRESSIONS = {'none': ('', open), 'gzip': ('.gz', gzip.open), 'lzma': ('.xz', lzma.open)}
+
+
+def get_chunk_name(index: int, compression: str):
+    return f'chunk_{index:05d}.npy{COMPRESSIONS[compression][0]}'
+
+
+class ResultsWriter:
+    def __init__(self, directory: str, compression: str = 'none', queue_size: int = 4, first_chunk: int = 0,
+                 rows: int = 0):
+        """
+        :param directory: folder the run is written to (created if needed)
+        :param compression: 'none', 'gzip' or 'lzma'
+        :param queue_size: chunks that may wait to be written before the simulation has to wait for the disk
+        :param first_chunk: chunks already in the folder, written before a snapshot of the run (numbering continues)
+        :param rows: rows in those chunks
+        """
+        """
+        Streams chunks of results to disk on a background thread. Each chunk is one file holding every column as a
+        .npy array, one after another; metadata.json describes the run and lists the chunks.
+        """
+        self.directory = directory
+        self.compression = compression
+        self.extension, self.opener = COMPRESSIONS[compression]
+        self.chunks = [get_chunk_name(index, compression) for index in range(first_chunk)]  # file names, in order
+        self.rows = rows
+        self.error = None  # exception raised by the writer thread, raised again in the simulation
+        self.queue = queue.Queue(maxsize=queue_size)
+        os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self._write_chunks, daemon=True)
+        self.thread.start()
+
+    def _write_chunks(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            name, columns = item
+            try:
+                with self.opener(f'{self.directory}/{name}', 'wb') as file:
+                    for column in columns:
+                        np.save(file, column)
+            except Exception as error:
+                self.error = error
+            self.queue.task_done()
+
+    def write_chunk(self, columns: list):
+        """
+        :param columns: array of rows for each column, in the order of COLUMNS (must not change afterwards)
+        :return: None
+        """
+        if self.error is not None:
+            raise self.error
+        name = get_chunk_name(len(self.chunks), self.compression)
+        self.chunks.append(name)
+        self.rows += len(columns[0])
+        self.queue.put((name, columns))  # waits while the queue is full
+
+    def flush(self):
+        """
+        :return: None
+        """
+        """Waits for every chunk handed over so far to be written (e.g. before the run is snapshotted)"""
+        self.queue.join()
+        if self.error is not None:
+            raise self.error
+
+    def close(self, metadata: dict):
+        """
+        :param metadata: description of the run (config lines, completion info, completion locations, recording)
+        :return: None
+        """
+        """Waits for every chunk to be written, then writes metadata.json"""
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        metadata = dict(metadata, columns=[[name, np.dtype(dtype).str] for name, dtype in COLUMNS],
+                        compression=self.compression, chunks=self.chunks, rows=self.rows)
+        with open(f'{self.directory}/metadata.json', 'w') as file:
+            json.dump(metadata, file, indent=1)
+
+
+def load_results(directory: str):
+    """
+    :param directory: folder written by a ResultsWriter
+    :return: metadata dictionary and a list with an array for each column, covering every tick of the run
+             (every sample in 'sampled' mode)
+    """
+    with open(f'{directory}/metadata.json', 'r') as file:
+        metadata = json.load(file)
+    opener = COMPRESSIONS[metadata['compression']][1]
+    chunks = [[] for _ in metadata['columns']]
+    for name in metadata['chunks']:
+        with opener(f'{directory}/{name}', 'rb') as file:
+            for column in chunks:
+                column.append(np.load(file))
+    columns = [np.concatenate(column) if column else np.zeros(0, dtype=dtype)
+               for column, (_, dtype) in zip(chunks, metadata['columns'])]
+    if metadata['recording'] == 'changes':
+        columns = expand_changes(columns, metadata['first_time'], metadata['last_time'])
+    return metadata, columns
+
+
+def write_text_results(path: str, metadata: dict, columns: list):
+    """
+    :param path: text file to write
+    :param metadata: config lines, nodes, completion info and completion locations of the run
+    :param columns: array for each column, in the order of COLUMNS
+    :return: None
+    """
+    """Writes the text layout read by graphing.py"""
+    with open(path, 'w') as file:
+        for line in metadata['config']:
+            file.write(line)
+            if line == 'Config\n':
+                file.write(f"Nodes: {metadata['nodes']}\n")
+
+        file.write('\n----------------\n')
+        file.write("Completion Info\n")
+        file.write(f"Total Simulated Time (seconds): {metadata['simulated_time']}\n")
+        file.write(f"Total Overhead Time (seconds): {metadata['overhead']}\n")
+        file.write(f"Idle Rate: {metadata['idle_rate']}")
+        file.write('\n----------------\n')
+
+        file.write('Application Completion Locations\n')
+        for index, completed in metadata['completion_locations']:
+            file.write(f'Node {index}: {completed}\n')
+        file.write('----------------\n')
+
+        if metadata.get('profiling') is not None:
+            file.writelines(get_profiling_lines(metadata['profiling']))
+            file.write('----------------\n')
+
+        file.write(', '.join(name for name, _ in COLUMNS) + '\n')
+        for start in range(0, len(columns[0]), 65536):  # a block of lines at a time
+            rows = zip(*(column[start:start + 65536].tolist() for column in columns))
+            file.writelines(''.join(f'{str(value)}, ' for value in row) + '\n' for row in rows)
+
+
+def export_text(directory: str, output_directory: str = 'Outputs'):
+    """
+    :param directory: folder written by a ResultsWriter
+    :param output_directory: folder to write the text file to
+    :return: path of the text file
+    """
+    metadata, columns = load_results(directory)
+    path = f'{output_directory}/{os.path.basename(os.path.normpath(directory))}.txt'
+    write_text_results(path, metadata, columns)
+    return path
+
+
+if __name__ == '__main__':
+    # exports the given runs (every run in Results without a text file in Outputs if none are given) for graphing.py
+    runs = sys.argv[1:] or [f'{RESULTS_DIRECTORY}/{run}' for run in sorted(os.listdir(RESULTS_DIRECTORY))
+                            if not os.path.exists(f'Outputs/{run}.txt')]
+    for run in runs:
+        print(f'Exported {export_text(run)}')
@@ -1,19 +1,28 @@
-import operator
 import random
 import os
 import csv
 
-from __main__ import *
+import numpy as np
 
+from edge_computing_system import *
+from irradiance_store import *
+from pending_queue import *
+from distance_matrix import *
+from trace_loader import *
+from arrivals import *
 
-def config_setup():
+NODE_PLACEMENTS = ('assigned', 'assigned-random', 'random')
+
+
+def config_setup(config_file: str = 'config.txt'):
     """
+    :param config_file: config file to read
     :return: config_info: dictionary containing parameter:value pairs
     """
     """Converts parameters from config.txt into a dictionary for the simulator to reference when needed"""
     config_info = {}
     files_lines = 1
-    with open('config.txt', 'r') as file:
+    with open(config_file, 'r') as file:
         reader = csv.reader(file, delimiter=':')
         next(reader)  # skip header
         for line in reader:
@@ -24,19 +33,19 @@ def config_setup():
     return config_info
 
 
-def get_node_info():
+def get_node_info(directory: str = 'Irradiance Lists'):
     num_nodes = 0
     coords = []
-    for file in os.listdir('Irradiance Lists'):
+    for file in os.listdir(directory):
         num_nodes += 1
-        with open(f'Irradiance Lists/{file}', 'r') as file:
+        with open(f'{directory}/{file}', 'r') as file:
             line = file.readline().rstrip().split(',')
             coords.append((line[0], line[1]))  # lat/long values
     return num_nodes, coords
 
 
 def generate_nodes(num_edges: int, num_servers: int, edge_pv_efficiency: float, edge_pv_area: float, server_cores: int,
-                   server_memory: int, battery: float, coords: list, method: str):
+                   server_memory: int, battery: float, coords: list, method: str, power_state: object):
     """
     :param battery: amount of energy that can be stored
     :param num_edges: number of nodes in the edge computing system
@@ -47,6 +56,7 @@ def generate_nodes(num_edges: int, num_servers: int, edge_pv_efficiency: float,
     :param server_memory: amount of memory per core, in MB
     :param coords: coordinates of nodes
     :param method: algorithm to determine how nodes will be generated
+    :param power_state: PowerState the servers of every node keep up to date
     :return: edge_computing_systems (list of nodes)
     """
     """ Initialize nodes for edge computing system """
@@ -54,7 +64,7 @@ def generate_nodes(num_edges: int, num_servers: int, edge_pv_efficiency: float,
     # create edge sites
     for edge in range(num_edges):
         latitude, longitude = generate_location(coords, method)
-        edge_site = EdgeSystem(edge_pv_efficiency, edge_pv_area, latitude, longitude, battery, edge)
+        edge_site = EdgeSystem(edge_pv_efficiency, edge_pv_area, latitude, longitude, battery, edge, power_state)
         edge_site.servers = [edge_site.get_server_object(server_cores, server_memory, edge_site) for _
                              in range(num_servers)]
         edge_computing_systems.append(edge_site)
@@ -87,106 +97,74 @@ def generate_location(coords: list, method: str):
         return None, None
 
 
-def generate_applications(file: str):
+def generate_applications(traces: object, edge_computing_systems: list, arrivals: str = 'start'):
     """
-    :param file: csv file containing applications
-    :return: applications (list of applications)
+    :param traces: Traces loaded from the csv file containing applications (see load_traces)
+    :param edge_computing_systems: list of nodes the applications will run on
+    :param arrivals: 'start' (every application is queued at time 0) or 'submit' (queued at its submit time)
+    :return: applications (PendingQueue of applications, in arrival order) and the ApplicationArrivals feeding it
     """
-    """Convert application information from file into a list"""
-    # create applications
-    applications = []  # initialize list of class instances
-    with open(file, 'r') as csv_file:
-        csv_reader = csv.reader(csv_file, delimiter=',')
-        next(csv_reader)  # skip header
-        for row in csv_reader:
-            try:
-                applications.append(Application(int(float(row[2])), int(float(row[3])), int(float(row[5]))))
-            except ValueError:
-                pass
-    return applications
+    """Convert application information from file into a queue of pending applications"""
+    servers = [server for node in edge_computing_systems for server in node.servers]
+    applications = PendingQueue(ApplicationTable(servers))
+    application_arrivals = ApplicationArrivals(traces, applications, arrivals)
+    application_arrivals.release(0)
+    return applications, application_arrivals
 
 
-def generate_irradiance_list(file: str):
+def generate_irradiance_list(file: str, coords: list = None):
     """
-    :param file: text file containing irradiance values for each time period
-    :return: irr_list (tuple of tuples containing irradiance values for each node
+    :param file: text file (or irradiance store) containing irradiance values for each time period
+    :param coords: (latitude, longitude) of each node, kept in the store header
+    :return: irr_list (view indexed as irr_list[time][node index])
     """
-    """Convert solar irradiance information from file into a list"""
-    irr_list = []
-    with open(file, 'r') as txt_file:
-        txt_reader = csv.reader(txt_file, delimiter=',')
-        next(txt_reader)  # skip header
-        next(txt_reader)  # skip header
-        for row in txt_reader:
-            irr_interval = []
-            for value in row:
-                irr_interval.append(float(value))
-            irr_list.append(tuple(irr_interval))
+    """Memory-map solar irradiance information, converting the text file to a binary store the first time"""
+    return open_irradiance(file, coords)
 
-    return tuple(irr_list)
 
-
-def get_distances(edge_computing_systems: list):
+def get_distances(edge_computing_systems: list, cache: bool = True):
     """
     :param edge_computing_systems: list of nodes
-    :return: location_distances (dictionary of (loc1,loc2):distance pairs)
+    :param cache: reuse distances computed by earlier runs with the same node coordinates
+    :return: location_distances (symmetric N x N array of distances in km, indexed by EdgeSystem.index)
     """
     """Helper function to calculate distances between each node"""
-    if len(edge_computing_systems) == 1:
-        return None
-    location_distances = {}  # dictionary lookup table; (loc1, loc2): distance
-    if len(edge_computing_systems) > 1:  # only does if more than one node
-        combos = itertools.combinations(edge_computing_systems, 2)  # every combination of two nodes
-        for pair in combos:
-            loc1 = (pair[0].lat, pair[0].long)  # coordinates for location 1
-            loc2 = (pair[1].lat, pair[1].long)  # coordinates for location 2
-            location_distances[pair] = gd(loc1, loc2).km
-    return location_distances
+    return get_distance_matrix([(node.lat, node.long) for node in edge_computing_systems], cache)
 
 
-def get_shortest_distances(edge_computing_systems: list):
+def get_shortest_distances(edge_computing_systems: list, cache: bool = True, location_distances: np.ndarray = None):
     """
     :param edge_computing_systems: list of nodes
+    :param cache: reuse distances computed by earlier runs with the same node coordinates
+    :param location_distances: distances already computed by get_distances (None computes them)
     :return: shortest_distances (dictionary of node:(closest node,distance) pairs) and location distances (all paths)
     """
     """For each node, determines the nearest neighboring node"""
-    location_distances = get_distances(edge_computing_systems)
+    if location_distances is None:
+        location_distances = get_distances(edge_computing_systems, cache)
     if len(edge_computing_systems) == 1:
         shortest_distance = {edge_computing_systems[0]: (edge_computing_systems[0], 0)}
         return shortest_distance, location_distances
     shortest_distances = {}
-    for edge, key in itertools.product(edge_computing_systems, location_distances.keys()):
-        potential_shortest = {}
-        if (key[0] == edge or key[1] == edge) and key[0] != edge:
-            potential_shortest[key[0]] = location_distances[key]
-        else:
-            potential_shortest[key[1]] = location_distances[key]
-        shortest_distances[edge] = min(potential_shortest.items(), key=operator.itemgetter(1))
+    for edge, nearest in zip(edge_computing_systems, get_nearest_neighbours(location_distances)):
+        shortest_distances[edge] = (edge_computing_systems[nearest], location_distances.item(edge.index, nearest))
     return shortest_distances, location_distances
 
 
-def check_min_req(application_list: list, server_cores: int, server_memory: int, degradable_applications: bool):
+def check_min_req(traces: object, server_cores: int, server_memory: int, degradable_applications: bool):
     """
-    :param application_list: list of applications
+    :param traces: Traces of the applications (their largest cores and memory were found while loading them)
     :param server_cores: cores per server
     :param server_memory: memory per server, in MB
     :param degradable_applications: whether applications can vary CPU usage based on availability
     :return: None
     """
-    """Determines if provided resources can support the application load"""
-    max_cores, max_memory = 0, 0
-    for app in application_list:
-        if app.cores > max_cores:
-            max_cores = app.cores
-        if app.memory > max_memory:
-            max_memory = app.memory
-    if max_cores > server_cores and max_memory > server_memory and not degradable_applications:
-        print(f'Allotted {server_cores} core(s) per server. Minimum of {max_cores} required')
-        print(f'Allotted {server_memory} MB of memory per server. Minimum of {max_memory} MB required')
-        quit()
+    """Determines if provided resources can support the application load (raises ValueError if they cannot)"""
+    max_cores, max_memory = traces.max_cores, traces.max_memory
+    problems = []
     if max_cores > server_cores and not degradable_applications:
-        print(f'Allotted {server_cores} core(s) per server. Minimum of {max_cores} required')
-        quit()
+        problems.append(f'Allotted {server_cores} core(s) per server. Minimum of {max_cores} required')
     if max_memory > server_memory:
-        print(f'Allotted {server_memory} MB of memory per server. Minimum of {max_memory} MB required')
-        quit()
\ No newline at end of file
+        problems.append(f'Allotted {server_memory} MB of memory per server. Minimum of {max_memory} MB required')
+    if problems:
+        raise ValueError('\n'.join(problems))
@@ -0,0 +1,768 @@
+import os
+import pickle
+import shutil
+import time
+from datetime import datetime
+
+from edge_computing_system import *
+from policies import *
+from setup import *
+from event_engine import *
+from power_timeline import *
+from irradiance_windows import *
+from paused_queue import *
+from results_recorder import *
+from results_writer import *
+from profiling import *
+
+SEC_PER_DAY = 86400  # the simulation starts at t=86400 of the irradiance list
+MAX_ITERATIONS = 100000000
+
+
+class SimulationConfig:
+    # attribute: (key in config.txt, type, default; None for keys every config must have)
+    KEYS = {'servers_per_node': ('Servers per Node', int, None),
+            'cores_per_server': ('Cores per Server', int, None),
+            'memory_per_server': ('Memory per Server', int, None),
+            'battery': ('Battery Size', float, None),
+            'power_per_server': ('Power per Server Needed', float, None),
+            'pv_efficiency': ('PV Efficiency', float, None),
+            'pv_area': ('PV Area', float, None),
+            'delay_function': ('Delay Function', str, None),
+            'node_placement': ('Node Placement', str, None),
+            'policy': ('Policy', str, None),
+            'global_applications': ('Global Applications', bool, None),
+            'degradable_applications': ('Degradable Applications', bool, None),
+            'degradable_multiplier': ('Degradable Multiplier', float, None),
+            'traces': ('Traces', str, None),
+            'irradiance_list': ('Irradiance List', str, None),
+            'diagnostics': ('Diagnostics', bool, None),
+            'engine': ('Simulation Engine', str, 'tick'),
+            'placement': ('Placement', str, 'first-fit'),
+            'arrivals': ('Application Arrivals', str, 'start'),
+            'recording': ('Results Recording', str, 'full'),
+            'recording_interval': ('Results Interval', int, 1),
+            'results_format': ('Results Format', str, 'text'),
+            'compression': ('Results Compression', str, 'none'),
+            'profiling': ('Profiling', str, 'off'),
+            'profiling_interval': ('Profiling Interval', int, 3600),
+            'irradiance_model': ('Irradiance Model', str, 'file'),
+            'irradiance_days': ('Irradiance Days', int, 30),
+            'clouds': ('Clouds', bool, False),
+            'cloud_seed': ('Cloud Seed', int, 0)}
+    CHOICES = {'node_placement': NODE_PLACEMENTS, 'policy': POLICIES, 'engine': ('tick', 'event'),
+               'placement': PLACEMENTS, 'arrivals': ARRIVALS, 'recording': RECORDING_MODES,
+               'results_format': RESULTS_FORMATS, 'compression': tuple(COMPRESSIONS), 'profiling': PROFILING,
+               'irradiance_model': IRRADIANCE_MODELS}
+
+    def __init__(self, servers_per_node: int, cores_per_server: int, memory_per_server: int, battery: float,
+                 power_per_server: float, pv_efficiency: float, pv_area: float, delay_function: str,
+                 node_placement: str, policy: str, global_applications: bool, degradable_applications: bool,
+                 degradable_multiplier: float, traces: str, irradiance_list: str, diagnostics: bool = False,
+                 engine: str = 'tick', placement: str = 'first-fit', arrivals: str = 'start', recording: str = 'full',
+                 recording_interval: int = 1, results_format: str = 'text', compression: str = 'none',
+                 profiling: str = 'off', profiling_interval: int = 3600, irradiance_model: str = 'file',
+                 irradiance_days: int = 30, clouds: bool = False, cloud_seed: int = 0, lines: list = None):
+        """
+        :param servers_per_node: number of servers per node
+        :param cores_per_server: number of cores per server
+        :param memory_per_server: memory per server, in MB
+        :param battery: battery size of each node (0 disables batteries)
+        :param power_per_server: power that each server needs to operate, in W
+        :param pv_efficiency: efficiency of the PV cells
+        :param pv_area: area of PV cells, in m^2
+        :param delay_function: transfer rate in terms of x (distance in km)
+        :param node_placement: 'assigned', 'assigned-random' or 'random'
+        :param policy: migration policy
+        :param global_applications: applications can start at any node, not only the first
+        :param degradable_applications: applications can vary CPU usage based on availability
+        :param degradable_multiplier: how many more cores can be utilized compared to the original core count
+        :param traces: csv file containing applications
+        :param irradiance_list: irradiance store or text file (read when the irradiance model is 'file')
+        :param diagnostics: print what happens every tick
+        :param engine: 'tick' (every second) or 'event' (skips seconds in which nothing can happen)
+        :param placement: 'first-fit' or 'best-fit' choice of server
+        :param arrivals: 'start' (every application is queued at time 0) or 'submit' (queued at its submit time)
+        :param recording: 'full', 'sampled' or 'changes' (see ResultsRecorder)
+        :param recording_interval: seconds between rows when sampled
+        :param results_format: 'text' or 'binary'
+        :param compression: 'none', 'gzip' or 'lzma' (binary results only)
+        :param profiling: 'off', 'phases' (time spent in each phase of a tick) or 'cprofile' (phases and cProfile)
+        :param profiling_interval: simulated seconds between samples of the queue sizes when profiling
+        :param irradiance_model: 'file' (the irradiance list) or 'clear-sky' (computed from the node coordinates)
+        :param irradiance_days: days covered by the clear-sky model, including the day before the simulation starts
+        :param clouds: attenuate the clear-sky model with random cloud cover
+        :param cloud_seed: seed of the cloud cover
+        :param lines: config.txt lines the config was read from, copied into the results (None writes every key)
+        """
+        """Typed simulation parameters; raises ValueError for a choice that does not exist"""
+        self.servers_per_node = servers_per_node
+        self.cores_per_server = cores_per_server
+        self.memory_per_server = memory_per_server
+        self.battery = battery
+        self.power_per_server = power_per_server
+        self.pv_efficiency = pv_efficiency
+        self.pv_area = pv_area
+        self.delay_function = delay_function
+        self.node_placement = node_placement
+        self.policy = policy
+        self.global_applications = global_applications
+        self.degradable_applications = degradable_applications
+        self.degradable_multiplier = degradable_multiplier
+        self.traces = traces
+        self.irradiance_list = irradiance_list
+        self.diagnostics = diagnostics
+        self.engine = engine
+        self.placement = placement
+        self.arrivals = arrivals
+        self.recording = recording
+        self.recording_interval = recording_interval
+        self.results_format = results_format
+        self.compression = compression
+        self.profiling = profiling
+        self.profiling_interval = profiling_interval
+        self.irradiance_model = irradiance_model
+        self.irradiance_days = irradiance_days
+        self.clouds = clouds
+        self.cloud_seed = cloud_seed
+        self.lines = lines
+        for name, choices in self.CHOICES.items():
+            if getattr(self, name) not in choices:
+                raise ValueError(f'Unknown {self.KEYS[name][0].lower()} {getattr(self, name)}, expected one of '
+                                 f'{", ".join(choices)}')
+
+    @classmethod
+    def from_dict(cls, config_info: dict, lines: list = None):
+        """
+        :param config_info: parameter:value pairs, as read from config.txt by config_setup
+        :param lines: config.txt lines, copied into the results
+        :return: SimulationConfig
+        """
+        values = {}
+        for name, (key, kind, default) in cls.KEYS.items():
+            if key not in config_info:
+                if default is None:
+                    raise ValueError(f'{key} is missing from the config')
+                continue
+            value = str(config_info[key]).strip()
+            values[name] = value == 'True' if kind is bool else kind(value)
+        return cls(lines=lines, **values)
+
+    @classmethod
+    def from_file(cls, file: str = 'config.txt'):
+        """
+        :param file: config file
+        :return: SimulationConfig
+        """
+        with open(file, 'r') as config:
+            lines = config.readlines()
+        return cls.from_dict(config_setup(file), lines)
+
+    def to_dict(self):
+        """
+        :return: parameter:value pairs, as written in config.txt
+        """
+        return {key: getattr(self, name) for name, (key, _, _) in self.KEYS.items()}
+
+    def replace(self, **changes):
+        """
+        :param changes: attributes to change
+        :return: copy of the config with the changes (its results list every key instead of the original lines)
+        """
+        values = {name: getattr(self, name) for name in self.KEYS}
+        values.update(changes)
+        return SimulationConfig(**values)
+
+    def get_lines(self):
+        """
+        :return: lines written at the top of the results
+        """
+        if self.lines is not None:
+            return list(self.lines)
+        return ['Config\n'] + [f'{key}: {value}\n' for key, value in self.to_dict().items()]
+
+
+class Datasets:
+    def __init__(self, node_directory: str = 'Irradiance Lists', coords: list = None):
+        """
+        :param node_directory: folder with one irradiance file per node, whose first line holds its coordinates
+        :param coords: (latitude, longitude) of each node, instead of reading them from node_directory
+        """
+        """
+        Traces, irradiance lists and distance matrices loaded once and shared by every simulation using them, along with
+        the models built from them. Files are loaded the first time a simulation asks for them; load() loads them up
+        front (e.g. before forking).
+        """
+        self.node_directory = node_directory
+        self.coords = list(coords) if coords is not None else get_node_info(node_directory)[1]
+        self.traces = {}  # file: Traces
+        self.irradiance = {}  # file: IrradianceView
+        self.clear_sky = {}  # (node coordinates, days, clouds, cloud seed): ClearSkyIrradiance
+        self.distances = {}  # tuple of node coordinates: distance matrix
+        self.power_timelines = {}  # (irradiance key, nodes, power per server): PowerTimeline
+        self.irradiance_windows = {}  # irradiance key: IrradianceWindows
+        self.delay_models = {}  # (delay function, node coordinates, trace file): DelayModel
+        self.delay_functions = set()  # delay functions of a sweep, whose models are built together (see load)
+
+    def load(self, traces: list = (), irradiance_lists: list = (), delay_functions: list = ()):
+        """
+        :param traces: csv files containing applications
+        :param irradiance_lists: irradiance files
+        :param delay_functions: delay functions the simulations will use; the first delay model asked for builds the
+                                models of all of them for the same nodes and traces in one pass
+        :return: self
+        """
+        for file in traces:
+            self.get_traces(file)
+        for file in irradiance_lists:
+            self.get_irradiance(file)
+        self.delay_functions.update(delay_functions)
+        return self
+
+    def get_coords(self):
+        # generate_nodes takes coordinates off the list it is given
+        return list(self.coords)
+
+    def get_traces(self, file: str):
+        if file not in self.traces:
+            self.traces[file] = load_traces(file)
+            if self.traces[file].rejected:
+                print(f'Skipped {self.traces[file].rejected} malformed row(s) of {file}')
+        return self.traces[file]
+
+    def get_irradiance(self, file: str):
+        if file not in self.irradiance:
+            self.irradiance[file] = generate_irradiance_list(file, self.get_coords())
+        return self.irradiance[file]
+
+    def get_distances(self, edge_computing_systems: list, cache: bool = True):
+        """
+        :param edge_computing_systems: list of nodes
+        :param cache: reuse distances computed by earlier runs with the same node coordinates (random nodes don't)
+        :return: symmetric N x N array of distances in km, indexed by EdgeSystem.index
+        """
+        key = tuple((node.lat, node.long) for node in edge_computing_systems)
+        if not cache:
+            return get_distances(edge_computing_systems, False)
+        if key not in self.distances:
+            self.distances[key] = get_distances(edge_computing_systems, True)
+        return self.distances[key]
+
+    def get_clear_sky(self, coords: list, days: int, clouds: bool, seed: int, cache: bool = True):
+        """
+        :param coords: (latitude, longitude) of each node, by node index
+        :param days: days covered
+        :param clouds: attenuate the irradiance with random cloud cover
+        :param seed: seed of the cloud cover
+        :param cache: reuse the model of earlier runs with the same nodes (random nodes don't)
+        :return: ClearSkyIrradiance
+        """
+        key = (tuple(coords), days, clouds, seed)
+        if not cache:
+            return ClearSkyIrradiance(coords, days, clouds, seed)
+        if key not in self.clear_sky:
+            self.clear_sky[key] = ClearSkyIrradiance(coords, days, clouds, seed)
+        return self.clear_sky[key]
+
+    def get_power_timeline(self, edge_computing_systems: list, irradiance_key: tuple, irradiance_list: object,
+                           power_per_server: float, cache: bool = True):
+        """
+        :param edge_computing_systems: list of nodes
+        :param irradiance_key: what irradiance_list was built from (see Simulation._build_models)
+        :param irradiance_list: IrradianceProvider with the irradiance values of every node
+        :param power_per_server: power that each server needs to operate, in W
+        :param cache: reuse the timeline of earlier runs with the same inputs
+        :return: PowerTimeline
+        """
+        key = (irradiance_key, tuple((node.index, node.pv_efficiency, node.pv_area, len(node.servers))
+                                     for node in edge_computing_systems), power_per_server)
+        if not cache:
+            return PowerTimeline(edge_computing_systems, irradiance_list, power_per_server)
+        if key not in self.power_timelines:
+            self.power_timelines[key] = PowerTimeline(edge_computing_systems, irradiance_list, power_per_server)
+        return self.power_timelines[key]
+
+    def get_irradiance_windows(self, irradiance_key: tuple, irradiance_list: object, cache: bool = True):
+        """
+        :param irradiance_key: what irradiance_list was built from (see Simulation._build_models)
+        :param irradiance_list: IrradianceProvider with the irradiance values of every node
+        :param cache: reuse the windows of earlier runs with the same irradiance
+        :return: IrradianceWindows
+        """
+        if not cache:
+            return IrradianceWindows(irradiance_list)
+        if irradiance_key not in self.irradiance_windows:
+            self.irradiance_windows[irradiance_key] = IrradianceWindows(irradiance_list)
+        return self.irradiance_windows[irradiance_key]
+
+    def get_delay_model(self, delay_function: str, edge_computing_systems: list, location_distances: object,
+                        traces: str, cache: bool = True):
+        """
+        :param delay_function: transfer rate in terms of x (distance in km)
+        :param edge_computing_systems: list of nodes
+        :param location_distances: distances between the nodes, in km
+        :param traces: csv file containing the applications
+        :param cache: reuse the model of earlier runs with the same nodes (random nodes don't)
+        :return: DelayModel
+        """
+        nodes = tuple((node.lat, node.long) for node in edge_computing_systems)
+        if not cache:
+            return DelayModel(delay_function, location_distances, self.get_traces(traces).memory_counts)
+        if (delay_function, nodes, traces) not in self.delay_models:
+            # the other delay functions of the sweep are evaluated over the same distances while they are at hand
+            missing = [function for function in sorted(self.delay_functions | {delay_function})
+                       if (function, nodes, traces) not in self.delay_models]
+            models = build_delay_models(missing, location_distances, self.get_traces(traces).memory_counts)
+            for function, model in models.items():
+                self.delay_models[function, nodes, traces] = model
+        return self.delay_models[delay_function, nodes, traces]
+
+
+class SimulationResult:
+    def __init__(self, config: object, nodes: int, simulated_time: int, total_overhead: int, idle_rate: float,
+                 completion_locations: list, recorder: object, execution_time: float, output: str = None,
+                 profiling: dict = None):
+        """
+        :param config: SimulationConfig of the run
+        :param nodes: number of nodes
+        :param simulated_time: simulated seconds until every application completed
+        :param total_overhead: seconds the completed applications spent paused
+        :param idle_rate: average share of their time the completed applications spent paused
+        :param completion_locations: [node index, applications completed there] for every node
+        :param recorder: ResultsRecorder with the per-tick results
+        :param execution_time: wall time of the run, in seconds
+        :param output: file or folder the results were written to (None if they were not written)
+        :param profiling: numbers collected by the PhaseProfiler (None when profiling is off)
+        """
+        self.config = config
+        self.nodes = nodes
+        self.simulated_time = simulated_time
+        self.total_overhead = total_overhead
+        self.idle_rate = idle_rate
+        self.completion_locations = completion_locations
+        self.recorder = recorder
+        self.execution_time = execution_time
+        self.output = output
+        self.profiling = profiling
+
+    def get_metadata(self):
+        """
+        :return: config lines, completion info, completion locations and profiling, as written with the results
+        """
+        metadata = {'config': self.config.get_lines(), 'nodes': self.nodes, 'simulated_time': self.simulated_time,
+                    'overhead': self.total_overhead, 'idle_rate': self.idle_rate,
+                    'completion_locations': self.completion_locations}
+        if self.profiling is not None:
+            metadata['profiling'] = self.profiling
+        return metadata
+
+    def get_series(self):
+        """
+        :return: list with an array for each column of the per-tick results (see ResultsRecorder.get_series)
+        """
+        return self.recorder.get_series()
+
+    def write_text(self, path: str):
+        """
+        :param path: text file to write, in the layout read by graphing.py
+        :return: None
+        """
+        write_text_results(path, self.get_metadata(), self.get_series())
+        self.output = path
+
+
+def get_applications_running(power_state: object):
+    """
+    :param power_state: PowerState shared by the nodes
+    :return: boolean
+    """
+    """Determines if no server among any of the nodes is currently running applications (True when all are idle)"""
+    return power_state.running_applications == 0
+
+
+class Simulation:
+    # attributes rebuilt from the datasets instead of being kept in snapshots
+    MODELS = ('datasets', 'location_distances', 'shortest_distances', 'traces', 'irradiance_list', 'power_timeline',
+              'irradiance_windows', 'delay_model', 'results_writer', 'output_name', 'phases')
+    # config settings a restored simulation may change: the policy and settings that only affect the output (the
+    # others, including the placement of started applications, shaped the state saved in the snapshot)
+    FORK_SETTINGS = ('policy', 'diagnostics', 'results_format', 'compression', 'profiling', 'profiling_interval')
+    # phase of a tick: function running it (the arrivals and the recording are methods, see _build_phases)
+    PHASES = {'signature': get_state_signature, 'complete': complete_applications, 'shutdown': shutdown_servers,
+              'resume': resume_applications, 'start': start_applications, 'batteries': update_batteries,
+              'running': get_applications_running, 'event skip': advance_to_next_event}
+
+    def __init__(self, config: object, datasets: object = None, output_name: str = None):
+        """
+        :param config: SimulationConfig
+        :param datasets: Datasets shared with other simulations (None loads the files for this simulation only)
+        :param output_name: name of the results file in Outputs (text) or folder in Results (binary); None keeps the
+                            results in memory only
+        """
+        """One simulation run: the nodes, the applications and the policies, advanced one tick at a time"""
+        self.config = config
+        self.output_name = output_name
+        self.execution_time = 0.0
+        start_time = time.time()
+
+        datasets = datasets if datasets is not None else Datasets()
+        coords = datasets.get_coords()
+        self.power_state = PowerState(config.battery > 0)  # counts kept up to date by the servers of every node
+        self.edge_computing_systems = generate_nodes(len(coords), config.servers_per_node, config.pv_efficiency,
+                                                     config.pv_area, config.cores_per_server,
+                                                     config.memory_per_server, config.battery, coords,
+                                                     config.node_placement, self.power_state)
+        self._build_models(datasets)
+
+        # queue of application instances, fed by the arrivals as simulated time reaches their submit times
+        self.applications, self.application_arrivals = generate_applications(self.traces,
+                                                                             self.edge_computing_systems,
+                                                                             config.arrivals)
+        self.total_applications = len(self.traces)
+        check_min_req(self.traces, config.cores_per_server, config.memory_per_server,
+                      config.degradable_applications)  # prevents infinite loops
+
+        # results
+        self.results_writer = None  # streams the results to disk as the simulation runs
+        self.results_resume = None  # where the binary results of a snapshot continue (see __getstate__)
+        if config.results_format == 'binary' and output_name is not None:
+            self.results_writer = ResultsWriter(f'{RESULTS_DIRECTORY}/{output_name}', config.compression)
+        self.results = ResultsRecorder(config.recording, config.recording_interval,
+                                       sink=self.results_writer)  # one row per simulated second
+        self.cumulative_completed = 0
+        self.cumulative_paused_applications = 0
+        self.cumulative_migrations = 0
+
+        self.processing_time = -1 + SEC_PER_DAY  # counter to tally simulation time (-1 indicates not started yet)
+        self.all_servers_empty = False
+        self.partially_completed_applications = PausedQueue(self.applications.table)  # paused, newest first
+        self.tick = None  # values of the current tick between _start_tick and _finish_tick
+        self.profiler = get_profiler(config)
+        self._build_phases()
+        self.execution_time += time.time() - start_time
+
+    def __getstate__(self):
+        # a snapshot holds the state of the run; the models are rebuilt from the datasets when it is restored
+        state = self.__dict__.copy()
+        for name in self.MODELS:
+            del state[name]
+        if self.results_writer is not None:  # the chunks written so far stay on disk, the rest is in the recorder
+            state['results_resume'] = {'directory': self.results_writer.directory,
+                                       'compression': self.results_writer.compression,
+                                       'first_chunk': len(self.results_writer.chunks),
+                                       'rows': self.results_writer.rows}
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        for name in self.MODELS:
+            setattr(self, name, None)
+
+    def _build_models(self, datasets: object):
+        """
+        :param datasets: Datasets holding the traces and irradiance lists of the config
+        :return: None
+        """
+        """Loads the shared data and the models derived from it, which never change while the simulation runs"""
+        config = self.config
+        self.datasets = datasets
+        # distances, and the models depending on where the nodes are, are cached unless node locations are random
+        cache = config.node_placement != 'random'
+        self.location_distances = datasets.get_distances(self.edge_computing_systems, cache)
+        self.shortest_distances = get_shortest_distances(self.edge_computing_systems,
+                                                         location_distances=self.location_distances)[0]
+        self.traces = datasets.get_traces(config.traces)  # runtimes, cores and memory of the applications
+        if config.irradiance_model == 'clear-sky':  # computed from the coordinates of the nodes, a day at a time
+            coords = [(node.lat, node.long) for node in self.edge_computing_systems]
+            irradiance_key = ('clear-sky', tuple(coords), config.irradiance_days, config.clouds, config.cloud_seed)
+            irradiance_cache = cache
+            self.irradiance_list = datasets.get_clear_sky(coords, config.irradiance_days, config.clouds,
+                                                          config.cloud_seed, cache)
+        else:  # columns by node index, wherever the nodes are
+            irradiance_key = ('file', config.irradiance_list)
+            irradiance_cache = True
+            self.irradiance_list = datasets.get_irradiance(config.irradiance_list)  # memory-mapped irradiance
+        self.power_timeline = datasets.get_power_timeline(self.edge_computing_systems, irradiance_key,
+                                                          self.irradiance_list, config.power_per_server,
+                                                          irradiance_cache)  # power of every node
+        self.irradiance_windows = datasets.get_irradiance_windows(irradiance_key, self.irradiance_list,
+                                                                  irradiance_cache)  # window averages for forecasting
+        self.delay_model = datasets.get_delay_model(config.delay_function, self.edge_computing_systems,
+                                                    self.location_distances, config.traces,
+                                                    cache)  # migration delay between every pair of nodes
+
+    def is_running(self):
+        """
+        :return: whether any application has yet to arrive, start, resume or complete
+        """
+        return len(self.applications) != 0 or len(self.partially_completed_applications) != 0 or \
+            self.all_servers_empty is False or len(self.application_arrivals) != 0
+
+    def _build_phases(self):
+        """
+        :return: None
+        """
+        """Looks up the function of every phase, wrapped by the profiler when there is one"""
+        phases = dict(self.PHASES, arrivals=self.application_arrivals.release, record=self.results.record)
+        if self.profiler is not None:
+            phases = {phase: self.profiler.wrap(phase, function) for phase, function in phases.items()}
+        self.phases = phases
+
+    def _start_tick(self):
+        """
+        :return: None
+        """
+        """First half of the next tick: arrivals, completions and shutdowns, up to the decisions of the policy"""
+        config = self.config
+        applications = self.applications
+        partially_completed_applications = self.partially_completed_applications
+        edge_computing_systems = self.edge_computing_systems
+        self.processing_time += 1
+        processing_time = self.processing_time
+        if processing_time > MAX_ITERATIONS + SEC_PER_DAY:
+            raise RuntimeError(f'exceeding {MAX_ITERATIONS} iterations')
+        if processing_time >= self.power_timeline.length:  # nothing reads the power of nodes whose capacity settled
+            raise IndexError(f'simulated time {processing_time - SEC_PER_DAY} is past the end of the irradiance data '
+                             f'({self.power_timeline.length - SEC_PER_DAY} seconds after the start)')
+        phases = self.phases
+        phases['arrivals'](processing_time - SEC_PER_DAY)
+        self.tick = {'queue_length': len(applications), 'state_signature': None, 'servers_allowed': None}
+        if self.profiler is not None:
+            self.profiler.sample(processing_time - SEC_PER_DAY, len(applications),
+                                 len(partially_completed_applications))
+
+        if config.engine == 'event':
+            self.tick['state_signature'] = phases['signature'](edge_computing_systems, applications,
+                                                               partially_completed_applications)
+            self.tick['servers_allowed'] = get_servers_allowed(edge_computing_systems, config.power_per_server,
+                                                               self.power_timeline, processing_time)
+
+        if config.diagnostics:
+            print(f'Time = {processing_time - SEC_PER_DAY}')
+            print(f'Queue Length: {len(applications)}')
+            print(f'Partial: {len(partially_completed_applications)}')
+
+        current_completed = phases['complete'](applications.table, processing_time, config.diagnostics)
+
+        self.cumulative_completed += current_completed
+        mapping = applications.table.drop_completed()
+        if mapping is not None:  # renumber the applications left in the queues
+            applications.remap(mapping)
+            partially_completed_applications.remap(mapping)
+
+        current_paused_applications = phases['shutdown'](edge_computing_systems, self.power_state,
+                                                         config.power_per_server, self.power_timeline, processing_time,
+                                                         partially_completed_applications, config.diagnostics)
+
+        self.cumulative_paused_applications += current_paused_applications
+        self.tick.update(current_completed=current_completed, current_paused=current_paused_applications)
+
+    def _finish_tick(self):
+        """
+        :return: None
+        """
+        """Second half of the tick: the policy, then starts, batteries and (event engine) the quiet ticks after it"""
+        config = self.config
+        applications = self.applications
+        partially_completed_applications = self.partially_completed_applications
+        edge_computing_systems = self.edge_computing_systems
+        processing_time = self.processing_time
+        tick = self.tick
+        phases = self.phases
+
+        current_migrations = phases['resume'](config.policy, partially_completed_applications,
+                                              self.shortest_distances, self.delay_model, edge_computing_systems,
+                                              self.irradiance_windows, self.power_timeline, processing_time,
+                                              config.power_per_server, config.degradable_applications,
+                                              config.degradable_multiplier, config.placement, config.diagnostics,
+                                              self.profiler)
+
+        self.cumulative_migrations += current_migrations
+        phases['record'](processing_time - SEC_PER_DAY, tick['queue_length'], tick['current_paused'],
+                            self.cumulative_paused_applications, current_migrations, self.cumulative_migrations,
+                            self.cumulative_completed, self.cumulative_completed / self.total_applications)
+
+        if applications:
+            phases['start'](edge_computing_systems, applications, processing_time, config.global_applications,
+                            config.degradable_applications, config.degradable_multiplier, config.placement,
+                            config.diagnostics)
+
+        if config.battery > 0:
+            phases['batteries'](edge_computing_systems, config.power_per_server, self.power_timeline, processing_time)
+
+        self.all_servers_empty = phases['running'](self.power_state)  # check if applications run
+        self.tick = None
+
+        # event engine: nothing changed this tick, so jump straight to the next tick where something can
+        # (a tick restored from a snapshot taken by the tick engine has no signature and is never skipped)
+        next_arrival = self.application_arrivals.get_next_arrival()
+        if next_arrival is not None:
+            next_arrival += SEC_PER_DAY
+        if config.engine == 'event' and tick['state_signature'] is not None and tick['current_completed'] == 0 and \
+                tick['current_paused'] == 0 and \
+                phases['signature'](edge_computing_systems, applications,
+                                    partially_completed_applications) == tick['state_signature']:
+            next_event = phases['event skip'](edge_computing_systems, applications.table,
+                                              partially_completed_applications, self.power_timeline,
+                                              config.power_per_server, config.battery, tick['servers_allowed'],
+                                              processing_time,
+                                              min(len(self.irradiance_list), MAX_ITERATIONS + SEC_PER_DAY + 1),
+                                              next_arrival)
+            skipped = next_event - processing_time - 1
+            if skipped > 0:
+                self.results.record_repeated(processing_time + 1 - SEC_PER_DAY, next_event - SEC_PER_DAY,
+                                             len(applications), 0, self.cumulative_paused_applications, 0,
+                                             self.cumulative_migrations, self.cumulative_completed,
+                                             self.cumulative_completed / self.total_applications)
+                self.processing_time = next_event - 1
+
+    def step(self):
+        """
+        :return: None
+        """
+        """Simulates the next tick (and, with the event engine, skips the quiet ticks after it)"""
+        if self.tick is None:
+            self._start_tick()
+        self._finish_tick()
+
+    def run(self, until=None):
+        """
+        :param until: simulated time to stop before, or 'pause' to stop part-way through the first tick in which
+                      applications are paused, just before the policy decides where they go (None runs to the end)
+        :return: SimulationResult, or None if the simulation stopped early (it can be snapshotted or run further)
+        """
+        """Runs until every application completed, then writes the results if the simulation has an output name"""
+        start_time = time.time()
+        if self.profiler is not None:
+            self.profiler.start()
+        try:
+            if self.tick is not None:  # stopped or restored part-way through a tick
+                self._finish_tick()
+            while self.is_running():
+                if until == 'pause':
+                    self._start_tick()
+                    if self.tick['current_paused'] > 0:
+                        return None
+                    self._finish_tick()
+                elif until is not None and self.processing_time + 1 - SEC_PER_DAY >= until:
+                    return None
+                else:
+                    self.step()
+        finally:
+            if self.profiler is not None:
+                self.profiler.stop()
+            self.execution_time += time.time() - start_time
+        return self.get_result()
+
+    def snapshot(self):
+        """
+        :return: pickled state of the simulation, without the datasets and the models built from them
+        """
+        if self.results_writer is not None:  # binary results already handed over are on disk before the snapshot
+            self.results_writer.flush()
+        return pickle.dumps(self, pickle.HIGHEST_PROTOCOL)
+
+    def save_snapshot(self, path: str, compression: str = 'none'):
+        """
+        :param path: file to write the snapshot to (the extension of the compression is added)
+        :param compression: 'none', 'gzip' or 'lzma'
+        :return: path of the snapshot file
+        """
+        extension, opener = COMPRESSIONS[compression]
+        with opener(f'{path}{extension}', 'wb') as f:
+            f.write(self.snapshot())
+        return f'{path}{extension}'
+
+    @classmethod
+    def restore(cls, snapshot, datasets: object = None, output_name: str = None, config: object = None):
+        """
+        :param snapshot: bytes from snapshot() or a file written by save_snapshot
+        :param datasets: Datasets to rebuild the models from (None loads the files for this simulation only)
+        :param output_name: name of the results of the restored simulation (None keeps them in memory only, or, for a
+                            snapshot streaming binary results, continues in the folder it was streaming to)
+        :param config: SimulationConfig to continue with; only the FORK_SETTINGS may differ from the snapshot's
+        :return: Simulation, continuing from where the snapshot was taken
+        """
+        """
+        Restores a snapshot, optionally with another policy. The policy only decides where paused applications go, so
+        a snapshot taken before the first pause (run(until='pause')) is the state every policy reaches, and restoring
+        it gives the results of running that policy from the start. A later snapshot already holds the decisions of
+        its own policy; another policy continues from those instead of its own.
+
+        The binary results a snapshot streamed before it was taken stay in their folder. The restored simulation
+        continues writing there, or copies them to the folder of a new output name first, so each fork of a snapshot
+        ends up with all of its results.
+        """
+        if not isinstance(snapshot, (bytes, bytearray)):
+            opener = next((opener for extension, opener in COMPRESSIONS.values()
+                           if extension and snapshot.endswith(extension)), open)
+            with opener(snapshot, 'rb') as f:
+                snapshot = f.read()
+        simulation = pickle.loads(snapshot)
+        if config is not None:
+            changed = [name for name in SimulationConfig.KEYS
+                       if name not in cls.FORK_SETTINGS and getattr(config, name) != getattr(simulation.config, name)]
+            if changed:
+                raise ValueError(f'{", ".join(changed)} cannot change after the simulation started')
+            if (config.profiling, config.profiling_interval) != (simulation.config.profiling,
+                                                                 simulation.config.profiling_interval):
+                simulation.profiler = get_profiler(config)
+            simulation.config = config
+        resume, simulation.results_resume = simulation.results_resume, None
+        if resume is not None and (simulation.config.results_format, simulation.config.compression) != \
+                ('binary', resume['compression']):
+            raise ValueError('results format and compression cannot change after binary results were written')
+        simulation._build_models(datasets if datasets is not None else Datasets())
+        simulation.application_arrivals.link(simulation.traces)
+        simulation.output_name = output_name
+        if resume is not None:
+            directory = resume['directory'] if output_name is None else f'{RESULTS_DIRECTORY}/{output_name}'
+            if os.path.abspath(directory) != os.path.abspath(resume['directory']):
+                os.makedirs(directory, exist_ok=True)
+                for index in range(resume['first_chunk']):
+                    name = get_chunk_name(index, resume['compression'])
+                    shutil.copyfile(f"{resume['directory']}/{name}", f'{directory}/{name}')
+            simulation.output_name = os.path.basename(directory)
+            simulation.results_writer = ResultsWriter(directory, resume['compression'],
+                                                      first_chunk=resume['first_chunk'], rows=resume['rows'])
+            simulation.results.sink = simulation.results_writer
+        elif simulation.config.results_format == 'binary' and output_name is not None:
+            simulation.results_writer = ResultsWriter(f'{RESULTS_DIRECTORY}/{output_name}',
+                                                      simulation.config.compression)
+            simulation.results.sink = simulation.results_writer
+        simulation._build_phases()
+        return simulation
+
+    def get_result(self):
+        """
+        :return: SimulationResult of the finished simulation (its results are written if it has an output name)
+        """
+        table = self.applications.table
+        total_overhead = table.total_overhead
+        idle_rate = table.total_idle / table.completed
+
+        self.results.finish()
+        result = SimulationResult(self.config, len(self.edge_computing_systems),
+                                  self.processing_time - SEC_PER_DAY,  # started at t=86400
+                                  total_overhead, idle_rate,
+                                  [[node.index, node.applications_completed] for node in self.edge_computing_systems],
+                                  self.results, self.execution_time,
+                                  profiling=None if self.profiler is None else self.profiler.get_metadata())
+        if self.results_writer is not None:
+            self.results_writer.close(dict(result.get_metadata(), **self.results.get_metadata()))
+            result.output = self.results_writer.directory
+        elif self.output_name is not None:
+            result.write_text(f'Outputs/{self.output_name}.txt')
+        return result
+
+
+def get_profiler(config: object):
+    # None when profiling is off, so the tick never calls into the profiler
+    if config.profiling == 'off':
+        return None
+    return PhaseProfiler(config.profiling_interval, config.profiling == 'cprofile')
+
+
+def get_output_name(policy: str):
+    # results are named after the policy and the time the run started
+    return f'{policy}_output_{datetime.now().strftime("%m-%d-%Y_%H-%M-%S")}'
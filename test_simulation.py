@@ -0,0 +1,476 @@
+import csv
+
+import pytest
+
+import edge_computing_system
+import results_loader
+import trace_loader
+from results_loader import *
+from simulation import *
+
+# nodes where the simulation starts in daylight, so clouds and nightfall pause applications within a few hours
+COORDS = [(35.0, 140.0), (30.0, 120.0), (25.0, 100.0)]
+
+
+def write_traces(path: str, jobs: int = 16, seed: int = 1):
+    # applications submitted over the first two hours, running for 5 minutes to 2 hours
+    rng = np.random.default_rng(seed)
+    with open(path, 'w') as f:
+        f.write('id,submit,runtime,cores,x,memory\n')
+        for index in range(jobs):
+            f.write(f'{index},{rng.integers(0, 7200)},{rng.integers(300, 7200)},{rng.choice([1, 1, 2])},0,'
+                    f'{rng.choice([1024, 2048, 3000])}\n')
+
+
+def get_config(policy: str, battery: float = 0, degradable: bool = False, engine: str = 'tick'):
+    return SimulationConfig(1, 4, 16384, battery, 250, .22, 3, '40885*x**-0.702', 'assigned', policy, True,
+                            degradable, 2, 'traces.csv', 'none', engine=engine, arrivals='submit',
+                            irradiance_model='clear-sky', irradiance_days=4, clouds=True)
+
+
+def assert_same_results(result: object, other: object):
+    assert (result.simulated_time, result.total_overhead, result.idle_rate, result.completion_locations) == \
+           (other.simulated_time, other.total_overhead, other.idle_rate, other.completion_locations)
+    for column, other_column in zip(result.get_series(), other.get_series()):
+        assert np.array_equal(column, other_column)
+
+
+@pytest.mark.parametrize('degradable', [False, True])
+@pytest.mark.parametrize('battery', [0, 50000])
+@pytest.mark.parametrize('policy', POLICIES)
+def test_event_engine_matches_tick_engine(tmp_path, monkeypatch, policy, battery, degradable):
+    # the event engine only skips seconds in which nothing can happen, so every result is the same
+    monkeypatch.chdir(tmp_path)
+    write_traces('traces.csv')
+    datasets = Datasets(coords=COORDS)
+    tick = Simulation(get_config(policy, battery, degradable, 'tick'), datasets).run()
+    event = Simulation(get_config(policy, battery, degradable, 'event'), datasets).run()
+    assert tick.get_series()[3][-1] > 0  # applications were paused
+    assert_same_results(tick, event)
+
+
+@pytest.mark.parametrize('policy', ['greedy', 'practical'])
+def test_dropping_completed_applications_keeps_results(tmp_path, monkeypatch, policy):
+    # completed rows are dropped and the queues renumbered part-way through the run
+    monkeypatch.chdir(tmp_path)
+    write_traces('traces.csv')
+    datasets = Datasets(coords=COORDS)
+    expected = Simulation(get_config(policy, 50000), datasets).run()
+    monkeypatch.setattr(edge_computing_system, 'DROP_COMPLETED', 1)
+    for engine in ('tick', 'event'):
+        assert_same_results(Simulation(get_config(policy, 50000, engine=engine), datasets).run(), expected)
+
+
+@pytest.mark.parametrize('engine', ['tick', 'event'])
+def test_run_stops_at_end_of_irradiance(tmp_path, monkeypatch, engine):
+    # applications outlasting the irradiance data, on nodes whose capacity stops changing once the last night begins
+    monkeypatch.chdir(tmp_path)
+    with open('traces.csv', 'w') as f:
+        f.write('id,submit,runtime,cores,x,memory\n0,0,400000,1,0,1024\n1,0,400000,1,0,1024\n')
+    config = SimulationConfig(1, 4, 16384, 0, 250, .22, 3, '40885*x**-0.702', 'assigned', 'passive', False, False, 1,
+                              'traces.csv', 'none', engine=engine, irradiance_model='clear-sky', irradiance_days=3)
+    simulation = Simulation(config, Datasets(coords=[(40.0, -100.0), (35.0, -90.0)]))
+    with pytest.raises(IndexError, match='past the end of the irradiance data'):
+        simulation.run(until=10 ** 6)
+    assert simulation.processing_time == simulation.power_timeline.length
+
+
+def test_insufficient_servers_raise(tmp_path, monkeypatch):
+    # a library caller (or a sweep worker) gets an exception instead of the process exiting
+    monkeypatch.chdir(tmp_path)
+    with open('traces.csv', 'w') as f:
+        f.write('id,submit,runtime,cores,x,memory\n0,0,400,2,0,1024\n')
+    config = SimulationConfig(1, 1, 16384, 0, 250, .22, 3, '40885*x**-0.702', 'assigned', 'passive', False, False, 1,
+                              'traces.csv', 'none', irradiance_model='clear-sky', irradiance_days=3)
+    with pytest.raises(ValueError, match='Minimum of 2 required'):
+        Simulation(config, Datasets(coords=[(40.0, -100.0)]))
+
+
+def test_delay_models_built_together_match():
+    # a sweep's delay functions evaluated over one stacked distance array give the same tables as one at a time
+    distances = np.array([[0, 120.5, 3000.2], [120.5, 0, 2900.7], [3000.2, 2900.7, 0]])
+    memory_counts = {1024: 3, 2048: 1}
+    equations = ['40885*x**-0.702', '10000/(x+1)']
+    models = build_delay_models(equations, distances, memory_counts)
+    for equation in equations:
+        model = DelayModel(equation, distances, memory_counts)
+        for key in ('exact', 'rounded'):
+            assert np.array_equal(models[equation].tables[key], model.tables[key])
+        assert models[equation].get_delay(0, 2, 512, rounded=True) == model.get_delay(0, 2, 512, rounded=True)
+
+
+@pytest.mark.parametrize('compression', ['none', 'gzip'])
+def test_binary_results_resume_after_snapshot(tmp_path, monkeypatch, compression):
+    # a run streaming binary results is snapshotted part-way, restored in place and as a fork with a new name
+    monkeypatch.chdir(tmp_path)
+    write_traces('traces.csv')
+    datasets = Datasets(coords=COORDS)
+    config = get_config('practical', 50000).replace(results_format='binary', compression=compression)
+    full = Simulation(config, datasets, 'full')
+    full.results.chunk_size = full.results.position = 1024  # several chunks are on disk by the time of the snapshot
+    expected = load_results(full.run().output)
+
+    interrupted = Simulation(config, datasets, 'interrupted')
+    interrupted.results.chunk_size = interrupted.results.position = 1024
+    assert interrupted.run(until=5000) is None
+    snapshot = interrupted.snapshot()
+    assert len(os.listdir(f'{RESULTS_DIRECTORY}/interrupted')) == 4
+    for output_name in (None, 'forked'):
+        result = Simulation.restore(snapshot, datasets, output_name).run()
+        assert result.output == f"{RESULTS_DIRECTORY}/{output_name or 'interrupted'}"
+        metadata, columns = load_results(result.output)
+        assert metadata['rows'] == expected[0]['rows']
+        assert metadata['simulated_time'] == expected[0]['simulated_time']
+        for column, expected_column in zip(columns, expected[1]):
+            assert np.array_equal(column, expected_column)
+
+
+@pytest.mark.parametrize('engine', ['tick', 'event'])
+@pytest.mark.parametrize('policy', POLICIES)
+def test_fork_at_first_pause_matches_full_run(tmp_path, monkeypatch, policy, engine):
+    # every policy reaches the same state at the first pause, so a fork from there is a run of that policy
+    monkeypatch.chdir(tmp_path)
+    write_traces('traces.csv')
+    datasets = Datasets(coords=COORDS)
+    config = get_config('passive', engine=engine)
+    prefix = Simulation(config, datasets)
+    assert prefix.run(until='pause') is None
+    fork = Simulation.restore(prefix.snapshot(), datasets, config=config.replace(policy=policy)).run()
+    assert_same_results(fork, Simulation(config.replace(policy=policy), datasets).run())
+
+
+def test_restore_rejects_settings_outside_fork_settings(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_traces('traces.csv')
+    datasets = Datasets(coords=COORDS)
+    config = get_config('passive')
+    prefix = Simulation(config, datasets)
+    prefix.run(until='pause')
+    snapshot = prefix.snapshot()
+    with pytest.raises(ValueError, match='battery cannot change'):
+        Simulation.restore(snapshot, datasets, config=config.replace(battery=50000))
+    with pytest.raises(ValueError, match='placement, arrivals cannot change'):
+        Simulation.restore(snapshot, datasets, config=config.replace(placement='best-fit', arrivals='start'))
+    Simulation.restore(snapshot, datasets, config=config.replace(policy='greedy', diagnostics=False))
+
+
+def test_capacity_index_matches_linear_scan():
+    # first-fit and best-fit against a scan of the node's free resources, with queries between deferred updates
+    rng = np.random.default_rng(0)
+    node = EdgeSystem(.22, 3, 0, 0, 0, 0, PowerState())
+    node.servers = [node.get_server_object(8, 16384, node) for _ in range(11)]  # the tree grows past 8 leaves
+    index = node.capacity_index
+
+    def scan(cores: float, memory: float):
+        return [position for position, server in enumerate(node.servers)
+                if server.on and node.free_cores[position] >= cores and node.free_memory[position] >= memory]
+
+    for _ in range(2000):
+        server = node.servers[rng.integers(len(node.servers))]
+        if rng.random() < 0.3:
+            server.on = not server.on
+        else:  # free resources change while the server is on or off
+            server.cores = int(rng.integers(0, 9))
+            server.memory = float(rng.choice([0, 1024, 2048, 4096, 16384]))
+            index.update(server)
+        if rng.random() < 0.5:
+            continue  # the next query sees several changes at once
+        cores, memory = rng.choice([ANY, 1, 2, 4, 8]), rng.choice([ANY, 1024, 4096, 16384])
+        fits = scan(cores, memory)
+        assert index.fits_any(cores, memory) or not fits  # cores and memory may be on different servers
+        start = int(rng.integers(len(node.servers)))
+        first = index.get_first_fit(cores, memory, start)
+        expected = [position for position in fits if position >= start]
+        assert (first.position if first is not None else None) == (expected[0] if expected else None)
+        best = min(((node.free_cores[position], node.free_memory[position], position) for position in fits),
+                   default=None)
+        assert index.get_best_fit(cores, memory) == best
+
+
+def test_capacity_index_version():
+    # the version only moves when a server's state as seen by the next query differs
+    node = EdgeSystem(.22, 3, 0, 0, 0, 0, PowerState())
+    node.servers = [node.get_server_object(4, 4096, node) for _ in range(3)]
+    index = node.capacity_index
+    version = index.get_version()
+    assert index.get_version() == version
+    node.servers[0].on = True
+    node.servers[0].on = False  # switched back within the same tick
+    assert index.get_version() == version
+    node.servers[1].on = True
+    assert index.get_version() > version
+    version = index.get_version()
+    node.servers[1].cores = 2
+    index.update(node.servers[1])
+    assert index.get_version() > version
+    assert index.get_first_fit(3, ANY) is None and index.get_first_fit(2, 4096) is node.servers[1]
+
+
+def test_pending_queue_matches_list_scan():
+    # the earliest arrived application that fits, as the old in-order scan of the application list picked it
+    rng = np.random.default_rng(0)
+    table = ApplicationTable([])
+    applications = PendingQueue(table)
+    waiting = []  # ids in arrival order, as the old list held them
+
+    def scan(cores: float, memory: float, degradable: bool, excluded: set):
+        return next((index for index in waiting if table.memory[index] <= memory and
+                     (degradable or table.cores[index] <= cores) and
+                     (table.cores[index], table.memory[index]) not in excluded), None)
+
+    for _ in range(3000):
+        action = rng.random()
+        if action < 0.2:  # a batch of arrivals
+            jobs = int(rng.integers(1, 6))
+            ids = table.extend(np.full(jobs, 60), rng.choice([1, 2, 4], jobs), rng.choice([512, 1024, 4096], jobs))
+            applications.extend(ids)
+            waiting.extend(ids)
+        elif action < 0.4 and waiting:  # leaves the queue without being picked (lazily dropped from its bucket)
+            index = waiting.pop(int(rng.integers(len(waiting))))
+            applications.remove(table[index])
+        else:
+            cores, memory = rng.choice([0, 1, 2, 4, math.inf]), rng.choice([0, 512, 1024, 4096, math.inf])
+            degradable = bool(rng.random() < 0.3)
+            excluded = {(1, 512)} if rng.random() < 0.2 else frozenset()
+            app = applications.get_first_fit(cores, memory, degradable, excluded)
+            expected = scan(cores, memory, degradable, excluded)
+            assert (app.id if app is not None else None) == expected
+            if app is not None:  # started
+                waiting.remove(app.id)
+                applications.remove(app)
+        assert len(applications) == len(waiting)
+        assert all(table[index] in applications for index in waiting)
+    assert [app.id for app in applications] == waiting
+
+
+def test_paused_queue_waits_for_node_version_and_settles_overhead():
+    # YOLO pauses an application onto a busy neighbour: a 5 s migration timer, then it waits for the node to change
+    power_state = PowerState()
+    nodes = [EdgeSystem(.22, 3, 0, 0, 0, index, power_state) for index in range(2)]
+    for node in nodes:
+        node.servers = [node.get_server_object(2, 4096, node)]
+        node.servers[0].on = True
+    table = ApplicationTable([node.servers[0] for node in nodes], [1000, 1000], [2, 2], [1024, 1024])
+    paused = PausedQueue(table)
+    delay_model = DelayModel('8192 / 5 + 0 * x', np.array([[0, 10.0], [10.0, 0]]), {1024: 2})  # 5 s for 1024 MB
+    shortest_distances = {nodes[0]: (nodes[1], 10.0), nodes[1]: (nodes[0], 10.0)}
+    for index, node in enumerate(nodes):
+        table.time = 0
+        node.servers[0].start_application(table[index])
+
+    def tick(time: int):
+        table.time = time
+        return resume_applications('YOLO', paused, shortest_distances, delay_model, nodes, None, None, time, 250,
+                                   False, 1, 'first-fit', False)
+
+    overhead = 0  # the baseline added a second of overhead every tick an application was paused, less one on resuming
+    for time in range(10, 40):
+        if time == 10:  # node 0 loses power
+            nodes[0].servers[0].on = False
+            nodes[0].servers[0].stop_application(table[0])
+            paused.add(table[0], time)
+        if time == 30:  # the application on node 1 completes, changing the node
+            nodes[1].servers[0].stop_application(table[1])
+        if time in (16, 25):
+            assert paused.get_due(time) == []  # neither a timer nor a change of node 1 brings it back
+        was_paused = table[0] in paused
+        migrations = tick(time)
+        if was_paused:
+            overhead += 1
+            if table[0] not in paused:  # resumed this tick
+                overhead -= 1
+                assert (time, migrations) == (30, 1)
+        if time == 10:
+            assert table[0].delay == 5 and paused.get_next_wake() == 15
+        if time == 15:
+            assert nodes[1] in paused.waiting and paused.get_next_wake() is None  # timer fired, now waiting
+    assert table[0].parent is nodes[1].servers[0]
+    assert table.overhead[0] == overhead == 20
+
+
+def test_trace_loading_rejects_bad_rows_and_reparses_edited_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open('traces.csv', 'w') as f:
+        f.write('id,submit,runtime,cores,x,memory\n'
+                '0,5,100,2,0,1024\n'
+                '1,3,200,abc,0,2048\n'  # cores not a number
+                '2,7,300,1,0\n'  # memory missing
+                '\n'  # blank lines are skipped, not rejected
+                '3,,400,4,0,1024\n'  # no submit time
+                '4,9,50.7,1,0,4096\n')
+    traces = load_traces('traces.csv')
+    assert (len(traces), traces.rejected, traces.max_cores, traces.max_memory) == (3, 2, 4, 4096)
+    assert traces.memory_counts == {1024: 2, 4096: 1}
+    assert not traces.submits  # a row without a submit time queues every application at the start
+    assert traces.get_rows(np.arange(3)).tolist() == [[5, 100, 2, 1024], [0, 400, 4, 1024], [9, 50, 1, 4096]]
+    with pytest.raises(ValueError, match='Minimum of 4 required'):
+        check_min_req(traces, 2, 16384, False)  # too many cores for the servers
+    with pytest.raises(ValueError, match='Minimum of 4096 MB required'):
+        check_min_req(traces, 4, 2048, False)  # too much memory
+    check_min_req(traces, 2, 4096, True)  # degradable applications get by with fewer cores
+
+    # the same file comes from the cache without being parsed again
+    with monkeypatch.context() as patch:
+        patch.setattr(trace_loader, 'parse_traces', None)
+        assert load_traces('traces.csv').get_info() == traces.get_info()
+
+    # an edited file hashes differently and is parsed again, now with submit times in order
+    with open('traces.csv', 'w') as f:
+        f.write('id,submit,runtime,cores,x,memory\n0,5,100,2,0,1024\n1,8,200,1,0,512\nbad row\n')
+    edited = load_traces('traces.csv')
+    assert (len(edited), edited.rejected, edited.submits, edited.in_order, edited.first_submit) == \
+           (2, 1, True, True, 5)
+    assert edited.get_submits().tolist() == [5, 8]
+    assert len(os.listdir(trace_loader.CACHE_DIRECTORY)) == 4  # rows and info of both versions
+
+
+def read_output_with_csv(path: str):
+    # the two passes graphing.py made over an output file before results_loader (without the early exit after 30
+    # lines, which newer config headers run past before the completion locations)
+    info = {'policy': None, 'battery': None, 'location_counts': [], 'series': []}
+    with open(path, 'r') as f:
+        counter = False
+        for line in csv.reader(f, delimiter=':'):
+            if not line:
+                continue
+            if line[0] == 'Policy':
+                info['policy'] = line[1].strip()
+            elif line[0] == 'Battery Size':
+                info['battery'] = float(line[1].strip())
+            elif line[0] == 'Application Completion Locations':
+                counter = True
+            elif counter:
+                if line[0] == '----------------':
+                    counter = False
+                else:
+                    info['location_counts'].append(int(line[1]))
+    with open(path, 'r') as f:
+        start = False
+        for line in csv.reader(f, delimiter=','):
+            if line and line[0] == 'Simulated Time':
+                start = True
+            elif start:
+                info['series'].append([int(value) for value in line[:7]] + [float(line[7])])
+    return info
+
+
+def test_graphing_cache_matches_csv_parse_and_tracks_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_traces('traces.csv')
+    os.makedirs('Outputs')
+    datasets = Datasets(coords=COORDS)
+    for policy, battery in (('greedy', 0), ('practical', 50000)):
+        Simulation(get_config(policy, battery, engine='event'), datasets, f'{policy}_output').run()
+
+    outputs = load_outputs('Outputs', list(SERIES))
+    paths = [os.path.abspath(f'Outputs/{file}') for file in os.listdir('Outputs')]
+    for output, path in zip(outputs, paths):
+        expected = read_output_with_csv(path)
+        series = np.array(expected['series'])
+        assert (output.policy, output.battery, output.location_counts) == \
+               (expected['policy'], expected['battery'], expected['location_counts'])
+        assert output.total_time == series[-1, 0]
+        for column, (index, _) in SERIES.items():
+            assert np.array_equal(getattr(output, column), series[:, index])
+
+    # an unchanged file is not parsed again
+    cached = [f'{results_loader.CACHE_DIRECTORY}/{results_loader.get_cache_name(path)}.queue.npy' for path in paths]
+    cached_mtimes = [os.stat(path).st_mtime_ns for path in cached]
+    load_outputs('Outputs', ['queue'])
+    assert [os.stat(path).st_mtime_ns for path in cached] == cached_mtimes
+
+    # a file edited to the same size, or to another size with its old mtime, is parsed again
+    stat = os.stat(paths[0])
+    with open(paths[0], 'r') as f:
+        text = f.read()
+    policy = outputs[0].policy
+    with open(paths[0], 'w') as f:
+        f.write(text.replace(f'Policy: {policy}', f"Policy: {'X' * len(policy)}"))
+    os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert load_outputs('Outputs')[0].policy == 'X' * len(policy)
+    with open(paths[0], 'w') as f:
+        f.write(text.replace(f'Policy: {policy}', 'Policy: edited policy'))
+    os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert load_outputs('Outputs')[0].policy == 'edited policy'
+
+
+def test_distances_match_geopy_and_nearest_neighbours(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cities = {'New York': (40.7128, -74.0060), 'Philadelphia': (39.9526, -75.1652), 'Chicago': (41.8781, -87.6298),
+              'Los Angeles': (34.0522, -118.2437), 'San Diego': (32.7157, -117.1611)}
+    power_state = PowerState()
+    nodes = [EdgeSystem(.22, 3, lat, long, 0, index, power_state) for index, (lat, long) in enumerate(cities.values())]
+    shortest_distances, distances = get_shortest_distances(nodes, cache=False)
+    coords = list(cities.values())
+    for first, second in itertools.combinations(range(len(coords)), 2):
+        assert distances[first, second] == distances[second, first] == \
+               pytest.approx(gd(coords[first], coords[second]).km, abs=1e-6)
+    assert distances[0, 1] == pytest.approx(129.6, abs=0.5)  # New York to Philadelphia
+
+    # checked by hand: Chicago is 1067 km from Philadelphia and 1145 km from New York
+    names = list(cities)
+    nearest = {names[node.index]: names[neighbour.index] for node, (neighbour, _) in shortest_distances.items()}
+    assert nearest == {'New York': 'Philadelphia', 'Philadelphia': 'New York', 'Chicago': 'Philadelphia',
+                       'Los Angeles': 'San Diego', 'San Diego': 'Los Angeles'}
+    assert shortest_distances[nodes[2]][1] == distances[2, 1]
+
+    # nearly antipodal points, where Vincenty does not converge, fall back to geopy
+    antipodal = [(0.0, 0.0), (0.5, 179.7)]
+    assert get_distance_matrix(antipodal, cache=False)[0, 1] == pytest.approx(gd(*antipodal).km, abs=1e-6)
+
+
+@pytest.mark.parametrize('engine', ['tick', 'event'])
+def test_sampled_and_changes_recording_rebuild_full_series(tmp_path, monkeypatch, engine):
+    monkeypatch.chdir(tmp_path)
+    write_traces('traces.csv')
+    datasets = Datasets(coords=COORDS)
+    config = get_config('practical', 50000, engine=engine)
+    full = Simulation(config, datasets).run().get_series()
+    changes = Simulation(config.replace(recording='changes'), datasets).run()
+    assert len(changes.recorder.get_stored()[0]) < len(full[0])  # only the ticks that differ are stored
+    for column, full_column in zip(changes.get_series(), full):
+        assert np.array_equal(column, full_column)
+    sampled = Simulation(config.replace(recording='sampled', recording_interval=60), datasets).run().get_series()
+    ticks = np.union1d(np.arange(0, len(full[0]), 60), [len(full[0]) - 1])  # every minute, and the last tick
+    for column, full_column in zip(sampled, full):
+        assert np.array_equal(column, full_column[ticks])
+
+
+@pytest.mark.parametrize('recording', ['full', 'sampled', 'changes'])
+def test_binary_results_match_in_memory_results(tmp_path, monkeypatch, recording):
+    # the chunks streamed by the writer thread read back as the series the recorder keeps in memory
+    monkeypatch.chdir(tmp_path)
+    write_traces('traces.csv')
+    datasets = Datasets(coords=COORDS)
+    config = get_config('practical', 50000).replace(recording=recording, recording_interval=60)
+    expected = Simulation(config, datasets).run()
+    streamed = Simulation(config.replace(results_format='binary', compression='lzma'), datasets, 'streamed')
+    streamed.results.chunk_size = streamed.results.position = 64  # several chunks, the last one partly filled
+    metadata, columns = load_results(streamed.run().output)
+    assert len(metadata['chunks']) > 1
+    assert (metadata['simulated_time'], metadata['completion_locations']) == \
+           (expected.simulated_time, expected.completion_locations)
+    for column, expected_column in zip(columns, expected.get_series()):
+        assert np.array_equal(column, expected_column)
+    os.makedirs('Outputs')
+    export_text(streamed.results_writer.directory)
+    assert read_output_with_csv('Outputs/streamed.txt')['series'] == np.column_stack(columns).tolist()
+
+
+def test_decision_latency_histogram_counts_decisions():
+    profiler = PhaseProfiler()
+    profiler.time_policy('greedy', 500, lambda: time.sleep(0.005))  # 10 us a decision
+    profiler.time_policy('greedy', 1, lambda: time.sleep(0.005))  # 5000 us
+    profiler.time_policy('greedy', 0, lambda: None)  # nothing was due
+    totals = profiler.get_metadata()['policies']['greedy']
+    histogram = totals['latency_histogram_us']
+    assert (totals['calls'], totals['decisions'], sum(histogram)) == (3, 501, 501)
+    assert histogram.index(500) >= 4 and histogram.index(1) >= 13  # at least 8-16 us and 4096-8192 us
+
+
+def test_profiled_run_histogram_covers_every_decision(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_traces('traces.csv')
+    result = Simulation(get_config('look-ahead', 50000).replace(profiling='phases'), Datasets(coords=COORDS)).run()
+    totals = result.profiling['policies']['look-ahead']
+    assert totals['decisions'] > 0 and sum(totals['latency_histogram_us']) == totals['decisions']
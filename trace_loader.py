@@ -0,0 +1,189 @@
+import csv
+import hashlib
+import itertools
+import json
+import os
+
+import numpy as np
+
+CACHE_DIRECTORY = '.trace_cache'  # parsed traces, keyed by a hash of the trace file
+CHUNK_ROWS = 1 << 20  # rows parsed, and later read back, at a time
+TRACE_COLUMNS = (1, 2, 3, 5)  # submit, runtime, cores and memory columns of a trace file
+
+
+class Traces:
+    def __init__(self, path: str, length: int, rejected: int = 0, max_cores: int = 0, max_memory: int = 0,
+                 memory_counts: dict = None, submits: bool = False, in_order: bool = True, first_submit: int = 0):
+        """
+        :param path: binary file with the submit time, runtime, cores and memory of each accepted row, as int64
+        :param length: number of accepted rows
+        :param rejected: rows of the trace file that could not be parsed
+        :param max_cores: most cores any application asks for
+        :param max_memory: most memory any application needs, in MB
+        :param memory_counts: applications of each memory size, in the order the sizes first appear
+        :param submits: whether every accepted row has a submit time
+        :param in_order: whether the submit times never decrease from one row to the next
+        :param first_submit: earliest submit time
+        """
+        """
+        Handle to a parsed trace. The rows stay on disk and are read back a chunk at a time, so holding a Traces
+        costs the same whatever the length of the trace.
+        """
+        self.path = path
+        self.length = length
+        self.rejected = rejected
+        self.max_cores = max_cores
+        self.max_memory = max_memory
+        self.memory_counts = memory_counts if memory_counts is not None else {}
+        self.submits = submits
+        self.in_order = in_order
+        self.first_submit = first_submit
+
+    def __len__(self):
+        return self.length
+
+    def get_info(self):
+        # everything but the path, as saved next to the rows
+        return {'length': self.length, 'rejected': self.rejected, 'max_cores': self.max_cores,
+                'max_memory': self.max_memory, 'memory_counts': list(self.memory_counts.items()),
+                'submits': self.submits, 'in_order': self.in_order, 'first_submit': self.first_submit}
+
+    def iter_chunks(self, start: int = 0):
+        """
+        :param start: first row to read
+        :return: iterator over (row, column) int64 arrays of up to CHUNK_ROWS rows (submit, runtime, cores, memory),
+                 in trace order
+        """
+        for first in range(start, self.length, CHUNK_ROWS):
+            count = min(CHUNK_ROWS, self.length - first)
+            yield np.fromfile(self.path, dtype=np.int64, count=count * 4, offset=first * 32).reshape(count, 4)
+
+    def get_submits(self):
+        # submit time of every row (read a chunk at a time)
+        return np.concatenate([rows[:, 0] for rows in self.iter_chunks()]) if self.length else \
+            np.zeros(0, dtype=np.int64)
+
+    def get_rows(self, indexes: np.ndarray):
+        """
+        :param indexes: rows to read, in any order
+        :return: (row, column) int64 array of those rows
+        """
+        rows = np.memmap(self.path, dtype=np.int64, mode='r', shape=(self.length, 4))
+        return np.array(rows[indexes])
+
+
+def get_file_hash(file: str):
+    digest = hashlib.sha1()
+    with open(file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_float(value: str):
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+
+def parse_rows(lines: list):
+    """
+    :param lines: lines of a trace file (without the header)
+    :return: submit time, runtime, cores and memory of each line as floats (NaN where a value could not be parsed)
+    """
+    """
+    Parses the whole chunk with one NumPy call. A malformed value makes the chunk go through a converter instead,
+    and a row with too few columns makes it go row by row.
+    """
+    try:
+        return np.loadtxt(lines, delimiter=',', usecols=TRACE_COLUMNS, dtype=np.float64, ndmin=2)
+    except ValueError:
+        pass
+    try:
+        return np.loadtxt(lines, delimiter=',', usecols=TRACE_COLUMNS, dtype=np.float64, ndmin=2,
+                          converters={column: parse_float for column in TRACE_COLUMNS})
+    except (ValueError, IndexError):
+        pass
+    values = np.full((len(lines), len(TRACE_COLUMNS)), np.nan)
+    for index, row in enumerate(csv.reader(lines, delimiter=',')):
+        if len(row) > max(TRACE_COLUMNS):
+            values[index] = [parse_float(row[column]) for column in TRACE_COLUMNS]
+    return values
+
+
+def parse_traces(file: str, path: str):
+    """
+    :param file: csv file containing applications (id, submit, runtime, cores, x, memory)
+    :param path: binary file to write the accepted rows to
+    :return: Traces
+    """
+    """
+    Parses the file in chunks of CHUNK_ROWS rows, appending each chunk to the binary file as it goes, and gathers the
+    maxima and counts of the trace in the same pass. Rows with a missing or non-numeric runtime, cores or memory are
+    rejected. Submit times are kept only if the header names the column and every accepted row has one.
+    """
+    traces = Traces(path, 0, submits=True, first_submit=None)
+    last_submit = None
+    with open(file, 'r') as f, open(path, 'wb') as rows_file:
+        header = next(f).rstrip('\r\n').split(',')
+        traces.submits = len(header) > TRACE_COLUMNS[0] and header[TRACE_COLUMNS[0]].strip().lower() == 'submit'
+        while True:
+            lines = [line for line in itertools.islice(f, CHUNK_ROWS) if line.strip()]
+            if not lines:
+                break
+            values = parse_rows(lines)
+            valid = np.isfinite(values[:, 1:]).all(axis=1)
+            traces.rejected += len(values) - int(valid.sum())
+            values = values[valid]
+            if not len(values):
+                continue
+            traces.submits = traces.submits and bool(np.isfinite(values[:, 0]).all())
+            values[~np.isfinite(values[:, 0]), 0] = 0
+            rows = np.trunc(values).astype(np.int64)  # int(float(value)) for every value
+            rows.tofile(rows_file)
+
+            traces.length += len(rows)
+            traces.max_cores = max(traces.max_cores, int(rows[:, 2].max()))
+            traces.max_memory = max(traces.max_memory, int(rows[:, 3].max()))
+            sizes, first_rows, counts = np.unique(rows[:, 3], return_index=True, return_counts=True)
+            order = np.argsort(first_rows)
+            for size, count in zip(sizes[order].tolist(), counts[order].tolist()):
+                traces.memory_counts[size] = traces.memory_counts.get(size, 0) + count
+            submits = rows[:, 0]
+            traces.in_order = traces.in_order and bool((np.diff(submits) >= 0).all()) and \
+                (last_submit is None or int(submits[0]) >= last_submit)
+            last_submit = int(submits[-1])
+            traces.first_submit = int(submits.min()) if traces.first_submit is None else \
+                min(traces.first_submit, int(submits.min()))
+    if not traces.submits:
+        traces.in_order, traces.first_submit = True, 0
+    traces.first_submit = traces.first_submit or 0
+    return traces
+
+
+def load_traces(file: str, cache: bool = True):
+    """
+    :param file: csv file containing applications
+    :param cache: reuse the rows parsed by an earlier run of the same file (False parses the file again)
+    :return: Traces
+    """
+    """Parses a trace file into CACHE_DIRECTORY, unless the same file has been parsed there before"""
+    path = f'{CACHE_DIRECTORY}/{get_file_hash(file)}'
+    if cache:
+        try:
+            with open(f'{path}.json', 'r') as f:
+                info = json.load(f)
+            info['memory_counts'] = dict(map(tuple, info['memory_counts']))
+            return Traces(f'{path}.rows', **info)
+        except (OSError, KeyError, TypeError, ValueError):
+            pass
+    os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+    temporary = f'{path}.{os.getpid()}.tmp'
+    traces = parse_traces(file, temporary)
+    os.replace(temporary, f'{path}.rows')  # parallel runs never see a partly written cache
+    traces.path = f'{path}.rows'
+    with open(temporary, 'w') as f:
+        json.dump(traces.get_info(), f)
+    os.replace(temporary, f'{path}.json')  # written last, so a cache with rows but no info is parsed again
+    return traces